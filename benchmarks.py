@@ -0,0 +1,652 @@
+"""
+Benchmarks for the parsers' hot paths, run from the repository folder:
+
+    python benchmarks.py cot_extractor [events]
+    python benchmarks.py tak_reports [reports] [fields]
+    python benchmarks.py tak_workbook [rows] [columns]
+    python benchmarks.py mgrs [points] [distinct]
+    python benchmarks.py geochat_times [rows]
+    python benchmarks.py geochat_query [rows]
+    python benchmarks.py geochat_export [rows]
+    python benchmarks.py geochat_batch [databases] [rows]
+    python benchmarks.py geochat_incremental [rows] [new_rows]
+
+Each benchmark builds its own synthetic input, checks that the fast path
+produces the same results as the original one and prints the timings.
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import cot_parser
+import geochat_parser
+import tak_report_parser
+
+
+def write_synthetic_cot_log(path, events, seed=1):
+    """Writes a WinTAK-style capture of PLI events with a sprinkling of remarks."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        for i in range(events):
+            stamp = f"2025-01-12T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.{rng.randint(0, 999):03d}Z"
+            remarks = f'<remarks source="BAO.F.ATAK">Name: Unit {i}\nStatus: OK</remarks>' if i % 10 == 0 else ''
+            f.write(
+                f'<event version="2.0" uid="ANDROID-{rng.randint(1, 200)}" type="a-f-G-U-C" '
+                f'time="{stamp}" start="{stamp}" stale="{stamp}" how="m-g">\n'
+                f'  <point lat="{rng.uniform(-80, 80):.6f}" lon="{rng.uniform(-180, 180):.6f}" '
+                f'hae="9999999.0" ce="9999999.0" le="9999999.0"/>\n'
+                f'  <detail><takv os="29" version="4.8.1" device="SM-G970U" platform="ATAK-CIV"/>'
+                f'<contact endpoint="*:-1:stcp" callsign="CS{rng.randint(1, 200)}"/>'
+                f'<uid Droid="CS{i % 200}"/><precisionlocation altsrc="GPS" geopointsrc="GPS"/>'
+                f'<__group name="Cyan" role="Team Member"/><status battery="{rng.randint(1, 100)}"/>'
+                f'<track speed="{rng.uniform(0, 30):.1f}" course="{rng.uniform(0, 360):.3f}"/>{remarks}'
+                f'<_flow-tags_ TAK-Server-e87a0e02="{stamp[:19]}Z"/></detail>\n'
+                f'</event>\n'
+            )
+
+
+def time_extraction(path, fast_path):
+    records = []
+    start = time.perf_counter()
+    for raw_event in cot_parser.iter_events(path):
+        event_str = raw_event[:-len(cot_parser.EVENT_END_TAG)].decode('utf-8', 'replace').strip() + '</event>'
+        if fast_path:
+            result = cot_parser.fast_extract_event_data(event_str) or cot_parser.extract_event_data_full(event_str)
+        else:
+            result = cot_parser.extract_event_data_full(event_str)
+        records.append(result)
+    return time.perf_counter() - start, records
+
+
+def benchmark_cot_extractor(events=1000000):
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "synthetic_cot.txt")
+        write_synthetic_cot_log(path, events)
+        print(f"Synthetic log: {events} events, {os.path.getsize(path) / 1024 ** 2:.0f} MB")
+
+        full_seconds, full_records = time_extraction(path, fast_path=False)
+        fast_seconds, fast_records = time_extraction(path, fast_path=True)
+
+    identical = all(
+        fast == full and list(fast[0]) == list(full[0])
+        for fast, full in zip(fast_records, full_records)
+    )
+    print(f"ElementTree + flatten_element: {full_seconds:8.2f} s ({events / full_seconds:10,.0f} events/s)")
+    print(f"Fast extractor:                {fast_seconds:8.2f} s ({events / fast_seconds:10,.0f} events/s)")
+    print(f"Speedup: {full_seconds / fast_seconds:.1f}x, identical output: {identical}")
+
+
+def write_synthetic_tak_template(path, fields, report_type="SPOTREP"):
+    """A template with one section of options plus single and multi-select lists, fields columns in total."""
+    option_types = ['string', 'checkbox', 'dateTime', 'number', 'number_units', 'rangeBearing', 'time', 'geometry']
+    options = []
+    lists = []
+    for i in range(fields - 6):
+        if i % 10 == 8:
+            lists.append(f'<list title="List {i}" multiple="{"true" if i % 20 == 8 else "false"}">'
+                         f'<option title="A"/><option title="B"/><option title="C"/></list>')
+            continue
+        option_type = option_types[i % len(option_types)]
+        if option_type == 'number_units':
+            options.append(f'<option type="number" title="Field {i}" unitOptions="m,km" unitValue="m"/>')
+        else:
+            options.append(f'<option type="{option_type}" title="Field {i}"/>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<templates><report type="{report_type}"><section title="Main">{"".join(options)}</section>'
+                f'{"".join(lists)}</report></templates>')
+
+def make_synthetic_tak_report(template_report, rng, report_type="SPOTREP"):
+    """Fills every option and list of the template with random values, in the shape WinTAK submits."""
+    report = ET.Element('report', type=report_type, userCallsign=f"CS{rng.randint(1, 50)}",
+                        dateTime=f"2025-01-{rng.randint(10, 20):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.000Z",
+                        location=f"POINT ({rng.uniform(-80, -70):.5f} {rng.uniform(30, 40):.5f})", title="Synthetic")
+    for template_section in template_report.iter('section'):
+        section = ET.SubElement(report, 'section', title=template_section.get('title'))
+        for template_option in template_section.findall('option'):
+            option = ET.SubElement(section, 'option', dict(template_option.attrib))
+            option_type = option.get('type')
+            if option_type == 'checkbox':
+                option.set('value', rng.choice(['True', 'False']))
+            elif option_type in ('dateTime', 'time'):
+                option.set('value', f"2025-01-{rng.randint(10, 20):02d}T{rng.randint(0, 23):02d}:00:00Z")
+            elif option_type == 'geometry':
+                option.set('value', f"POINT ({rng.uniform(-80, -70):.5f} {rng.uniform(30, 40):.5f})")
+            else:
+                option.set('value', str(rng.randint(0, 1000)))
+    for template_list in template_report.iter('list'):
+        list_ = ET.SubElement(report, 'list', dict(template_list.attrib))
+        for template_option in template_list.findall('option'):
+            ET.SubElement(list_, 'option', title=template_option.get('title'),
+                          selected=rng.choice(['true', 'false']))
+    return report
+
+def legacy_process_reports_for_type(self, reports, report_type, fields, main_sheet, duplicate_sheet, tz_offset, tz_name):
+    def safe_value(value):
+        if value is None or (isinstance(value, str) and value.strip() == ''):
+            return ' '
+        else:
+            return value
+
+    seen_datetimes = {}
+    duplicates = []
+
+    for report in reports:
+        if report.get('type') == report_type:
+            row = []
+            report_time = None
+
+            for field in fields:
+                if field['csv_header'] == 'Date/Time' and field['attribute'] == 'dateTime':
+                    zulu_time = report.get(field['attribute'])
+                    local_time = self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name)
+                    row.append(safe_value(local_time))
+                    try:
+                        report_time = datetime.strptime(local_time, '%Y-%m-%d %H:%M:%S')
+                    except ValueError:
+                        continue
+                elif field['type'] == 'location':
+                    location_str = report.get(field['attribute'])
+                    lat, lon = self.extract_latlong_from_location(location_str)
+                    if lat is not None and lon is not None:
+                        mgrs_coord = self.convert_latlong_to_mgrs(lat, lon)
+                        row.append(safe_value(mgrs_coord))
+                    else:
+                        row.append(' ')
+                elif field['type'] == 'geometry':
+                    found_geometry = False
+                    for section in report.findall('.//section'):
+                        for option in section.findall('option'):
+                            if option.get('title') == field['csv_header'] and option.get('type') == 'geometry':
+                                location_str = option.get('value')
+                                lat, lon = self.extract_latlong_from_location(location_str)
+                                if lat is not None and lon is not None:
+                                    mgrs_coord = self.convert_latlong_to_mgrs(lat, lon)
+                                    row.append(safe_value(mgrs_coord))
+                                else:
+                                    row.append(' ')
+                                found_geometry = True
+                                break
+                        if found_geometry:
+                            break
+                    if not found_geometry:
+                        row.append(' ')
+                elif field['type'] == 'section':
+                    row.append(' ')
+                elif field['type'] == 'text':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    value = element.get(field['attribute']) if element is not None else None
+                    row.append(safe_value(value))
+                elif field['type'] == 'checkbox':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    value = 'X' if element is not None and element.get('value') == 'True' else ' '
+                    row.append(value)
+                elif field['type'] == 'date':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    zulu_time = element.get('value') if element is not None else None
+                    if zulu_time:
+                        local_time = self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name)
+                        row.append(safe_value(local_time))
+                    else:
+                        row.append(' ')
+                elif field['type'] == 'number_with_units':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    if element is not None:
+                        value = element.get('value')
+                        unit = element.get('unitValue')
+                        combined_value = f"{value} {unit}" if value and unit else None
+                        row.append(safe_value(combined_value))
+                    else:
+                        row.append(' ')
+                elif field['type'] == 'number':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    value = element.get('value') if element is not None else None
+                    row.append(safe_value(value))
+                elif field['type'] == 'range':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    value = element.get('value') if element is not None else None
+                    row.append(safe_value(value))
+                elif field['type'] == 'route':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    value = element.get('value') if element is not None else None
+                    row.append(safe_value(value))
+                elif field['type'] == 'time':
+                    element = report.find('.//option[@title="' + field['xml_path'] + '"]')
+                    zulu_time = element.get('value') if element is not None else None
+                    if zulu_time:
+                        local_time = self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name)
+                        row.append(safe_value(local_time))
+                    else:
+                        row.append(' ')
+                elif field['type'] == 'list':
+                    selected_option = None
+                    list_element = report.find('.//list[@title="' + field['csv_header'] + '"]')
+                    if list_element is not None:
+                        for option_el in list_element.findall('.//option'):
+                            if option_el.get('selected') == 'true':
+                                selected_option = option_el.get('title')
+                                break
+                    row.append(safe_value(selected_option))
+                elif field['type'] == 'multi-select':
+                    selected_options = []
+                    list_element = report.find('.//list[@title="' + field['csv_header'] + '"]')
+                    if list_element is not None:
+                        for option_el in list_element.findall('.//option'):
+                            if option_el.get('selected') == 'true':
+                                selected_options.append(option_el.get('title'))
+                    multi_value = ', '.join(selected_options) if selected_options else None
+                    row.append(safe_value(multi_value))
+                elif field['attribute']:
+                    value = report.get(field['attribute'])
+                    row.append(safe_value(value))
+                else:
+                    element = report.find(field['xml_path'])
+                    value = element.text if element is not None else None
+                    row.append(safe_value(value))
+
+            if report_time and report_time < self.start_datetime:
+                continue
+            if report_time:
+                if report_time in seen_datetimes:
+                    duplicates.append((report_time, row))
+                else:
+                    seen_datetimes[report_time] = row
+
+    sorted_unique_rows = sorted(seen_datetimes.items())
+    sorted_duplicates = sorted(duplicates, key=lambda x: x[0])
+
+    for _, row in sorted_unique_rows:
+        main_sheet.append(row)
+
+    for _, row in sorted_duplicates:
+        duplicate_sheet.append(row)
+
+def benchmark_tak_reports(reports=10000, fields=100):
+    # The parser is a Tk window; its row building never touches the window
+    gui = object.__new__(tak_report_parser.TAKReportGUI)
+    gui.start_datetime = datetime(2025, 1, 1)
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as work_dir:
+        template_path = os.path.join(work_dir, "template.xml")
+        write_synthetic_tak_template(template_path, fields)
+        templates = gui.parse_template(template_path)
+        template_report = ET.parse(template_path).getroot().find('report')
+    report_list = [make_synthetic_tak_report(template_report, rng) for _ in range(reports)]
+    report_type, template_fields = next(iter(templates.items()))
+    print(f"Synthetic reports: {reports} reports, {len(template_fields)} columns")
+
+    # Location and geometry columns cost the same MGRS conversion on both
+    # paths; warm the MGRS cache so the timings show the field lookups being
+    # compared (the mgrs benchmark times the conversion itself).
+    legacy_process_reports_for_type(gui, report_list, report_type, template_fields, [], [], -5, 'EST')
+
+    timings = {}
+    outputs = {}
+    for name, process in (('legacy', lambda *args: legacy_process_reports_for_type(gui, *args)),
+                          ('plan', gui.process_reports_for_type)):
+        main_rows, duplicate_rows = [], []
+        start = time.perf_counter()
+        process(report_list, report_type, template_fields, main_rows, duplicate_rows, -5, 'EST')
+        timings[name] = time.perf_counter() - start
+        outputs[name] = (main_rows, duplicate_rows)
+    # The old exports deleted column F from the finished sheets
+    outputs['legacy'] = tuple([tak_report_parser.export_row(row) for row in rows] for rows in outputs['legacy'])
+
+    print(f"Per-field subtree searches: {timings['legacy']:8.2f} s ({reports / timings['legacy']:10,.0f} reports/s)")
+    print(f"Compiled plan + report index: {timings['plan']:7.2f} s ({reports / timings['plan']:10,.0f} reports/s)")
+    print(f"Speedup: {timings['legacy'] / timings['plan']:.1f}x, identical output: {outputs['legacy'] == outputs['plan']}")
+
+
+def time_workbook_save(path, rows, write_only):
+    start = time.perf_counter()
+    if write_only:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title="SPOTREP")
+        for row in rows:
+            sheet.append(tak_report_parser.export_row(row))
+    else:
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "SPOTREP"
+        for row in rows:
+            sheet.append(row)
+        sheet.delete_cols(6)
+    workbook.save(path)
+    return time.perf_counter() - start
+
+
+def benchmark_tak_workbook(rows=10000, columns=50):
+    rng = random.Random(1)
+    values = [f"value {i}" for i in range(500)] + [' ']
+    sheet_rows = [[f"Field {i}" for i in range(columns)]]
+    sheet_rows += [[rng.choice(values) for _ in range(columns)] for _ in range(rows)]
+    print(f"Synthetic sheet: {rows} rows, {columns} columns")
+
+    timings = {}
+    contents = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, write_only in (('legacy', False), ('write_only', True)):
+            path = os.path.join(work_dir, f"{name}.xlsx")
+            timings[name] = time_workbook_save(path, sheet_rows, write_only)
+            workbook = load_workbook(path, read_only=True)
+            contents[name] = list(workbook.active.iter_rows(values_only=True))
+            workbook.close()
+
+    print(f"Workbook + delete_cols(6):    {timings['legacy']:8.2f} s ({rows / timings['legacy']:10,.0f} rows/s)")
+    print(f"Write-only, column left out:  {timings['write_only']:8.2f} s ({rows / timings['write_only']:10,.0f} rows/s)")
+    print(f"Speedup: {timings['legacy'] / timings['write_only']:.1f}x, identical output: {contents['legacy'] == contents['write_only']}")
+
+
+def benchmark_mgrs(points=20000, distinct=5000):
+    rng = random.Random(1)
+    # Report positions cluster around a few operating areas and repeat; a few
+    # fall on zone and band edges, in Norway/Svalbard and in the polar caps.
+    centers = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(20)]
+    positions = [(round(lat + rng.gauss(0, 0.5), 6), round(lon + rng.gauss(0, 0.5), 6))
+                 for lat, lon in (rng.choice(centers) for _ in range(distinct))]
+    positions += [(lat, lon) for lat in (-80, -0.0, 8, 56, 64, 72, 84, 89.5) for lon in (-180, 0, 3, 9, 41.9999, 180)]
+    coordinates = [rng.choice(positions) for _ in range(points)]
+    print(f"Synthetic locations: {points} points, {len(set(coordinates))} distinct")
+
+    start = time.perf_counter()
+    expected = []
+    for lat, lon in coordinates:
+        try:
+            expected.append(str(tak_report_parser.ev.LatLon(lat, lon).toMgrs()))
+        except Exception:
+            expected.append(None)
+    pygeodesy_seconds = time.perf_counter() - start
+
+    lats, lons = zip(*coordinates)
+    start = time.perf_counter()
+    batch = tak_report_parser.latlon_to_mgrs_batch(lats, lons)
+    batch_seconds = time.perf_counter() - start
+
+    tak_report_parser.mgrs_cache.clear()
+    start = time.perf_counter()
+    tak_report_parser.cache_mgrs(coordinates)
+    cached = [tak_report_parser.mgrs_cache.get(point) for point in coordinates]
+    cached_seconds = time.perf_counter() - start
+
+    print(f"pygeodesy per point:   {pygeodesy_seconds:8.2f} s ({points / pygeodesy_seconds:10,.0f} points/s)")
+    print(f"Batch, every point:    {batch_seconds:8.2f} s ({points / batch_seconds:10,.0f} points/s)")
+    print(f"Batch + cache:         {cached_seconds:8.2f} s ({points / cached_seconds:10,.0f} points/s)")
+    print(f"Speedup: {pygeodesy_seconds / cached_seconds:.1f}x, identical output: {batch == expected and cached == expected}")
+
+
+def legacy_convert_to_timezone(unix_timestamp, tz_offset):
+    if pd.isna(unix_timestamp):
+        return None
+    utc_time = datetime.fromtimestamp(unix_timestamp / 1000, tz=timezone.utc)
+    local_time = utc_time.astimezone(timezone(timedelta(hours=tz_offset)))
+    return local_time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def benchmark_geochat_times(rows=1000000):
+    rng = np.random.default_rng(1)
+    # A few years of chat in milliseconds, with the odd missing sentTime
+    timestamps = rng.integers(1_600_000_000_000, 1_700_000_000_000, rows).astype(np.float64)
+    timestamps[rng.random(rows) < 0.01] = np.nan
+    column = pd.Series(timestamps)
+    print(f"Synthetic chat column: {rows} timestamps")
+
+    start = time.perf_counter()
+    legacy = column.apply(legacy_convert_to_timezone, tz_offset=-5)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = geochat_parser.convert_timestamps(column, -5)
+    vectorized_seconds = time.perf_counter() - start
+
+    print(f"Series.apply per row:  {legacy_seconds:8.2f} s ({rows / legacy_seconds:12,.0f} rows/s)")
+    print(f"datetime64 column:     {vectorized_seconds:8.2f} s ({rows / vectorized_seconds:12,.0f} rows/s)")
+    print(f"Speedup: {legacy_seconds / vectorized_seconds:.1f}x, identical output: {legacy.tolist() == vectorized.tolist()}")
+
+
+def write_synthetic_statesaver(path, rows, conversations=200, seed=1):
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Chat (id INTEGER PRIMARY KEY, conversationId TEXT, receiveTime INTEGER, sentTime INTEGER, "
+                 "message TEXT, senderCallsign TEXT, status TEXT)")
+    conn.execute("CREATE INDEX ChatSentTime ON Chat (sentTime)")
+    conn.execute("CREATE TABLE Groups (conversationId TEXT, conversationName TEXT, createdLocally INTEGER, destinations TEXT, parent TEXT)")
+    # Some conversations are listed twice (the later name wins) and some have no name
+    groups = [(f"conv-{i}", f"Room {i}" if i % 10 else None, 0, '', '') for i in range(conversations)]
+    groups += [(f"conv-{i}", f"Renamed Room {i}", 1, '', '') for i in range(0, conversations, 7)]
+    conn.executemany("INSERT INTO Groups VALUES (?, ?, ?, ?, ?)", groups)
+    sent = np.sort(rng.integers(1_600_000_000_000, 1_700_000_000_000, rows))
+    chat = zip((f"conv-{i}" for i in rng.integers(0, conversations + 20, rows).tolist()),
+               (sent + rng.integers(0, 5000, rows)).tolist(), sent.tolist(),
+               (f"message {i}" for i in range(rows)),
+               (f"CALLSIGN-{i}" for i in rng.integers(0, 100, rows).tolist()),
+               ('READ' for _ in range(rows)))
+    conn.executemany("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", chat)
+    conn.commit()
+    conn.close()
+
+
+def legacy_read_chat(db_path):
+    conn = sqlite3.connect(db_path)
+    chat_df = pd.read_sql_query("SELECT conversationId, receiveTime, sentTime, message, senderCallsign, status FROM Chat", conn)
+    groups_df = pd.read_sql_query("SELECT conversationId, conversationName, createdLocally, destinations, parent FROM Groups", conn)
+    conn.close()
+    conversation_mapping = dict(zip(groups_df['conversationId'], groups_df['conversationName']))
+    chat_df['conversationId'] = chat_df['conversationId'].map(conversation_mapping).fillna(chat_df['conversationId'])
+    return chat_df
+
+
+def sql_read_chat(db_path, start_ms=None, end_ms=None, conversations=()):
+    conn = geochat_parser.open_statesaver(db_path)
+    query, params = geochat_parser.build_chat_query(start_ms, end_ms, conversations)
+    chat_df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    return chat_df
+
+
+def benchmark_geochat_query(rows=1000000):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "statesaver.sqlite")
+        write_synthetic_statesaver(db_path, rows)
+        print(f"Synthetic statesaver: {rows} chat rows")
+
+        start = time.perf_counter()
+        legacy = legacy_read_chat(db_path)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        joined = sql_read_chat(db_path)
+        joined_seconds = time.perf_counter() - start
+
+        # One day of one renamed and one unnamed conversation
+        start_ms, end_ms = 1_650_000_000_000, 1_650_086_400_000
+        conversations = ['Renamed Room 14', 'conv-20']
+        start = time.perf_counter()
+        window = sql_read_chat(db_path, start_ms, end_ms, conversations)
+        window_seconds = time.perf_counter() - start
+
+    expected_window = legacy[(legacy['sentTime'] >= start_ms) & (legacy['sentTime'] < end_ms)
+                             & legacy['conversationId'].isin(['Renamed Room 14', 'conv-20'])].reset_index(drop=True)
+    print(f"Full read + pandas map:    {legacy_seconds:8.2f} s ({rows / legacy_seconds:12,.0f} rows/s)")
+    print(f"SQL join, every row:       {joined_seconds:8.2f} s ({rows / joined_seconds:12,.0f} rows/s), identical output: {legacy.equals(joined)}")
+    print(f"SQL join, 1 day, 2 rooms:  {window_seconds:8.2f} s ({len(window)} rows), identical output: {expected_window.equals(window)}")
+
+
+def legacy_export_chat(db_path, export_path):
+    chat_df = legacy_read_chat(db_path)
+    conn = sqlite3.connect(db_path)
+    groups_df = pd.read_sql_query(geochat_parser.GROUPS_QUERY, conn)
+    conn.close()
+    chat_df['receiveTime'] = geochat_parser.convert_timestamps(chat_df['receiveTime'], -5)
+    chat_df['sentTime'] = geochat_parser.convert_timestamps(chat_df['sentTime'], -5)
+    with pd.ExcelWriter(export_path, engine='xlsxwriter') as writer:
+        chat_df.to_excel(writer, sheet_name='Chat Data', index=False)
+        groups_df.to_excel(writer, sheet_name='Groups Data', index=False)
+
+
+def streaming_export_chat(db_path, export_path, export_format):
+    conn = geochat_parser.open_statesaver(db_path)
+    groups_df = pd.read_sql_query(geochat_parser.GROUPS_QUERY, conn)
+    chat_query, chat_params = geochat_parser.build_chat_query()
+    sink = geochat_parser.EXPORT_SINKS[export_format][1](export_path)
+    geochat_parser.export_chat(conn, chat_query, chat_params, -5, sink)
+    sink.close(groups_df)
+    conn.close()
+
+
+def timed_call(function, args):
+    start = time.perf_counter()
+    function(*args)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kB on Linux; the resource module does not exist on Windows
+    return seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+
+
+def measure_in_child(function, *args):
+    """Runs function(*args) in a fresh process; returns (seconds, peak resident MB of that process or None)."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(timed_call, function, args).result()
+
+
+def benchmark_geochat_export(rows=500000):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "statesaver.sqlite")
+        write_synthetic_statesaver(db_path, rows)
+        print(f"Synthetic statesaver: {rows} chat rows")
+
+        runs = [("Whole frame, ExcelWriter:", legacy_export_chat, "legacy.xlsx", ()),
+                ("Chunks, constant_memory:", streaming_export_chat, "streaming.xlsx", ('Excel',)),
+                ("Chunks, CSV:", streaming_export_chat, "streaming.csv", ('CSV',))]
+        if geochat_parser.pq is not None:
+            runs.append(("Chunks, Parquet:", streaming_export_chat, "streaming.parquet", ('Parquet',)))
+        for label, function, name, extra in runs:
+            seconds, peak_mb = measure_in_child(function, db_path, os.path.join(work_dir, name), *extra)
+            peak = f", peak {peak_mb:8.1f} MB" if peak_mb is not None else ""
+            print(f"{label:26} {seconds:8.2f} s ({rows / seconds:10,.0f} rows/s){peak}")
+
+        sheets = {}
+        for name in ("legacy.xlsx", "streaming.xlsx"):
+            workbook = load_workbook(os.path.join(work_dir, name), read_only=True)
+            sheets[name] = [list(sheet.iter_rows(values_only=True)) for sheet in workbook]
+            workbook.close()
+    print(f"Identical workbooks: {sheets['legacy.xlsx'] == sheets['streaming.xlsx']}")
+
+
+class FrameSink:
+    """Collects what export_chat_batch writes, to compare with a pandas merge."""
+    def __init__(self):
+        self.frames = []
+
+    def write(self, chat_df):
+        self.frames.append(chat_df)
+
+    def close(self, groups_df):
+        return pd.concat(self.frames, ignore_index=True)
+
+
+def pandas_merge_chat(db_paths, folder):
+    frames = []
+    query, params = geochat_parser.build_chat_query(base_query=geochat_parser.BATCH_CHAT_QUERY)
+    for db_path in db_paths:
+        conn = geochat_parser.open_statesaver(db_path)
+        chat_df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        chat_df['sourceDatabase'] = os.path.relpath(db_path, folder)
+        frames.append(chat_df)
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.drop_duplicates(subset=['rawConversationId', 'senderCallsign', 'rawSentTime', 'message'], ignore_index=True)
+    merged = merged.drop(columns=['rawConversationId', 'rawSentTime'])
+    merged['receiveTime'] = geochat_parser.convert_timestamps(merged['receiveTime'], -5)
+    merged['sentTime'] = geochat_parser.convert_timestamps(merged['sentTime'], -5)
+    return merged
+
+
+def benchmark_geochat_batch(databases=12, rows=100000):
+    with tempfile.TemporaryDirectory() as work_dir:
+        # One folder per device; every fourth device saw the same messages
+        for device in range(databases):
+            os.makedirs(os.path.join(work_dir, f"device-{device:02d}"))
+            write_synthetic_statesaver(os.path.join(work_dir, f"device-{device:02d}", "statesaver.sqlite"), rows, seed=device % 4)
+        db_paths = geochat_parser.find_statesavers(work_dir)
+        print(f"Synthetic statesavers: {len(db_paths)} databases of {rows} chat rows")
+        start = time.perf_counter()
+        expected = pandas_merge_chat(db_paths, work_dir)
+        pandas_seconds = time.perf_counter() - start
+        print(f"One at a time, pandas merge: {pandas_seconds:8.2f} s ({len(expected)} unique rows)")
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            sink = FrameSink()
+            start = time.perf_counter()
+            exported, duplicates, _groups_df, _errors = geochat_parser.export_chat_batch(
+                db_paths, work_dir, -5, sink, workers=workers)
+            seconds = time.perf_counter() - start
+            merged = sink.close(None)
+            print(f"Process pool, {workers:2d} worker(s): {seconds:8.2f} s ({exported} rows, {duplicates} duplicates), "
+                  f"identical output: {expected.equals(merged)}")
+
+
+def benchmark_geochat_incremental(rows=1000000, new_rows=1000):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "statesaver.sqlite")
+        write_synthetic_statesaver(db_path, rows)
+        print(f"Synthetic statesaver: {rows} chat rows, then {new_rows} more")
+        output_path = geochat_parser.incremental_export_path(db_path, work_dir, '.csv')
+
+        start = time.perf_counter()
+        geochat_parser.export_chat_incremental(db_path, output_path, 'CSV', -5)
+        first_seconds = time.perf_counter() - start
+
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         ((f"conv-{i % 200}", 1_700_000_000_000 + i, 1_700_000_000_000 + i, f"new message {i}", "CALLSIGN-1", "READ")
+                          for i in range(new_rows)))
+        conn.commit()
+        conn.close()
+
+        start = time.perf_counter()
+        added, total, _written, rebuilt = geochat_parser.export_chat_incremental(db_path, output_path, 'CSV', -5)
+        refresh_seconds = time.perf_counter() - start
+
+        full_path = os.path.join(work_dir, "full.csv")
+        streaming_export_chat(db_path, full_path, 'CSV')
+        with open(output_path, 'rb') as incremental, open(full_path, 'rb') as full:
+            identical = incremental.read() == full.read()
+    print(f"First export (every row): {first_seconds:8.2f} s")
+    print(f"Refresh ({added} new rows):  {refresh_seconds:8.2f} s, rebuilt: {rebuilt}, "
+          f"{total} rows in total, identical to a full export: {identical}")
+
+
+BENCHMARKS = {
+    'cot_extractor': benchmark_cot_extractor,
+    'tak_reports': benchmark_tak_reports,
+    'tak_workbook': benchmark_tak_workbook,
+    'mgrs': benchmark_mgrs,
+    'geochat_times': benchmark_geochat_times,
+    'geochat_query': benchmark_geochat_query,
+    'geochat_export': benchmark_geochat_export,
+    'geochat_batch': benchmark_geochat_batch,
+    'geochat_incremental': benchmark_geochat_incremental,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmarks.py [{'|'.join(BENCHMARKS)}] [size]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*(int(arg) for arg in sys.argv[2:]))
@@ -1,8 +1,22 @@
+import hashlib
+import heapq
+import itertools
+import json
+import mmap
 import os
 import re
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
 import traceback
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook  # You can remove this import if you're no longer using Excel at all.
 import customtkinter as ctk
@@ -10,6 +24,12 @@ from tkinter import filedialog, messagebox
 
 import pytz  # We'll keep this for the Zulu->EST conversions
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
 #############################
 # Global State Class
 #############################
@@ -23,6 +43,7 @@ class GlobalState:
     startTime = None
     endTime = None
     processedFilePath = None
+    exportWorkers = os.cpu_count() or 1
 
 #############################
 # Utility Functions
@@ -38,6 +59,515 @@ def createParsedLogsFolder(filePath):
         os.makedirs(parsedLogsPath)
     return parsedLogsPath
 
+#############################
+# Streaming Event Reader
+#############################
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>'
+EVENT_END_TAG = b'</event>'
+READ_CHUNK_SIZE = 4 * 1024 * 1024  # bytes read from disk per call
+MAX_PENDING_EVENT_BYTES = 64 * 1024 * 1024  # longest run of bytes without </event> kept as one event
+
+def iter_event_spans(filePath, start_offset=0, end_offset=None, chunk_size=READ_CHUNK_SIZE,
+                     max_event_bytes=MAX_PENDING_EVENT_BYTES, log_callback=None):
+    """
+    Reads a CoT log in fixed-size chunks and yields (offset, event_bytes) for
+    every complete event, where event_bytes runs from the end of the previous
+    </event> up to and including this event's </event> -- the same pieces that
+    content.split(b'</event>') used to produce, with the closing tag put back.
+    Bytes after the last </event> are ignored.
+
+    Only one chunk plus one partial event is held in memory, so the log size
+    does not matter. A partial event that grows past max_event_bytes (a file
+    that isn't a CoT log, or a corrupt stretch of one) is dropped with a
+    warning, and reading carries on from the next </event>. start_offset and
+    end_offset restrict reading to a byte range and should sit on event
+    boundaries.
+    """
+    tag_len = len(EVENT_END_TAG)
+    with open(filePath, 'rb') as f:
+        f.seek(start_offset)
+        position = start_offset  # file offset of buffer[0]
+        buffer = bytearray()
+        skipping = False  # dropping an oversized partial event up to its </event>
+        while True:
+            read_size = chunk_size
+            if end_offset is not None:
+                read_size = min(chunk_size, end_offset - (position + len(buffer)))
+                if read_size <= 0:
+                    break
+            chunk = f.read(read_size)
+            if not chunk:
+                break
+
+            # Only rescan the tail of the old buffer that could hold a split tag
+            search_from = max(0, len(buffer) - tag_len + 1)
+            buffer += chunk
+            start = 0
+            end = buffer.find(EVENT_END_TAG, search_from)
+            if skipping and end != -1:
+                start = end + tag_len
+                skipping = False
+                end = buffer.find(EVENT_END_TAG, start)
+            while end != -1:
+                end += tag_len
+                yield position + start, bytes(buffer[start:end])
+                start = end
+                end = buffer.find(EVENT_END_TAG, start)
+
+            if len(buffer) - start > max_event_bytes:
+                if not skipping and log_callback:
+                    log_callback(f"No </event> within {max_event_bytes} bytes from offset {position + start} "
+                                 f"of {filePath}; skipping to the next </event>")
+                skipping = True
+                # Keep only what could be the start of a split </event>
+                start = len(buffer) - (tag_len - 1)
+            if start:
+                # Drop the consumed bytes in place instead of copying the rest
+                del buffer[:start]
+                position += start
+
+XML_DECLARATION_PATTERN = re.compile(re.escape(XML_DECLARATION))
+
+def without_declaration(event_str):
+    """
+    event_str (bytes or a memoryview) with every XML declaration removed; an
+    event without one is returned as it is, so a view stays zero-copy.
+    """
+    if XML_DECLARATION_PATTERN.search(event_str) is None:
+        return event_str
+    return XML_DECLARATION_PATTERN.sub(b'', event_str)
+
+def iter_events(filePath, **kwargs):
+    """Yields the bytes of every complete event in the file (see iter_event_spans)."""
+    for _, event in iter_event_spans(filePath, **kwargs):
+        yield event
+
+EVENT_START_TAG_PATTERN = re.compile(rb'<event\b([^>]*)>')
+ATTRIBUTE_PATTERN = re.compile(rb'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+def scan_event_attributes(event_str):
+    """
+    Lightweight alternative to ET.fromstring(...).attrib for the <event> start
+    tag: returns its raw (still entity-escaped) attributes as {bytes: bytes},
+    or None if the span has no <event> start tag.
+    """
+    match = EVENT_START_TAG_PATTERN.search(event_str)
+    if match is None:
+        return None
+    return {name: double or single for name, double, single in ATTRIBUTE_PATTERN.findall(match.group(1))}
+
+def progress_percent(offset, file_size):
+    if not file_size:
+        return 100
+    return min(100, offset * 100 // file_size)
+
+#############################
+# Memory-Mapped Event Scanner
+#############################
+SCAN_WINDOW_BYTES = 64 * 1024 * 1024  # bytes compared per vectorized pass
+EVENT_OPEN_TAG = b'<event'
+EVENT_TIME_PATTERN = re.compile(rb'<event\b[^>]*?\stime\s*=\s*["\']([^"\']*)')
+CONTACT_CALLSIGN_PATTERN = re.compile(rb'<contact\b[^>]*?\scallsign\s*=\s*["\']([^"\']*)')
+
+class MappedCotLog:
+    """
+    Read-only memory map of a CoT log. Event boundaries are located with a
+    vectorized NumPy search over the mapped pages, and events are exposed as
+    zero-copy memoryview slices (iter_event_views), so scans never build
+    per-event bytes objects.
+
+    Use it as a context manager; views taken from `view` must be released
+    before it closes.
+    """
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.file = open(filePath, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # mmap cannot map an empty file
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.buffer = np.frombuffer(self.map, dtype=np.uint8)
+        self.view = memoryview(self.map)
+        self._event_ends = None
+        self._event_spans = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        self.buffer = None
+        self.view.release()
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def iter_found(self, pattern, start_offset=0, end_offset=None):
+        """
+        Yields, window by window, an array of the offsets of every occurrence
+        of pattern that lies within [start_offset, end_offset).
+        """
+        end_offset = self.size if end_offset is None else min(end_offset, self.size)
+        for window_start in range(start_offset, end_offset, SCAN_WINDOW_BYTES):
+            window_end = min(end_offset, window_start + SCAN_WINDOW_BYTES + len(pattern) - 1)
+            yield self.find_in_window(pattern, window_start, window_end)
+
+    def find_in_window(self, pattern, window_start, window_end):
+        # Kept out of iter_found so no slice of the map stays alive between windows
+        window = self.buffer[window_start:window_end]
+        # Start from every position holding the first byte, then narrow on each following byte
+        candidates = np.flatnonzero(window[:max(0, len(window) - len(pattern) + 1)] == pattern[0])
+        for i in range(1, len(pattern)):
+            candidates = candidates[window[candidates + i] == pattern[i]]
+        return (candidates + window_start).astype(np.int64)
+
+    def find_all(self, pattern):
+        """Offsets of every occurrence of pattern, found window by window with NumPy."""
+        found = list(self.iter_found(pattern))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def iter_event_ends(self, start_offset=0, end_offset=None):
+        """Yields, window by window, the offsets just past every </event> in [start_offset, end_offset)."""
+        for found in self.iter_found(EVENT_END_TAG, start_offset, end_offset):
+            yield found + len(EVENT_END_TAG)
+
+    def iter_event_views(self, start_offset=0, end_offset=None):
+        """
+        Yields (offset, view) for the same pieces as iter_event_spans, where
+        view is a zero-copy memoryview into the map. Each view is released
+        once the next one is asked for, so copy anything that must outlive
+        it. The boundaries are found one scan window at a time.
+        """
+        start = start_offset
+        for ends in self.iter_event_ends(start_offset, end_offset):
+            for end in ends.tolist():
+                with self.view[start:end] as event:
+                    yield start, event
+                start = end
+
+    def event_ends(self):
+        """Offsets just past every </event>, i.e. the boundaries iter_event_spans splits on."""
+        if self._event_ends is None:
+            self._event_ends = self.find_all(EVENT_END_TAG) + len(EVENT_END_TAG)
+        return self._event_ends
+
+    def event_spans(self):
+        """(start, end) of each event, from its <event start tag through </event>."""
+        if self._event_spans is not None:
+            return self._event_spans
+        ends = self.event_ends()
+        piece_starts = np.concatenate(([0], ends[:-1]))
+        tag_starts = self.find_all(EVENT_OPEN_TAG)
+        first_tag = np.searchsorted(tag_starts, piece_starts)
+        starts = np.append(tag_starts, self.size)[first_tag]
+        has_tag = starts < ends
+        self._event_spans = (starts[has_tag], ends[has_tag])
+        return self._event_spans
+
+    def next_event_end(self, offset):
+        found = self.map.find(EVENT_END_TAG, offset) if self.size else -1
+        return self.size if found == -1 else found + len(EVENT_END_TAG)
+
+    def scan_values(self, pattern):
+        """Yields the first group of pattern for every event in which it matches."""
+        for start, end in zip(*self.event_spans()):
+            match = pattern.search(self.map, int(start), int(end))
+            if match:
+                yield match.group(1)
+
+    def count_events(self):
+        return len(self.event_spans()[0])
+
+    def time_range(self):
+        times = [value for value in self.scan_values(EVENT_TIME_PATTERN) if value]
+        if not times:
+            return None, None
+        return min(times).decode('utf-8', 'replace'), max(times).decode('utf-8', 'replace')
+
+    def callsigns(self):
+        return {value.decode('utf-8', 'replace') for value in self.scan_values(CONTACT_CALLSIGN_PATTERN)}
+
+#############################
+# Event Index
+#############################
+INDEX_SUFFIX = ".cotidx"
+INDEX_VERSION = "1"
+INDEX_FINGERPRINT_BYTES = 1024 * 1024
+INDEX_BATCH_SIZE = 10000
+
+def event_index_path(filePath):
+    return os.path.join(createParsedLogsFolder(filePath), os.path.basename(filePath) + INDEX_SUFFIX)
+
+def file_fingerprint(filePath):
+    """Cheap content hash: SHA-1 over the file size and its first and last megabyte."""
+    size = os.path.getsize(filePath)
+    digest = hashlib.sha1(str(size).encode())
+    with open(filePath, 'rb') as f:
+        digest.update(f.read(INDEX_FINGERPRINT_BYTES))
+        if size > INDEX_FINGERPRINT_BYTES:
+            f.seek(max(INDEX_FINGERPRINT_BYTES, size - INDEX_FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def index_event(event_str):
+    """Returns (parsed, uid, time, type, callsign, lat, lon) for one raw event."""
+    try:
+        root = ET.fromstring(without_declaration(event_str))
+    except ET.ParseError:
+        return 0, None, None, None, None, None, None
+
+    contact = root.find(".//contact")
+    callsign = contact.get('callsign') if contact is not None else None
+    lat = lon = None
+    point = root.find("point")
+    if point is not None:
+        try:
+            lat = float(point.get('lat'))
+            lon = float(point.get('lon'))
+        except (TypeError, ValueError):
+            lat = lon = None
+    return 1, root.get('uid'), root.get('time'), root.get('type'), callsign, lat, lon
+
+def build_event_index(filePath, index_path, index_key, log_callback):
+    file_size = os.path.getsize(filePath)
+    temp_path = index_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("""
+            CREATE TABLE events (
+                offset INTEGER PRIMARY KEY, length INTEGER NOT NULL, parsed INTEGER NOT NULL,
+                uid TEXT, time TEXT, type TEXT, callsign TEXT, lat REAL, lon REAL
+            )
+        """)
+        batch = []
+        with MappedCotLog(filePath) as cot_log:
+            for idx, (offset, event_str) in enumerate(cot_log.iter_event_views()):
+                batch.append((offset, len(event_str)) + index_event(event_str))
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    batch = []
+                if idx % 10000 == 0:
+                    log_callback(f"Indexed {idx} events ({progress_percent(offset, file_size)}% of file)...")
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        conn.execute("CREATE INDEX events_time ON events (time)")
+        conn.execute("CREATE INDEX events_callsign ON events (callsign)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", index_key.items())
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(temp_path, index_path)
+
+def open_event_index(filePath, log_callback):
+    """
+    Returns a sqlite3 connection to the file's event index sidecar
+    (ParsedLogs/<name>.cotidx), building it first if it is missing or the
+    file's size, mtime or fingerprint no longer match.
+
+    Each row of the events table describes one span from iter_event_spans:
+    byte offset/length, whether it parsed, and its uid, time, type, contact
+    callsign and point lat/lon.
+    """
+    index_path = event_index_path(filePath)
+    stat = os.stat(filePath)
+    index_key = {
+        'version': INDEX_VERSION,
+        'size': str(stat.st_size),
+        'mtime_ns': str(stat.st_mtime_ns),
+        'fingerprint': file_fingerprint(filePath),
+    }
+    if os.path.exists(index_path):
+        conn = sqlite3.connect(index_path)
+        try:
+            stored_key = dict(conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.Error:
+            stored_key = {}
+        if stored_key == index_key:
+            log_callback(f"Using event index: {index_path}")
+            return conn
+        conn.close()
+
+    log_callback(f"Building event index for: {filePath}")
+    build_event_index(filePath, index_path, index_key, log_callback)
+    return sqlite3.connect(index_path)
+
+def read_event_spans(filePath, spans):
+    """Yields the raw bytes of each (offset, length) span, reading only those byte ranges."""
+    with open(filePath, 'rb') as f:
+        for offset, length in spans:
+            f.seek(offset)
+            yield f.read(length)
+
+#############################
+# Duplicate Removal Engine
+#############################
+DEDUPE_MEMORY_BYTES = 512 * 1024 ** 2  # key hashes held in memory before switching to the external sort
+DEDUPE_BATCH_EVENTS = 65536  # events whose keys are checked against the seen set at once
+DEDUPE_RUN_RECORDS = 2000000  # records sorted in memory per spill run
+DEDUPE_RECORD = struct.Struct('<QQQ')
+
+def event_key_hash(event_str):
+    """
+    64-bit hash of an event's (uid, time) taken from its start tag, or None
+    when the span has no <event> start tag at all.
+    """
+    attributes = scan_event_attributes(event_str)
+    if attributes is None:
+        return None
+    key = b'\x1f'.join((attributes.get(b'uid', b'\x00'), attributes.get(b'time', b'\x00')))
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+class KeyHashSet:
+    """
+    Set of 64-bit key hashes stored as sorted np.uint64 runs, 8 bytes a key.
+    Like a binary counter, a new run is merged into the newest one while that
+    is no larger, so there are O(log n) runs, a lookup is one searchsorted per
+    run, and each key is re-sorted O(log n) times. Merging briefly needs a
+    copy of the runs being merged.
+    """
+    def __init__(self):
+        self.runs = []
+        self.nbytes = 0
+        self.count = 0
+
+    def contains(self, keys):
+        """Boolean mask of which of the np.uint64 keys are in the set."""
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[positions] == keys
+        return found
+
+    def add(self, keys):
+        """Adds np.uint64 keys that are unique and not in the set yet."""
+        if not len(keys):
+            return
+        run = np.sort(keys)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]))
+        self.runs.append(run)
+        self.count += len(keys)
+        self.nbytes = self.count * 8
+
+def dedupe_in_memory(filePath, out_file, log_callback, max_key_bytes=DEDUPE_MEMORY_BYTES,
+                     batch_size=DEDUPE_BATCH_EVENTS):
+    """
+    Single pass over the memory-mapped file: keeps the key hashes in a
+    KeyHashSet and writes each first occurrence straight out of the map.
+    Keys are checked batch_size events at a time; a batch holds only the
+    events' offsets. Returns (total, kept), or None as soon as the hashes
+    take more than max_key_bytes; the caller then starts over with the
+    external sort.
+    """
+    file_size = os.path.getsize(filePath)
+    seen = KeyHashSet()
+    batch_keys = []
+    batch_spans = []
+    total = 0
+
+    with MappedCotLog(filePath) as cot_log:
+        def flush():
+            keys = np.array(batch_keys, dtype=np.uint64)
+            # First occurrence of each key within the batch, in file order
+            first = np.sort(np.unique(keys, return_index=True)[1])
+            new = first[~seen.contains(keys[first])]
+            for position in new.tolist():
+                start, end = batch_spans[position]
+                with cot_log.view[start:end] as event_str:
+                    out_file.write(without_declaration(event_str))
+            seen.add(keys[new])
+            batch_keys.clear()
+            batch_spans.clear()
+
+        for total, (offset, event_str) in enumerate(cot_log.iter_event_views(), start=1):
+            key_hash = event_key_hash(event_str)
+            if key_hash is not None:
+                batch_keys.append(key_hash)
+                batch_spans.append((offset, offset + len(event_str)))
+                if len(batch_keys) >= batch_size:
+                    flush()
+                    if seen.nbytes > max_key_bytes:
+                        return None
+            if total % 100000 == 0:
+                log_callback(f"Processed {total} events ({progress_percent(offset, file_size)}% of file)...")
+        if batch_keys:
+            flush()
+    return total, seen.count
+
+def write_sorted_runs(records, work_dir, prefix, run_records=DEDUPE_RUN_RECORDS):
+    """Sorts records in memory-sized batches and writes each batch to its own run file."""
+    run_paths = []
+    batch = []
+
+    def flush():
+        batch.sort()
+        run_path = os.path.join(work_dir, f"{prefix}_{len(run_paths):05d}.run")
+        with open(run_path, 'wb') as run_file:
+            for record in batch:
+                run_file.write(DEDUPE_RECORD.pack(*record))
+        run_paths.append(run_path)
+        batch.clear()
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= run_records:
+            flush()
+    if batch:
+        flush()
+    return run_paths
+
+def iter_run(run_path):
+    with open(run_path, 'rb') as run_file:
+        while True:
+            block = run_file.read(DEDUPE_RECORD.size * 65536)
+            if not block:
+                break
+            yield from DEDUPE_RECORD.iter_unpack(block)
+
+def dedupe_external(filePath, out_file, work_dir, log_callback):
+    """
+    External-sort mode for inputs whose key set will not fit in memory:
+      1. stream (hash, offset, length) records into sorted run files,
+      2. merge the runs and keep the lowest offset of every hash,
+      3. sort the survivors back into file order and copy their bytes out.
+    Memory is bounded by DEDUPE_RUN_RECORDS regardless of input size.
+    """
+    file_size = os.path.getsize(filePath)
+    counts = {'total': 0}
+
+    with MappedCotLog(filePath) as cot_log:
+        def key_records():
+            for counts['total'], (offset, event_str) in enumerate(cot_log.iter_event_views(), start=1):
+                key_hash = event_key_hash(event_str)
+                if key_hash is not None:
+                    yield key_hash, offset, len(event_str)
+                if counts['total'] % 100000 == 0:
+                    log_callback(f"Hashed {counts['total']} events ({progress_percent(offset, file_size)}% of file)...")
+
+        key_runs = write_sorted_runs(key_records(), work_dir, "keys")
+        log_callback(f"Merging {len(key_runs)} sorted key runs...")
+
+        def first_occurrences():
+            previous_hash = None
+            for key_hash, offset, length in heapq.merge(*(iter_run(path) for path in key_runs)):
+                if key_hash != previous_hash:
+                    previous_hash = key_hash
+                    yield offset, length, 0
+
+        survivor_runs = write_sorted_runs(first_occurrences(), work_dir, "survivors")
+        kept = 0
+        for offset, length, _ in heapq.merge(*(iter_run(path) for path in survivor_runs)):
+            with cot_log.view[offset:offset + length] as event_str:
+                out_file.write(without_declaration(event_str))
+            kept += 1
+    return counts['total'], kept
+
 #############################
 # File Processing Functions
 #############################
@@ -73,13 +603,15 @@ def loadFiles(filePath):
     elif os.path.isdir(filePath):
         for root, dirs, files in os.walk(filePath):
             for file in files:
+                if file.endswith(INDEX_SUFFIX):
+                    continue
                 fullPath = os.path.join(root, file)
                 GlobalState.selectedFiles.append(fullPath)
         GlobalState.operationHistory.append(f"Loaded folder: {filePath}")
     else:
         raise ValueError("The provided path is neither a file nor a folder. Please check the path and try again.")
 
-def removeDuplicates(filePath, log_callback):
+def removeDuplicates(filePath, log_callback, spill_to_disk=False):
     if not os.path.isfile(filePath):
         log_callback(f"{filePath} is not a valid file.")
         return
@@ -88,35 +620,23 @@ def removeDuplicates(filePath, log_callback):
         log_callback("Operation canceled by the user.")
         return
     log_callback(f"Removing duplicates from: {filePath}")
-    with open(filePath, 'rb') as f:
-        content = f.read()
-    content = content.replace(b'<?xml version="1.0" encoding="UTF-8"?>', b'')
-    events = content.split(b'</event>')
-    seen = set()
-    unique_events = []
-    total = len(events) - 1
-    for idx, event in enumerate(events[:-1]):
-        event_str = event + b'</event>'
-        try:
-            root = ET.fromstring(event_str)
-            uid = root.get('uid')
-            time = root.get('time')
-            if time:
-                time.split('.')[0]
-            key = (uid, time)
-            if key not in seen:
-                seen.add(key)
-                unique_events.append(event_str)
-        except ET.ParseError:
-            pass
-        if idx % 1000 == 0:
-            log_callback(f"Processed {idx}/{total} events...")
     newFileName = "NoDuplicates_" + os.path.basename(filePath)
     newFilePath = os.path.join(os.path.dirname(filePath), newFileName)
     with open(newFilePath, 'wb') as cleanedFile:
-        cleanedFile.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
-        for event in unique_events:
-            cleanedFile.write(event)
+        cleanedFile.write(XML_DECLARATION + b'\n')
+        result = None
+        if not spill_to_disk:
+            result = dedupe_in_memory(filePath, cleanedFile, log_callback)
+            if result is None:
+                log_callback(f"Key hashes passed {DEDUPE_MEMORY_BYTES // 1024 ** 2} MB; starting over with an external sort.")
+                cleanedFile.seek(len(XML_DECLARATION) + 1)
+                cleanedFile.truncate()
+        if result is None:
+            log_callback("Spilling key hashes to disk for an external sort.")
+            with tempfile.TemporaryDirectory(dir=os.path.dirname(newFilePath)) as work_dir:
+                result = dedupe_external(filePath, cleanedFile, work_dir, log_callback)
+        total, kept = result
+    log_callback(f"Kept {kept} of {total} events.")
     log_callback(f"Duplicates removed. Cleaned file saved as: {newFileName}")
     GlobalState.selectedFiles = [newFilePath]
 
@@ -136,7 +656,95 @@ def cleanTimeString(time_str):
     seconds = seconds.zfill(2)[:2]
     return f"{date_part}T{hours}:{minutes}:{seconds}Z"
 
-def adjustEventTimes(filePath, new_time_str, log_callback):
+def parseEventTime(time_str):
+    event_time_str = time_str.split('.')[0]
+    event_time_str = cleanTimeString(event_time_str)
+    try:
+        return datetime.strptime(event_time_str, "%Y-%m-%dT%H:%M:%SZ")
+    except ValueError:
+        return datetime.strptime(event_time_str, "%Y-%m-%dT%H:%M:%S")
+
+TIME_ATTRIBUTE_PATTERN = re.compile(rb'(\s(time|start|stale)\s*=\s*["\'])([^"\']*)')
+TIME_SHIFT_CACHE_SIZE = 100000
+
+def parse_iso_second(value):
+    """Fixed-format parse of b'YYYY-MM-DDTHH:MM:SS'; returns None if it doesn't fit."""
+    if (len(value) != 19 or value[4] != 0x2D or value[7] != 0x2D or value[10] != 0x54
+            or value[13] != 0x3A or value[16] != 0x3A):
+        return None
+    try:
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                         int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except ValueError:
+        return None
+
+class EventTimeShifter:
+    """
+    Shifts the time/start/stale attributes of an event's start tag by a fixed
+    offset without parsing the XML. Only the leading YYYY-MM-DDTHH:MM:SS of each
+    value is rewritten; fractional seconds, the Z and every other byte of the
+    event are copied through untouched. Shifted seconds are cached because
+    consecutive events nearly always share them.
+    """
+    def __init__(self, time_offset):
+        self.time_offset = time_offset
+        self.cache = {}
+        self.found_time = False
+
+    def shift_value(self, value):
+        """Raises ValueError if the value isn't a time parseEventTime accepts."""
+        second = value[:19]
+        shifted = self.cache.get(second)
+        if shifted is None:
+            event_time = parse_iso_second(second)
+            if event_time is None:
+                # Not fixed-format: use the forgiving parser and rewrite the whole value
+                event_time = parseEventTime(value.decode('utf-8', 'replace'))
+                return (event_time + self.time_offset).strftime("%Y-%m-%dT%H:%M:%SZ").encode()
+            if len(self.cache) >= TIME_SHIFT_CACHE_SIZE:
+                self.cache.clear()
+            shifted = (event_time + self.time_offset).strftime("%Y-%m-%dT%H:%M:%S").encode()
+            self.cache[second] = shifted
+        return shifted + value[19:]
+
+    def replace_attribute(self, match):
+        if not match.group(3):
+            return match.group(0)
+        if match.group(2) == b'time':
+            self.found_time = True
+        return match.group(1) + self.shift_value(match.group(3))
+
+    def write_shifted(self, out_file, event_str):
+        """
+        Writes the event (bytes or a memoryview) from its <event> start tag on,
+        with its times shifted, to out_file. Returns False, writing nothing, if
+        it has no start tag, no time or a time/start/stale that won't parse.
+        """
+        match = EVENT_START_TAG_PATTERN.search(event_str)
+        if match is None:
+            return False
+        self.found_time = False
+        try:
+            start_tag = TIME_ATTRIBUTE_PATTERN.sub(self.replace_attribute, match.group(0))
+        except ValueError:
+            return False
+        if not self.found_time:
+            return False
+        out_file.write(start_tag)
+        out_file.write(event_str[match.end():])
+        return True
+
+def adjustEventTimes(filePath, new_time_str, log_callback, preserve_format=True):
+    """
+    Shifts every event so the first one starts at new_time_str.
+
+    By default times are rewritten in place at the byte level (EventTimeShifter),
+    keeping each event's formatting and fractional seconds. preserve_format=False
+    uses the original ElementTree round-trip, which reserializes every event.
+    Either way events are written back to back after one declaration, and
+    events with no time or a time/start/stale that won't parse are skipped and
+    counted in the log.
+    """
     if not os.path.isfile(filePath):
         log_callback(f"{filePath} is not a valid file.")
         return
@@ -149,52 +757,65 @@ def adjustEventTimes(filePath, new_time_str, log_callback):
         log_callback(f"Invalid time format: {new_time_str}")
         return
     log_callback(f"Adjusting event times in: {filePath}")
-    with open(filePath, 'rb') as f:
-        content = f.read()
-    events = content.split(b'</event>')
-    if not events or len(events) == 1:
-        log_callback(f"No events found in the file: {filePath}")
-        return
-    first_event_str = events[0] + b'</event>'
-    first_event_root = ET.fromstring(first_event_str)
-    first_event_time_str = first_event_root.get('time').split('.')[0]
-    first_event_time_str = cleanTimeString(first_event_time_str)
-    try:
-        first_event_time = datetime.strptime(first_event_time_str, "%Y-%m-%dT%H:%M:%SZ")
-    except ValueError:
-        first_event_time = datetime.strptime(first_event_time_str, "%Y-%m-%dT%H:%M:%S")
-    time_offset = user_time - first_event_time
-    unique_events = []
-    total = len(events) - 1
-    for idx, event in enumerate(events[:-1]):
-        event_str = event + b'</event>'
-        try:
-            root = ET.fromstring(event_str)
-            for time_attr in ['time', 'start', 'stale']:
-                original = root.get(time_attr)
-                if not original:
-                    continue
-                event_time_str = original.split('.')[0]
-                event_time_str = cleanTimeString(event_time_str)
-                try:
-                    event_time = datetime.strptime(event_time_str, "%Y-%m-%dT%H:%M:%SZ")
-                except ValueError:
-                    event_time = datetime.strptime(event_time_str, "%Y-%m-%dT%H:%M:%S")
-                new_event_time = event_time + time_offset
-                root.set(time_attr, new_event_time.strftime("%Y-%m-%dT%H:%M:%SZ"))
-            event_string = ET.tostring(root, encoding='utf-8')
-            event_string = event_string.replace(b' />', b'/>')
-            unique_events.append(event_string)
-        except ET.ParseError:
-            pass
-        if idx % 1000 == 0:
-            log_callback(f"Adjusted {idx}/{total} events...")
+    file_size = os.path.getsize(filePath)
     newFileName = "TimeAdjusted_" + os.path.basename(filePath)
     newFilePath = os.path.join(os.path.dirname(filePath), newFileName)
-    with open(newFilePath, 'wb') as adjustedFile:
-        adjustedFile.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
-        for event in unique_events:
-            adjustedFile.write(event)
+    with MappedCotLog(filePath) as cot_log:
+        events = cot_log.iter_event_views()
+        try:
+            first_span = next(events, None)
+            if first_span is None:
+                log_callback(f"No events found in the file: {filePath}")
+                return
+            first_event_str = first_span[1]
+            if preserve_format:
+                first_event_attributes = scan_event_attributes(first_event_str) or {}
+                first_event_time_str = first_event_attributes.get(b'time', b'').decode('utf-8', 'replace')
+                if not first_event_time_str:
+                    log_callback(f"The first event in {filePath} has no time attribute.")
+                    return
+            else:
+                first_event_root = ET.fromstring(first_event_str)
+                first_event_time_str = first_event_root.get('time')
+            try:
+                first_event_time = parseEventTime(first_event_time_str or '')
+            except ValueError:
+                log_callback(f"Could not parse the first event's time: {first_event_time_str}")
+                return
+            time_offset = user_time - first_event_time
+            shifter = EventTimeShifter(time_offset)
+            skipped_count = 0
+            with open(newFilePath, 'wb') as adjustedFile:
+                adjustedFile.write(XML_DECLARATION + b'\n')
+                for idx, (offset, event_str) in enumerate(itertools.chain([first_span], events)):
+                    if preserve_format:
+                        if not shifter.write_shifted(adjustedFile, without_declaration(event_str)):
+                            skipped_count += 1
+                    else:
+                        try:
+                            root = ET.fromstring(event_str)
+                            if not root.get('time'):
+                                raise ValueError("event has no time")
+                            for time_attr in ['time', 'start', 'stale']:
+                                original = root.get(time_attr)
+                                if not original:
+                                    continue
+                                new_event_time = parseEventTime(original) + time_offset
+                                root.set(time_attr, new_event_time.strftime("%Y-%m-%dT%H:%M:%SZ"))
+                            event_string = ET.tostring(root, encoding='utf-8')
+                            event_string = event_string.replace(b' />', b'/>')
+                            adjustedFile.write(event_string)
+                        except ET.ParseError:
+                            pass
+                        except ValueError:
+                            skipped_count += 1
+                    if idx % 1000 == 0:
+                        log_callback(f"Adjusted {idx} events ({progress_percent(offset, file_size)}% of file)...")
+        finally:
+            # Releases the view the generator still holds before the map closes
+            events.close()
+    if skipped_count:
+        log_callback(f"Skipped {skipped_count} events with a missing or unparsable time.")
     log_callback(f"Event times adjusted. File saved as: {newFileName}")
     GlobalState.selectedFiles = [newFilePath]
 
@@ -216,7 +837,76 @@ def writeLogFile(log_content, original_file_path, log_number):
         log_file.write(''.join(log_content))
     return log_file_name
 
-def splitAndExportFile(filePath, max_file_size_mb, log_callback):
+COPY_BLOCK_SIZE = 1024 * 1024
+
+def copy_byte_range(source, destination, offset, length):
+    """Copies length bytes starting at offset between two open binary files."""
+    if length <= 0:
+        return
+    destination.flush()
+    if sys.platform.startswith('linux'):
+        # sendfile keeps the copy inside the kernel
+        position = destination.tell()
+        while length > 0:
+            sent = os.sendfile(destination.fileno(), source.fileno(), offset, length)
+            if sent == 0:
+                break
+            offset += sent
+            length -= sent
+            position += sent
+        destination.seek(position)
+        return
+    source.seek(offset)
+    while length > 0:
+        block = source.read(min(COPY_BLOCK_SIZE, length))
+        if not block:
+            break
+        destination.write(block)
+        length -= len(block)
+
+def plan_split_ranges(filePath, max_file_size_bytes, header_size, log_callback):
+    """
+    Groups consecutive events into (start, end) byte ranges whose size plus
+    header_size stays within max_file_size_bytes. An event that is larger than
+    the limit on its own gets a range to itself.
+
+    The event boundaries are scanned one window at a time, and each range
+    end is picked with a searchsorted over the window's boundaries, so
+    memory does not grow with the number of events.
+    """
+    event_count = 0
+    with MappedCotLog(filePath) as cot_log:
+        has_declaration = cot_log.map[:len(XML_DECLARATION)] == XML_DECLARATION
+        range_start = range_end = len(XML_DECLARATION) if has_declaration else 0
+        for event_ends in cot_log.iter_event_ends(range_start):
+            event_count += len(event_ends)
+            next_event = 0
+            while next_event < len(event_ends):
+                fitting = int(np.searchsorted(event_ends, range_start + max_file_size_bytes - header_size, side='right'))
+                if fitting > next_event:
+                    range_end = int(event_ends[fitting - 1])
+                    next_event = fitting
+                elif range_end == range_start:
+                    # Too large for the limit on its own
+                    range_end = int(event_ends[next_event])
+                    next_event += 1
+                if next_event < len(event_ends):
+                    # The next event does not fit, so the range ends here
+                    yield range_start, range_end
+                    range_start = range_end
+    if range_end > range_start:
+        yield range_start, range_end
+    log_callback(f"Found {event_count} events.")
+
+def splitAndExportFile(filePath, max_file_size_mb, log_callback, reformat=False):
+    """
+    Splits a log into parts of at most max_file_size_mb (each starting with an
+    XML declaration).
+
+    By default every part is a contiguous byte range of the source copied
+    as-is, so part sizes are exact in bytes and memory use is flat.
+    reformat=True runs every event through formatEvent (ElementTree) instead.
+    """
     if not os.path.isfile(filePath):
         log_callback(f"{filePath} is not a valid file.")
         return
@@ -229,18 +919,31 @@ def splitAndExportFile(filePath, max_file_size_mb, log_callback):
         log_callback("Invalid input. Please enter a valid number.")
         return
     log_callback(f"Splitting and exporting the file: {filePath}")
-    with open(filePath, 'rb') as f:
-        content = f.read()
-    events = content.split(b'</event>')
-    if not events or len(events) == 1:
-        log_callback(f"No events found in the file: {filePath}")
+    if not reformat:
+        header = XML_DECLARATION + b'\n'
+        base_name = os.path.splitext(os.path.basename(filePath))[0]
+        log_number = 0
+        with open(filePath, 'rb') as source:
+            for start, end in plan_split_ranges(filePath, max_file_size_bytes, len(header), log_callback):
+                log_number += 1
+                log_file_name = f"{base_name}_Log{log_number}.txt"
+                with open(os.path.join(os.path.dirname(filePath), log_file_name), 'wb') as part_file:
+                    part_file.write(header)
+                    copy_byte_range(source, part_file, start, end - start)
+                log_callback(f"Created: {log_file_name}")
+        if not log_number:
+            log_callback(f"No events found in the file: {filePath}")
+            return
+        log_callback(f"File splitting and export complete. {log_number} files created.")
         return
+    file_size = os.path.getsize(filePath)
     current_file_size = 0
     log_number = 1
     current_log_content = ['<?xml version="1.0" encoding="UTF-8"?>\n']
-    total_events = len(events) - 1
-    for i, event in enumerate(events[:-1]):
-        event_str = event.strip() + b'</event>\n'
+    found_events = False
+    for i, (offset, event) in enumerate(iter_event_spans(filePath, log_callback=log_callback)):
+        found_events = True
+        event_str = event[:-len(EVENT_END_TAG)].strip() + b'</event>\n'
         formatted_event = formatEvent(event_str)
         event_size = len(formatted_event)
         if current_file_size + event_size > max_file_size_bytes:
@@ -252,7 +955,10 @@ def splitAndExportFile(filePath, max_file_size_mb, log_callback):
         current_log_content.append(formatted_event)
         current_file_size += event_size
         if i % 1000 == 0:
-            log_callback(f"Processed {i}/{total_events} events...")
+            log_callback(f"Processed {i} events ({progress_percent(offset, file_size)}% of file)...")
+    if not found_events:
+        log_callback(f"No events found in the file: {filePath}")
+        return
     if current_log_content:
         created = writeLogFile(current_log_content, filePath, log_number)
         log_callback(f"Created: {created}")
@@ -266,31 +972,23 @@ def extractUIDsAndCallsigns(filePath, log_callback):
     unique_values = set()
     error_log = []
     try:
-        with open(filePath, 'rb') as f:
-            content = f.read()
-        events = content.split(b'</event>')
-        total = len(events) - 1
-        for idx, event in enumerate(events[:-1]):
-            event_str = event + b'</event>'
-            try:
-                root = ET.fromstring(event_str)
-                uid = root.get('uid')
-                if uid is None:
+        conn = open_event_index(filePath, log_callback)
+        try:
+            rows = conn.execute("SELECT parsed, uid, callsign FROM events ORDER BY offset")
+            for parsed, uid, callsign in rows:
+                if not parsed:
+                    error_log.append("Malformed XML in event")
+                elif uid is None:
                     error_log.append("Missing UID in event")
-                    continue
-                if "ANDROID-" in uid:
-                    callsign_element = root.find(".//contact")
-                    if callsign_element is not None and 'callsign' in callsign_element.attrib:
-                        callsign = callsign_element.attrib['callsign']
+                elif "ANDROID-" in uid:
+                    if callsign is not None:
                         unique_values.add(callsign)
                     else:
                         error_log.append(f"Missing or malformed callsign for UID: {uid}")
                 else:
                     unique_values.add(uid)
-            except ET.ParseError:
-                error_log.append("Malformed XML in event")
-            if idx % 1000 == 0:
-                log_callback(f"Processed {idx}/{total} events...")
+        finally:
+            conn.close()
     except Exception as e:
         log_callback(f"Error reading file: {e}")
         return
@@ -309,120 +1007,720 @@ def extractUIDsAndCallsigns(filePath, log_callback):
         log_callback(f"Errors encountered. See {error_log_filename} for details.")
     GlobalState.selectedFiles = [filePath]
 
+def exportTimeWindow(filePath, start_time_str, end_time_str, log_callback):
+    """Copies the events whose time falls within [start, end] (Zulu, to the second) into a new log."""
+    if not os.path.isfile(filePath):
+        log_callback(f"{filePath} is not a valid file.")
+        return
+    try:
+        window = []
+        for time_str in (start_time_str, end_time_str):
+            time_format = "%Y-%m-%dT%H:%M:%SZ" if time_str.endswith('Z') else "%Y-%m-%dT%H:%M:%S"
+            window.append(datetime.strptime(time_str, time_format))
+    except ValueError:
+        log_callback(f"Invalid time format: {start_time_str} / {end_time_str}")
+        return
+    start_time, end_time = window
+    # Event times are ISO-8601 strings, so a string range on the indexed column works
+    lower = start_time.strftime("%Y-%m-%dT%H:%M:%S")
+    upper = (end_time + timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%S")
+
+    log_callback(f"Exporting events between {start_time_str} and {end_time_str} from: {filePath}")
+    conn = open_event_index(filePath, log_callback)
+    try:
+        spans = conn.execute(
+            "SELECT offset, length FROM events WHERE parsed = 1 AND time >= ? AND time < ? ORDER BY offset",
+            (lower, upper)
+        ).fetchall()
+    finally:
+        conn.close()
+    if not spans:
+        log_callback("No events found in the selected time window.")
+        return
+
+    newFileName = "TimeWindow_" + os.path.basename(filePath)
+    newFilePath = os.path.join(os.path.dirname(filePath), newFileName)
+    with open(newFilePath, 'wb') as windowFile:
+        windowFile.write(XML_DECLARATION + b'\n')
+        for event_str in read_event_spans(filePath, spans):
+            windowFile.write(event_str.replace(XML_DECLARATION, b''))
+    log_callback(f"{len(spans)} events exported. File saved as: {newFileName}")
+    GlobalState.selectedFiles = [newFilePath]
+
+def summarizeLog(filePath, log_callback):
+    """Logs event count, time range and distinct callsigns straight from the memory-mapped file."""
+    if not os.path.isfile(filePath):
+        log_callback(f"{filePath} is not a valid file.")
+        return
+    log_callback(f"Scanning: {filePath}")
+    with MappedCotLog(filePath) as cot_log:
+        event_count = cot_log.count_events()
+        first_time, last_time = cot_log.time_range()
+        callsigns = cot_log.callsigns()
+    log_callback(f"Events: {event_count}")
+    log_callback(f"Time range: {first_time} to {last_time}")
+    log_callback(f"Distinct callsigns ({len(callsigns)}): {', '.join(sorted(callsigns))}")
+
 ####################################
 # Multi-file logic for CSV export
 ####################################
 utc = pytz.UTC
 est = pytz.timezone("America/New_York")
 
-def export_cot_details_multiple_files(file_list, log_callback, output_dir=None):
+PARALLEL_SPLIT_BYTES = 32 * 1024 * 1024  # files larger than this are split across workers
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024  # smaller inputs parse faster than a process pool starts
+PARQUET_ROW_GROUP_SIZE = 50000  # rows per Parquet file written for one callsign/day
+PARQUET_MAX_BUFFERED_ROWS = 200000  # rows held across all partitions before spilling
+TAIL_STATE_SUFFIX = ".state.json"  # incremental export progress, next to the export
+TAIL_STATE_VERSION = 1
+TAIL_HEAD_BYTES = 64 * 1024  # prefix hashed to notice a replaced log
+
+class CotDetailsCsvSink:
     """
-    Reads and parses multiple .txt CoT files, grouping all events by 'detail_contact_callsign'.
-    Exports a SINGLE CSV file with combined data (no multiple sheets).
-    If there's no data, writes a dummy CSV row.
-    
-    If output_dir is provided, we save the CSV there; 
-    otherwise, we use the folder of the first file. 
+    Collects records per callsign and writes the single combined CSV at the end.
+
+    With append=True the records are added to an existing CSV instead: rows
+    that fit its header are appended in place, and the file is only rewritten
+    when the new rows bring columns it does not have yet.
+    """
+    def __init__(self, output_path, append=False):
+        self.output_path = output_path
+        self.append = append
+        self.combined_callsign_data = {}  # {callsign: [list_of_event_dicts]}
+
+    def add(self, callsign_val, event_data, event_day):
+        if callsign_val not in self.combined_callsign_data:
+            self.combined_callsign_data[callsign_val] = []
+        self.combined_callsign_data[callsign_val].append(event_data)
+
+    def close(self, log_callback):
+        log_callback(f"Writing combined CoT details to CSV: {self.output_path}")
+
+        # Build a single combined DataFrame
+        all_records = []
+        for callsign_val, records in self.combined_callsign_data.items():
+            for rec in records:
+                # Keep track of callsign in a separate column
+                rec['Callsign'] = callsign_val
+                all_records.append(rec)
+        self.combined_callsign_data = {}
+
+        if self.append and os.path.isfile(self.output_path):
+            self.append_records(all_records, log_callback)
+            return
+
+        if not all_records:
+            # No data found
+            df_dummy = pd.DataFrame([{"Info": "No data available."}])
+            df_dummy.to_csv(self.output_path, index=False)
+            log_callback("No data found across all .txt files. Created a dummy CSV.")
+        else:
+            df_all = pd.DataFrame(all_records)
+            df_all.to_csv(self.output_path, index=False)
+
+        log_callback(f"CSV file created: {self.output_path}")
+
+    def append_records(self, all_records, log_callback):
+        if not all_records:
+            log_callback(f"No new CoT details for {self.output_path}")
+            return
+        df_new = pd.DataFrame(all_records)
+        header = list(pd.read_csv(self.output_path, nrows=0).columns)
+        if header == ["Info"]:
+            # Only the "No data available." placeholder so far
+            df_new.to_csv(self.output_path, index=False)
+        elif set(df_new.columns) <= set(header):
+            df_new.reindex(columns=header).to_csv(self.output_path, mode='a', header=False, index=False)
+        else:
+            log_callback("New columns found, rewriting the CSV with the wider header...")
+            df_old = pd.read_csv(self.output_path, dtype=str, keep_default_na=False)
+            pd.concat([df_old, df_new], ignore_index=True).to_csv(self.output_path, index=False)
+        log_callback(f"Appended {len(df_new)} rows to CSV: {self.output_path}")
+
+class CotDetailsParquetSink:
+    """
+    Streams records into a Hive-style Parquet dataset partitioned as
+    callsign=<callsign>/day=<YYYY-MM-DD>/part-NNNNNN.parquet.
+
+    Each partition buffers rows until it reaches row_group_size; if the
+    buffers together exceed max_buffered_rows the largest partitions are
+    flushed early. A flush stages the rows as an Arrow IPC batch in a hidden
+    staging file in the dataset folder, because the columns are only known
+    once every event has been parsed. close() then writes each partition as
+    a single file through one pq.ParquetWriter, with row groups of up to
+    row_group_size rows and the full column set, so every file has the same
+    schema (pyarrow.dataset and pandas.read_parquet take the schema of the
+    first file they find) and every row is encoded to Parquet once.
+
+    first_part numbers the files after those of an earlier run, so new rows
+    can be added to an existing dataset; the columns of the existing files
+    are part of the schema from the start, and those files are only
+    rewritten when a run brings columns they lack.
+    """
+    def __init__(self, output_path, row_group_size=PARQUET_ROW_GROUP_SIZE, max_buffered_rows=PARQUET_MAX_BUFFERED_ROWS,
+                 first_part=0):
+        self.output_path = output_path
+        self.row_group_size = row_group_size
+        self.max_buffered_rows = max_buffered_rows
+        self.buffers = {}  # {(callsign, day): [list_of_event_dicts]}
+        self.buffered_rows = 0
+        self.first_part = first_part
+        self.files_written = 0
+        self.rows_written = 0
+        self.columns = {}  # every column of the dataset, in first-seen order
+        os.makedirs(self.output_path, exist_ok=True)
+        self.earlier_parts = self.part_paths() if first_part else []
+        for path in self.earlier_parts:
+            self.columns.update(dict.fromkeys(pq.read_schema(path).names))
+        # Dataset readers skip files whose names start with '.'
+        fd, self.staging_path = tempfile.mkstemp(prefix='.staging-', suffix='.arrows', dir=self.output_path)
+        self.staging = os.fdopen(fd, 'w+b')
+        self.staged = {}  # {(callsign, day): [offset of each staged batch]}
+
+    def part_paths(self):
+        """The dataset's part files in part-number order."""
+        paths = []
+        for root, _dirs, files in os.walk(self.output_path):
+            paths.extend(os.path.join(root, name) for name in files
+                         if name.startswith("part-") and name.endswith(".parquet"))
+        return sorted(paths, key=os.path.basename)
+
+    def add(self, callsign_val, event_data, event_day):
+        key = (callsign_val, event_day)
+        if key not in self.buffers:
+            self.buffers[key] = []
+        self.buffers[key].append(event_data)
+        self.buffered_rows += 1
+
+        if len(self.buffers[key]) >= self.row_group_size:
+            self.flush(key)
+        elif self.buffered_rows > self.max_buffered_rows:
+            # Spill the biggest partitions first so the row groups stay large
+            for key in sorted(self.buffers, key=lambda k: len(self.buffers[k]), reverse=True):
+                self.flush(key)
+                if self.buffered_rows <= self.max_buffered_rows // 2:
+                    break
+
+    def flush(self, key):
+        rows = self.buffers.pop(key, None)
+        if not rows:
+            return
+        self.buffered_rows -= len(rows)
+
+        batch_columns = {}
+        for row in rows:
+            batch_columns.update(dict.fromkeys(row))
+        self.columns.update(batch_columns)
+        table = pa.Table.from_pylist(rows, schema=pa.schema([(column, pa.string()) for column in batch_columns]))
+        self.staged.setdefault(key, []).append(self.staging.tell())
+        with pa.ipc.new_stream(self.staging, table.schema) as writer:
+            writer.write_table(table)
+        self.rows_written += len(rows)
+
+    def read_staged(self, offset):
+        self.staging.seek(offset)
+        return pa.ipc.open_stream(self.staging).read_all()
+
+    def write_partition(self, key, schema):
+        """Writes the staged batches of one partition to its part file, row_group_size rows at a time."""
+        callsign_val, event_day = key
+        partition_dir = os.path.join(self.output_path,
+                                     f"callsign={quote(callsign_val, safe='')}",
+                                     f"day={event_day}")
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"part-{self.first_part + self.files_written:06d}.parquet")
+        pending = []
+        pending_rows = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for offset in self.staged[key]:
+                table = widen_table(self.read_staged(offset), schema)
+                pending.append(table)
+                pending_rows += table.num_rows
+                if pending_rows >= self.row_group_size:
+                    writer.write_table(pa.concat_tables(pending), row_group_size=self.row_group_size)
+                    pending = []
+                    pending_rows = 0
+            if pending:
+                writer.write_table(pa.concat_tables(pending), row_group_size=self.row_group_size)
+        self.files_written += 1
+
+    def close(self, log_callback):
+        log_callback(f"Writing CoT details to Parquet: {self.output_path}")
+        try:
+            for key in list(self.buffers):
+                self.flush(key)
+            schema = pa.schema([(column, pa.string()) for column in self.columns])
+            for key in self.staged:
+                self.write_partition(key, schema)
+            self.widen_earlier_parts(schema, log_callback)
+        finally:
+            self.staging.close()
+            os.remove(self.staging_path)
+        if not self.files_written:
+            log_callback("No data found across all .txt files. The Parquet dataset is empty.")
+        log_callback(f"Parquet dataset created: {self.output_path} "
+                     f"({self.rows_written} rows in {self.files_written} files)")
+
+    def widen_earlier_parts(self, schema, log_callback):
+        """Rewrites the files of earlier runs that lack columns this run found, adding them as nulls."""
+        rewritten = 0
+        for path in self.earlier_parts:
+            if pq.read_schema(path).names == schema.names:
+                continue
+            # Read the file on its own, so the hive directories don't add partition columns
+            table = widen_table(pq.ParquetFile(path).read(), schema)
+            temp_path = path + ".tmp"
+            pq.write_table(table, temp_path)
+            os.replace(temp_path, path)
+            rewritten += 1
+        if rewritten:
+            log_callback(f"Added this run's new columns to {rewritten} Parquet file(s) of earlier runs")
+
+def widen_table(table, schema):
+    """table with schema's columns in schema's order; the string columns it lacks are added as nulls."""
+    return pa.Table.from_arrays(
+        [table.column(column) if column in table.column_names else pa.nulls(table.num_rows, pa.string())
+         for column in schema.names],
+        schema=schema)
+
+def parse_remarks_line_by_line(remarks_text, data_dict):
+    for line in remarks_text.splitlines():
+        line = line.strip()
+        if ":" in line:
+            key, value = line.split(":", 1)
+            clean_key = key.strip().replace(" ", "_")
+            data_dict[f"remarks_{clean_key}"] = value.strip()
+
+def fallback_extract_data(event_text):
+    fallback_data = {}
+    uid_match = re.search(r'uid="([^"]+)"', event_text)
+    uid_val = uid_match.group(1) if uid_match else "UNKNOWN_UID"
+    fallback_data["uid"] = uid_val
+
+    detail_match = re.search(r'<detail>([\s\S]*?)</detail>', event_text)
+    if detail_match:
+        detail_content = detail_match.group(1)
+        remarks_match = re.search(r'<remarks[^>]*>([\s\S]*?)</remarks>', detail_content)
+        if remarks_match:
+            remarks = remarks_match.group(1).strip()
+            parse_remarks_line_by_line(remarks, fallback_data)
+            fallback_data['detail_detail_remarks_text'] = remarks
+
+        tags_in_detail = re.findall(r'<(\w[\w\-_]*)([^>]*)>', detail_content)
+        for tag_name, attrs_str in tags_in_detail:
+            if tag_name.lower() == 'detail':
+                continue
+            if tag_name.lower() == 'remarks':
+                continue
+            attrs = re.findall(r'(\w[\w\-_]*)="([^"]*)"', attrs_str)
+            for attr_name, attr_val in attrs:
+                if tag_name.lower() == 'contact' and attr_name.lower() == 'callsign':
+                    fallback_data['detail_contact_callsign'] = attr_val
+                fallback_data[f"detail_{tag_name}_{attr_name}"] = attr_val
+    else:
+        # outside <detail>
+        contact_match = re.search(r'<contact[^>]*callsign="([^"]+)"', event_text)
+        if contact_match:
+            fallback_data['detail_contact_callsign'] = contact_match.group(1)
+
+        remarks_match = re.search(r'<remarks[^>]*>([\s\S]*?)</remarks>', event_text)
+        if remarks_match:
+            remarks = remarks_match.group(1).strip()
+            parse_remarks_line_by_line(remarks, fallback_data)
+            fallback_data['detail_detail_remarks_text'] = remarks
+
+        point_match = re.search(r'<point[^>]+>', event_text)
+        if point_match:
+            point_tag = point_match.group(0)
+            for attr in ["lat", "lon", "hae", "ce", "le"]:
+                attr_match = re.search(fr'{attr}="([^"]+)"', point_tag)
+                if attr_match:
+                    fallback_data[f"point_{attr}"] = attr_match.group(1)
+
+        track_match = re.search(r'<track[^>]+>', event_text)
+        if track_match:
+            track_tag = track_match.group(0)
+            for attr in ["speed", "course"]:
+                attr_match = re.search(fr'{attr}="([^"]+)"', track_tag)
+                if attr_match:
+                    fallback_data[f"detail_track_{attr}"] = attr_match.group(1)
+
+    return fallback_data
+
+def flatten_element(element, prefix="detail"):
+    data = {}
+    for attr_name, attr_value in element.attrib.items():
+        data[f"{prefix}_{element.tag}_{attr_name}"] = attr_value
+    if element.text and element.text.strip():
+        data[f"{prefix}_{element.tag}_text"] = element.text.strip()
+
+    for child in element:
+        child_data = flatten_element(child, prefix=f"{prefix}_{element.tag}")
+        data.update(child_data)
+    return data
+
+def convert_zulu_to_est(event_data):
+    # Convert "TAK-Server-..." columns from Z to EST ("YYYY-MM-DD T HH:MM:SS")
+    for k, v in event_data.items():
+        if (k.startswith("detail__flow-tags__TAK-Server-")
+            and isinstance(v, str)
+            and v.endswith("Z")):
+            try:
+                dt_utc = datetime.strptime(v, "%Y-%m-%dT%H:%M:%SZ")
+                dt_utc = utc.localize(dt_utc)
+                dt_est = dt_utc.astimezone(est)
+                event_data[k] = dt_est.strftime("%Y-%m-%d T %H:%M:%S")
+            except ValueError:
+                pass
+
+def event_day_of(time_value):
+    # "2025-01-12T17:13:48Z" -> "2025-01-12", used as the Parquet day partition
+    if time_value and re.match(r'\d{4}-\d{2}-\d{2}', time_value):
+        return time_value[:10]
+    return "unknown"
+
+# Fast path for the common PLI shape:
+#   <event type="a-..."><point .../><detail><contact/><__group/><track/>...</detail></event>
+# A device sends the same markup over and over with only the values changing,
+# so the first event of each layout is compiled into one anchored regex that
+# captures every value, and later events of that layout cost a single
+# fullmatch plus one pass over the captured values. Events of other types, with
+# unfamiliar detail children, nesting below those children, entities,
+# comments, DTDs or namespaces never compile and take the full ElementTree
+# path, so the result is always what flatten_element would produce.
+FAST_PATH_EVENT_TYPE = re.compile(r'a-')
+FAST_PATH_DETAIL_TAGS = frozenset([
+    'contact', '__group', 'track', 'status', 'takv', 'precisionlocation',
+    'uid', '_flow-tags_', 'remarks', 'usericon', 'color', 'link',
+])
+FAST_PATH_UNSUPPORTED_MARKUP = ('<!', 'xmlns', '&', '\r', "'", ']]>')
+FAST_PATH_SHAPE_CACHE_SIZE = 64
+POINT_COLUMNS = ["lat", "lon", "hae", "ce", "le"]
+
+# Pieces of the compiled layouts. Anything ElementTree would reject or rewrite
+# (control characters, raw '<', entity references, whitespace normalization
+# inside attribute values) is left out of the character classes. Text may
+# hold ']' but never the ']]>' XML forbids in character data, so a ']' is
+# only taken when ']>' does not follow it.
+SHAPE_VALUE = '([^"<&\t\n\r\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]*)'
+SHAPE_SKIPPED_VALUE = '[^"<&\t\n\r\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]*'
+SHAPE_TEXT_CHARS = '[^]<&\r\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]*'
+SHAPE_SKIPPED_TEXT = SHAPE_TEXT_CHARS + '(?:](?!]>)' + SHAPE_TEXT_CHARS + ')*'
+SHAPE_TEXT = '(' + SHAPE_SKIPPED_TEXT + ')'
+SHAPE_SPACE = '[ \t\n]+'
+SHAPE_OPTIONAL_SPACE = '[ \t\n]*'
+
+MARKUP_DECLARATION_PATTERN = re.compile(r'<\?xml[ \t\n][^<>]*\?>')
+MARKUP_OPEN_TAG_PATTERN = re.compile(r'<([A-Za-z_][\w.-]*)', re.ASCII)
+MARKUP_ATTRIBUTE_PATTERN = re.compile(r'[ \t\n]+([A-Za-z_][\w.-]*)="([^"<]*)"', re.ASCII)
+MARKUP_TAG_END_PATTERN = re.compile(r'[ \t\n]*(/?)>')
+MARKUP_CLOSE_TAG_PATTERN = re.compile(r'</([A-Za-z_][\w.-]*)[ \t\n]*>', re.ASCII)
+MARKUP_TEXT_PATTERN = re.compile(r'[^<]*')
+
+class CotEventShape:
+    """
+    One compiled event layout. `fields` lists (column, group, kind) in the order
+    the ElementTree path inserts the columns: 'value' columns are always set,
+    'text' columns are stripped and dropped when empty, 'point' columns are
+    dropped when empty.
+    """
+
+    def __init__(self, pattern, fields, time_group):
+        self.pattern = re.compile(pattern)
+        self.fields = fields
+        self.time_group = time_group
+
+    def extract(self, event_str):
+        match = self.pattern.fullmatch(event_str)
+        if match is None:
+            return None
+        values = match.groups()
+        event_data = {}
+        for column, group, kind in self.fields:
+            value = values[group]
+            if kind == 'text':
+                value = value.strip()
+            if value or kind == 'value':
+                event_data[column] = value
+        event_time = values[self.time_group] if self.time_group is not None else None
+        return event_data, event_time
+
+def compile_event_shape(event_str):
     """
-    combined_callsign_data = {}  # {callsign: [list_of_event_dicts]}
-
-    def parse_remarks_line_by_line(remarks_text, data_dict):
-        for line in remarks_text.splitlines():
-            line = line.strip()
-            if ":" in line:
-                key, value = line.split(":", 1)
-                clean_key = key.strip().replace(" ", "_")
-                data_dict[f"remarks_{clean_key}"] = value.strip()
-
-    def fallback_extract_data(event_text):
-        fallback_data = {}
-        uid_match = re.search(r'uid="([^"]+)"', event_text)
-        uid_val = uid_match.group(1) if uid_match else "UNKNOWN_UID"
-        fallback_data["uid"] = uid_val
-
-        detail_match = re.search(r'<detail>([\s\S]*?)</detail>', event_text)
-        if detail_match:
-            detail_content = detail_match.group(1)
-            remarks_match = re.search(r'<remarks[^>]*>([\s\S]*?)</remarks>', detail_content)
-            if remarks_match:
-                remarks = remarks_match.group(1).strip()
-                parse_remarks_line_by_line(remarks, fallback_data)
-                fallback_data['detail_detail_remarks_text'] = remarks
-
-            tags_in_detail = re.findall(r'<(\w[\w\-_]*)([^>]*)>', detail_content)
-            for tag_name, attrs_str in tags_in_detail:
-                if tag_name.lower() == 'detail':
+    Builds the CotEventShape that matches event_str and every event laid out
+    the same way, or returns None when the event is not a plain PLI-style event.
+    """
+    for marker in FAST_PATH_UNSUPPORTED_MARKUP:
+        if marker in event_str:
+            return None
+
+    pattern = []
+    fields = []
+    point_groups = {}
+    time_group = None
+    group_count = 0
+    position = 0
+
+    declaration = MARKUP_DECLARATION_PATTERN.match(event_str)
+    if declaration:
+        pattern.append(re.escape(declaration.group()) + SHAPE_OPTIONAL_SPACE)
+        position = declaration.end()
+        position = MARKUP_TEXT_PATTERN.match(event_str, position).end()
+        if event_str[declaration.end():position].strip():
+            return None
+
+    # Open element names, and whether the open depth-1 element is the detail
+    path = []
+    seen_detail = seen_point = in_detail = False
+    while True:
+        close_tag = MARKUP_CLOSE_TAG_PATTERN.match(event_str, position)
+        if close_tag:
+            tag = close_tag.group(1)
+            if not path or path.pop() != tag:
+                return None
+            pattern.append('</' + re.escape(tag) + SHAPE_OPTIONAL_SPACE + '>')
+            position = close_tag.end()
+        else:
+            open_tag = MARKUP_OPEN_TAG_PATTERN.match(event_str, position)
+            if not open_tag:
+                return None
+            tag = open_tag.group(1)
+            depth = len(path)
+            if depth == 0:
+                if tag != 'event':
+                    return None
+                role = 'event'
+            elif depth == 1 and tag == 'detail' and not seen_detail:
+                seen_detail = True
+                role = 'detail'
+            elif depth == 1 and tag == 'point' and not seen_point:
+                seen_point = True
+                role = 'point'
+            elif depth == 2 and in_detail:
+                if tag not in FAST_PATH_DETAIL_TAGS:
+                    return None
+                role = 'detail_child'
+            elif depth > 2 and in_detail:
+                return None
+            else:
+                role = 'skipped'
+            if depth == 1:
+                in_detail = role == 'detail'
+
+            pattern.append('<' + re.escape(tag))
+            position = open_tag.end()
+            names = set()
+            while True:
+                attribute = MARKUP_ATTRIBUTE_PATTERN.match(event_str, position)
+                if not attribute:
+                    break
+                name, value = attribute.groups()
+                if name in names or '\n' in value or '\t' in value:
+                    return None
+                names.add(name)
+                position = attribute.end()
+                pattern.append(SHAPE_SPACE + re.escape(name) + '="')
+                if role == 'event' and name == 'type':
+                    if not FAST_PATH_EVENT_TYPE.match(value):
+                        return None
+                    pattern.append(FAST_PATH_EVENT_TYPE.pattern + SHAPE_SKIPPED_VALUE + '"')
                     continue
-                if tag_name.lower() == 'remarks':
+                if role == 'event' and name == 'time':
+                    time_group = group_count
+                elif role == 'point' and name in POINT_COLUMNS:
+                    point_groups[name] = group_count
+                elif role == 'detail':
+                    fields.append((f"detail_detail_{name}", group_count, 'value'))
+                elif role == 'detail_child':
+                    fields.append((f"detail_detail_{tag}_{name}", group_count, 'value'))
+                else:
+                    pattern.append(SHAPE_SKIPPED_VALUE + '"')
+                    continue
+                pattern.append(SHAPE_VALUE + '"')
+                group_count += 1
+            if role == 'event' and 'type' not in names:
+                return None
+
+            tag_end = MARKUP_TAG_END_PATTERN.match(event_str, position)
+            if not tag_end:
+                return None
+            position = tag_end.end()
+            if tag_end.group(1):
+                pattern.append(SHAPE_OPTIONAL_SPACE + '/>')
+                if depth == 0:
+                    break
+            else:
+                pattern.append(SHAPE_OPTIONAL_SPACE + '>')
+                path.append(tag)
+                # The text before an element's first child is its .text
+                if role in ('detail', 'detail_child'):
+                    text_column = "detail_detail_text" if role == 'detail' else f"detail_detail_{tag}_text"
+                    fields.append((text_column, group_count, 'text'))
+                    pattern.append(SHAPE_TEXT)
+                    group_count += 1
+                    position = MARKUP_TEXT_PATTERN.match(event_str, position).end()
                     continue
-                attrs = re.findall(r'(\w[\w\-_]*)="([^"]*)"', attrs_str)
-                for attr_name, attr_val in attrs:
-                    if tag_name.lower() == 'contact' and attr_name.lower() == 'callsign':
-                        fallback_data['detail_contact_callsign'] = attr_val
-                    fallback_data[f"detail_{tag_name}_{attr_name}"] = attr_val
-        else:
-            # outside <detail>
-            contact_match = re.search(r'<contact[^>]*callsign="([^"]+)"', event_text)
-            if contact_match:
-                fallback_data['detail_contact_callsign'] = contact_match.group(1)
-
-            remarks_match = re.search(r'<remarks[^>]*>([\s\S]*?)</remarks>', event_text)
-            if remarks_match:
-                remarks = remarks_match.group(1).strip()
-                parse_remarks_line_by_line(remarks, fallback_data)
-                fallback_data['detail_detail_remarks_text'] = remarks
-
-            point_match = re.search(r'<point[^>]+>', event_text)
-            if point_match:
-                point_tag = point_match.group(0)
-                for attr in ["lat", "lon", "hae", "ce", "le"]:
-                    attr_match = re.search(fr'{attr}="([^"]+)"', point_tag)
-                    if attr_match:
-                        fallback_data[f"point_{attr}"] = attr_match.group(1)
-
-            track_match = re.search(r'<track[^>]+>', event_text)
-            if track_match:
-                track_tag = track_match.group(0)
-                for attr in ["speed", "course"]:
-                    attr_match = re.search(fr'{attr}="([^"]+)"', track_tag)
-                    if attr_match:
-                        fallback_data[f"detail_track_{attr}"] = attr_match.group(1)
-
-        return fallback_data
-
-    def flatten_element(element, prefix="detail"):
-        data = {}
-        for attr_name, attr_value in element.attrib.items():
-            data[f"{prefix}_{element.tag}_{attr_name}"] = attr_value
-        if element.text and element.text.strip():
-            data[f"{prefix}_{element.tag}_text"] = element.text.strip()
-
-        for child in element:
-            child_data = flatten_element(child, prefix=f"{prefix}_{element.tag}")
-            data.update(child_data)
-        return data
-
-    def convert_zulu_to_est(event_data):
-        # Convert "TAK-Server-..." columns from Z to EST ("YYYY-MM-DD T HH:MM:SS")
-        for k, v in event_data.items():
-            if (k.startswith("detail__flow-tags__TAK-Server-")
-                and isinstance(v, str)
-                and v.endswith("Z")):
-                try:
-                    dt_utc = datetime.strptime(v, "%Y-%m-%dT%H:%M:%SZ")
-                    dt_utc = utc.localize(dt_utc)
-                    dt_est = dt_utc.astimezone(est)
-                    event_data[k] = dt_est.strftime("%Y-%m-%d T %H:%M:%S")
-                except ValueError:
-                    pass
-
-    def accumulate_data_into_combined(callsign_val, event_data):
-        if callsign_val not in combined_callsign_data:
-            combined_callsign_data[callsign_val] = []
-        combined_callsign_data[callsign_val].append(event_data)
 
-    now_str = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        if not path:
+            break
+        # Tails and text ElementTree does not keep
+        pattern.append(SHAPE_SKIPPED_TEXT)
+        position = MARKUP_TEXT_PATTERN.match(event_str, position).end()
+
+    if event_str[position:].strip():
+        return None
+    pattern.append(SHAPE_OPTIONAL_SPACE)
+    for name in POINT_COLUMNS:
+        if name in point_groups:
+            fields.append((f"point_{name}", point_groups[name], 'point'))
+    return CotEventShape(''.join(pattern), fields, time_group)
+
+# Most recently used layouts first
+fast_path_shapes = []
+
+def fast_extract_event_data(event_str):
+    """
+    Schema-aware extraction for common PLI events. Returns (event_data, event_time)
+    matching the ElementTree path key for key, or None when the event needs it.
+    """
+    for index, shape in enumerate(fast_path_shapes):
+        result = shape.extract(event_str)
+        if result is not None:
+            if index:
+                fast_path_shapes.insert(0, fast_path_shapes.pop(index))
+            break
+    else:
+        shape = compile_event_shape(event_str)
+        if shape is None:
+            return None
+        result = shape.extract(event_str)
+        if result is None:
+            return None
+        fast_path_shapes.insert(0, shape)
+        del fast_path_shapes[FAST_PATH_SHAPE_CACHE_SIZE:]
+
+    event_data, event_time = result
+    # remarks line-by-line
+    remarks_keys = [k for k in event_data.keys() if 'remarks_text' in k]
+    for rk in remarks_keys:
+        parse_remarks_line_by_line(event_data[rk], event_data)
+
+    return event_data, event_time
+
+def extract_cot_event_details(raw_event, fast_path=True):
+    """
+    Turns one raw event (as yielded by iter_event_spans or
+    MappedCotLog.iter_event_views) into
+    (callsign, event_data, event_day). Returns None for blank events and
+    events without a contact callsign.
+
+    Common PLI events go through fast_extract_event_data; everything else,
+    or everything when fast_path=False, is parsed with ElementTree.
+    """
+    event_str = str(raw_event[:-len(EVENT_END_TAG)], 'utf-8', 'replace')
+    event_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', event_str)
+    event_str = event_str.strip() + '</event>'
+    if not event_str.strip():
+        return None
+
+    fast_result = fast_extract_event_data(event_str) if fast_path else None
+    if fast_result is not None:
+        event_data, event_time = fast_result
+    else:
+        event_data, event_time = extract_event_data_full(event_str)
 
+    convert_zulu_to_est(event_data)
+    callsign_val = event_data.get("detail_contact_callsign", "").strip()
+    if not callsign_val:
+        return None
+    return callsign_val, event_data, event_day_of(event_time)
+
+def extract_event_data_full(event_str):
+    """ElementTree path (with the regex fallback for malformed XML); returns (event_data, event_time)."""
+    try:
+        root = ET.fromstring(event_str)
+        event_data = {}
+
+        detail = root.find("detail")
+        if detail is not None:
+            detail_data = flatten_element(detail, prefix="detail")
+            event_data.update(detail_data)
+
+        point = root.find("point")
+        if point is not None:
+            for attr in ["lat", "lon", "hae", "ce", "le"]:
+                val = point.get(attr)
+                if val:
+                    event_data[f"point_{attr}"] = val
+
+        # remarks line-by-line
+        remarks_keys = [k for k in event_data.keys() if 'remarks_text' in k]
+        for rk in remarks_keys:
+            parse_remarks_line_by_line(event_data[rk], event_data)
+
+        event_time = root.get('time')
+
+    except ET.ParseError:
+        event_data = fallback_extract_data(event_str)
+        time_match = re.search(r'<event\b[^>]*?\stime="([^"]*)"', event_str)
+        event_time = time_match.group(1) if time_match else None
+
+    return event_data, event_time
+
+def iter_cot_details(filePath, start_offset=0, end_offset=None, log_callback=None):
+    """
+    Yields (callsign, event_data, event_day) for every usable event between
+    two event boundaries of a file, in file order. The events are decoded
+    straight from the memory-mapped file.
+    """
+    file_size = os.path.getsize(filePath)
+    with MappedCotLog(filePath) as cot_log:
+        for idx, (offset, raw_event) in enumerate(cot_log.iter_event_views(start_offset, end_offset)):
+            record = extract_cot_event_details(raw_event)
+            if record is None:
+                continue
+            yield record
+            if log_callback and idx % 1000 == 0 and idx > 0:
+                log_callback(f"Processed {idx} events ({progress_percent(offset, file_size)}%) from {filePath}...")
+
+def parse_cot_details_task(task):
+    # Process-pool entry point; must stay at module level so it can be pickled.
+    # Like the serial path, a part that fails keeps the records read before
+    # the error, and the error is logged rather than ending the export.
+    filePath, start_offset, end_offset = task
+    records = []
+    try:
+        records.extend(iter_cot_details(filePath, start_offset, end_offset))
+        return records, None
+    except Exception as e:
+        return records, f"Error reading file {filePath}: {e}"
+
+def find_event_boundary(filePath, offset):
+    """Returns the offset just past the first </event> that ends after offset, or the file size."""
+    with MappedCotLog(filePath) as cot_log:
+        return cot_log.next_event_end(offset)
+
+def plan_cot_detail_tasks(file_list, split_bytes=PARALLEL_SPLIT_BYTES):
+    """
+    Builds (filePath, start_offset, end_offset) work items in file order.
+    Files larger than split_bytes are cut at event boundaries, so one big
+    capture keeps every worker busy and no single result gets too large.
+    """
+    tasks = []
+    for filePath in file_list:
+        file_size = os.path.getsize(filePath)
+        parts = max(1, -(-file_size // split_bytes))
+        start = 0
+        for part in range(1, parts):
+            end = find_event_boundary(filePath, file_size * part // parts)
+            if end > start:
+                tasks.append((filePath, start, end))
+                start = end
+        tasks.append((filePath, start, None))
+    return tasks
+
+def cot_details_export_location(file_list, output_dir=None):
+    """Returns (folder, base_name) the CoT details export for file_list is written under."""
     if output_dir and os.path.isdir(output_dir):
         script_dir = output_dir
     else:
@@ -438,96 +1736,206 @@ def export_cot_details_multiple_files(file_list, log_callback, output_dir=None):
         base_name = os.path.basename(folder)
     else:
         base_name = "CoT_Data"
+    return script_dir, base_name
+
+def export_cot_details_multiple_files(file_list, log_callback, output_dir=None, workers=1, output_format="csv"):
+    """
+    Reads and parses multiple .txt CoT files, grouping all events by 'detail_contact_callsign'.
+    Exports a SINGLE CSV file with combined data (no multiple sheets).
+    If there's no data, writes a dummy CSV row.
+    
+    If output_dir is provided, we save the CSV there; 
+    otherwise, we use the folder of the first file. 
+
+    With workers > 1 the files (and large files cut at event boundaries) are
+    parsed in a process pool; results are merged in file order, so the CSV
+    is identical to the serial one. A single small file, or inputs under
+    PARALLEL_MIN_BYTES in total, take the serial path instead.
+
+    output_format="parquet" writes a callsign/day partitioned Parquet dataset
+    folder instead of the CSV, streaming rows out as they are parsed.
+    """
+    now_str = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    script_dir, base_name = cot_details_export_location(file_list, output_dir)
 
-    # ***** CSV Export Instead of XLSX *****
-    out_name = f"Exported CoT Details - {base_name}_{now_str}.csv"
-    output_file = os.path.join(script_dir, out_name)
+    if output_format == "parquet":
+        if pq is None:
+            log_callback("Parquet export requires the pyarrow package (pip install pyarrow).")
+            return
+        output_path = os.path.join(script_dir, f"Exported CoT Details - {base_name}_{now_str}")
+        sink = CotDetailsParquetSink(output_path)
+    else:
+        # ***** CSV Export Instead of XLSX *****
+        out_name = f"Exported CoT Details - {base_name}_{now_str}.csv"
+        sink = CotDetailsCsvSink(os.path.join(script_dir, out_name))
 
-    # Parse each file
+    valid_files = []
     for filePath in file_list:
         if not os.path.isfile(filePath):
             log_callback(f"{filePath} is not a valid file.")
             continue
-
-        log_callback(f"Parsing file: {filePath}")
-        try:
-            with open(filePath, 'rb') as f:
-                raw_content = f.read()
-        except Exception as e:
-            log_callback(f"Error reading file {filePath}: {e}")
-            continue
-
-        content_str = raw_content.decode('utf-8', 'replace')
-        content_str = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', content_str)
-
-        events = content_str.split('</event>')
-        total = len(events) - 1
-
-        for idx, event_str in enumerate(events[:-1]):
-            event_str = event_str.strip() + '</event>'
-            if not event_str.strip():
+        valid_files.append(filePath)
+
+    if workers > 1 and sum(os.path.getsize(filePath) for filePath in valid_files) < PARALLEL_MIN_BYTES:
+        workers = 1
+    tasks = plan_cot_detail_tasks(valid_files) if workers > 1 else []
+    workers = min(workers, len(tasks))
+
+    if workers > 1:
+        log_callback(f"Parsing {len(valid_files)} file(s) as {len(tasks)} part(s) with {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window of parts in flight and merge them in
+            # submission order, which keeps the output deterministic.
+            task_iter = iter(tasks)
+            pending = deque((task, pool.submit(parse_cot_details_task, task))
+                            for task in itertools.islice(task_iter, workers * 2))
+            part = 0
+            while pending:
+                task, future = pending.popleft()
+                records, error = future.result()
+                next_task = next(task_iter, None)
+                if next_task is not None:
+                    pending.append((next_task, pool.submit(parse_cot_details_task, next_task)))
+                if error:
+                    log_callback(error)
+                for record in records:
+                    sink.add(*record)
+                part += 1
+                log_callback(f"Finished part {part}/{len(tasks)}: {task[0]}")
+    else:
+        for filePath in valid_files:
+            log_callback(f"Parsing file: {filePath}")
+            try:
+                for record in iter_cot_details(filePath, log_callback=log_callback):
+                    sink.add(*record)
+            except Exception as e:
+                log_callback(f"Error reading file {filePath}: {e}")
                 continue
 
-            try:
-                root = ET.fromstring(event_str)
-                event_data = {}
-
-                detail = root.find("detail")
-                if detail is not None:
-                    detail_data = flatten_element(detail, prefix="detail")
-                    event_data.update(detail_data)
-
-                point = root.find("point")
-                if point is not None:
-                    for attr in ["lat", "lon", "hae", "ce", "le"]:
-                        val = point.get(attr)
-                        if val:
-                            event_data[f"point_{attr}"] = val
-
-                # remarks line-by-line
-                remarks_keys = [k for k in event_data.keys() if 'remarks_text' in k]
-                for rk in remarks_keys:
-                    parse_remarks_line_by_line(event_data[rk], event_data)
-
-                convert_zulu_to_est(event_data)
-
-                callsign_val = event_data.get("detail_contact_callsign", "").strip()
-                if not callsign_val:
-                    continue
-                accumulate_data_into_combined(callsign_val, event_data)
+    sink.close(log_callback)
 
-            except ET.ParseError:
-                fallback_data = fallback_extract_data(event_str)
-                convert_zulu_to_est(fallback_data)
-                callsign_val = fallback_data.get("detail_contact_callsign", "").strip()
-                if not callsign_val:
-                    continue
-                accumulate_data_into_combined(callsign_val, fallback_data)
-
-            if idx % 1000 == 0 and idx > 0:
-                log_callback(f"Processed {idx}/{total} events from {filePath}...")
-
-    log_callback(f"Writing combined CoT details to CSV: {output_file}")
-
-    # Build a single combined DataFrame
-    all_records = []
-    for callsign_val, records in combined_callsign_data.items():
-        for rec in records:
-            # Keep track of callsign in a separate column
-            rec_copy = dict(rec)
-            rec_copy['Callsign'] = callsign_val
-            all_records.append(rec_copy)
-
-    if not all_records:
-        # No data found
-        df_dummy = pd.DataFrame([{"Info": "No data available."}])
-        df_dummy.to_csv(output_file, index=False)
-        log_callback("No data found across all .txt files. Created a dummy CSV.")
+def tail_head_hash(filePath, length):
+    """SHA-1 of the first min(length, TAIL_HEAD_BYTES) bytes; tells a grown log from a replaced one."""
+    with open(filePath, 'rb') as f:
+        return hashlib.sha1(f.read(min(length, TAIL_HEAD_BYTES))).hexdigest()
+
+def tail_resume_offset(filePath, file_state):
+    """
+    Returns the offset to resume filePath from, or 0 when the file was
+    truncated, rotated or rewritten since file_state was saved.
+    """
+    offset = file_state.get("offset", 0)
+    if not offset:
+        return 0
+    if os.path.getsize(filePath) < offset:
+        return 0
+    with open(filePath, 'rb') as f:
+        f.seek(offset - len(EVENT_END_TAG))
+        if f.read(len(EVENT_END_TAG)) != EVENT_END_TAG:
+            return 0
+    if tail_head_hash(filePath, offset) != file_state.get("head"):
+        return 0
+    return offset
+
+def load_tail_state(state_path):
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != TAIL_STATE_VERSION:
+        return None
+    return state
+
+def save_tail_state(state_path, state):
+    temp_path = state_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, state_path)
+
+def export_cot_details_incremental(file_list, log_callback, output_dir=None, output_format="csv"):
+    """
+    Tail mode for logs that are still being written. Keeps one export per
+    file selection (no timestamp in its name) and a <export>.state.json next
+    to it with the byte offset just past the last complete event and the event
+    count of every file. Each call parses only the events appended since the
+    previous one and adds their rows to the export, so a refresh costs about
+    as much as the new data.
+
+    A partially written last event is left for the next call. If a file
+    shrank or its beginning changed (rotated or replaced log), or the export
+    itself is missing, the export is rebuilt from byte zero.
+    """
+    script_dir, base_name = cot_details_export_location(file_list, output_dir)
+    if output_format == "parquet":
+        if pq is None:
+            log_callback("Parquet export requires the pyarrow package (pip install pyarrow).")
+            return
+        output_path = os.path.join(script_dir, f"Exported CoT Details - {base_name} (incremental)")
     else:
-        df_all = pd.DataFrame(all_records)
-        df_all.to_csv(output_file, index=False)
+        output_path = os.path.join(script_dir, f"Exported CoT Details - {base_name} (incremental).csv")
+    state_path = output_path + TAIL_STATE_SUFFIX
 
-    log_callback(f"CSV file created: {output_file}")
+    valid_files = []
+    for filePath in file_list:
+        if not os.path.isfile(filePath):
+            log_callback(f"{filePath} is not a valid file.")
+            continue
+        valid_files.append(os.path.abspath(filePath))
+
+    state = load_tail_state(state_path)
+    resume_offsets = {}
+    if state and state.get("output_format") == output_format and os.path.exists(output_path):
+        for filePath in valid_files:
+            file_state = state["files"].get(filePath, {})
+            resume_offsets[filePath] = tail_resume_offset(filePath, file_state)
+            if file_state.get("offset") and not resume_offsets[filePath]:
+                log_callback(f"{filePath} was truncated or replaced since the last export; starting over.")
+                state = None
+                break
+    else:
+        state = None
+
+    if state is None:
+        log_callback(f"Starting a new incremental export: {output_path}")
+        if os.path.isdir(output_path):
+            shutil.rmtree(output_path)
+        elif os.path.isfile(output_path):
+            os.remove(output_path)
+        state = {"version": TAIL_STATE_VERSION, "output_format": output_format, "files": {}, "next_part": 0}
+        resume_offsets = {}
+
+    if output_format == "parquet":
+        sink = CotDetailsParquetSink(output_path, first_part=state["next_part"])
+    else:
+        sink = CotDetailsCsvSink(output_path, append=True)
+
+    for filePath in valid_files:
+        offset = resume_offsets.get(filePath, 0)
+        file_state = state["files"].get(filePath) if offset else None
+        event_count = file_state["events"] if file_state else 0
+        new_events = 0
+        log_callback(f"Parsing {filePath} from byte {offset}")
+        try:
+            for event_offset, raw_event in iter_event_spans(filePath, start_offset=offset, log_callback=log_callback):
+                offset = event_offset + len(raw_event)
+                new_events += 1
+                record = extract_cot_event_details(raw_event)
+                if record is not None:
+                    sink.add(*record)
+        except Exception as e:
+            log_callback(f"Error reading file {filePath}: {e}")
+        state["files"][filePath] = {
+            "offset": offset,
+            "events": event_count + new_events,
+            "head": tail_head_hash(filePath, offset),
+        }
+        log_callback(f"{new_events} new events ({event_count + new_events} total) from {filePath}")
+
+    sink.close(log_callback)
+    if output_format == "parquet":
+        state["next_part"] += sink.files_written
+    save_tail_state(state_path, state)
 
 #############################
 # GUI Application
@@ -536,7 +1944,7 @@ class CoTParserGUI(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("CoT Data Processor")
-        self.geometry("800x800")
+        self.geometry("800x1010")
         ctk.set_appearance_mode("system")
         ctk.set_default_color_theme("blue")
 
@@ -554,7 +1962,7 @@ class CoTParserGUI(ctk.CTk):
         buttons_frame = ctk.CTkFrame(main_frame)
         buttons_frame.grid(row=1, column=0, sticky="nsew", pady=10)
         buttons_frame.grid_columnconfigure(0, weight=1)
-        for i in range(8):
+        for i in range(13):
             buttons_frame.grid_rowconfigure(i, weight=0)
 
         self.load_button = ctk.CTkButton(buttons_frame, text="Load File/Folder", command=self.load_file, width=200)
@@ -572,11 +1980,29 @@ class CoTParserGUI(ctk.CTk):
         self.callsigns_button = ctk.CTkButton(buttons_frame, text="Get Callsigns", command=self.callsigns_action, width=200)
         self.callsigns_button.grid(row=4, column=0, pady=10)
 
+        self.summary_button = ctk.CTkButton(buttons_frame, text="Summarize Log", command=self.summary_action, width=200)
+        self.summary_button.grid(row=5, column=0, pady=10)
+
+        self.time_window_button = ctk.CTkButton(buttons_frame, text="Export Time Window", command=self.time_window_action, width=200)
+        self.time_window_button.grid(row=6, column=0, pady=10)
+
         self.export_cot_button = ctk.CTkButton(buttons_frame, text="Export CoT Details", command=self.export_cot_details_action, width=200)
-        self.export_cot_button.grid(row=5, column=0, pady=10)
+        self.export_cot_button.grid(row=7, column=0, pady=10)
+
+        self.refresh_export_button = ctk.CTkButton(buttons_frame, text="Refresh Incremental Export", command=self.refresh_export_action, width=200)
+        self.refresh_export_button.grid(row=8, column=0, pady=10)
+
+        self.export_format = ctk.StringVar(value="CSV")
+        self.export_format_menu = ctk.CTkOptionMenu(buttons_frame, values=["CSV", "Parquet"], variable=self.export_format, width=200)
+        self.export_format_menu.grid(row=9, column=0, pady=10)
+
+        self.workers_var = ctk.StringVar(value=str(GlobalState.exportWorkers))
+        ctk.CTkLabel(buttons_frame, text="Parallel Workers:").grid(row=10, column=0, pady=(10, 0))
+        ctk.CTkEntry(buttons_frame, textvariable=self.workers_var, width=200).grid(row=11, column=0, pady=(0, 10))
 
         self.return_home_button = ctk.CTkButton(buttons_frame, text="Return to Home", command=self.return_home_action, width=200)
-        self.return_home_button.grid(row=6, column=0, pady=10)
+        self.return_home_button.grid(row=12, column=0, pady=10)
+        self.incremental_output_dir = None
 
         log_frame = ctk.CTkFrame(main_frame)
         log_frame.grid(row=2, column=0, sticky="nsew", pady=10)
@@ -634,13 +2060,40 @@ class CoTParserGUI(ctk.CTk):
         if not GlobalState.selectedFiles:
             messagebox.showwarning("No File", "No file selected. Please load a file first.")
             return
-        
+
+        try:
+            workers = int(self.workers_var.get())
+            if workers < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Parallel workers must be a whole number of at least 1.")
+            return
+        GlobalState.exportWorkers = workers
+
         out_dir = filedialog.askdirectory(title="Select Destination Folder for CoT Export")
         if not out_dir:
             self.log("No output folder selected. Export canceled.")
             return
 
-        export_cot_details_multiple_files(GlobalState.selectedFiles, self.log, output_dir=out_dir)
+        export_cot_details_multiple_files(GlobalState.selectedFiles, self.log, output_dir=out_dir,
+                                          workers=GlobalState.exportWorkers,
+                                          output_format=self.export_format.get().lower())
+
+    def refresh_export_action(self):
+        if not GlobalState.selectedFiles:
+            messagebox.showwarning("No File", "No file selected. Please load a file first.")
+            return
+
+        # Ask once; later refreshes keep appending to the same export
+        if not self.incremental_output_dir:
+            out_dir = filedialog.askdirectory(title="Select Destination Folder for the Incremental Export")
+            if not out_dir:
+                self.log("No output folder selected. Export canceled.")
+                return
+            self.incremental_output_dir = out_dir
+
+        export_cot_details_incremental(GlobalState.selectedFiles, self.log, output_dir=self.incremental_output_dir,
+                                       output_format=self.export_format.get().lower())
 
     def remove_duplicates_action(self):
         if not GlobalState.selectedFiles:
@@ -684,6 +2137,34 @@ class CoTParserGUI(ctk.CTk):
         file = GlobalState.selectedFiles[0]
         extractUIDsAndCallsigns(file, self.log)
 
+    def summary_action(self):
+        if not GlobalState.selectedFiles:
+            messagebox.showwarning("No File", "No file selected. Please load a file first.")
+            return
+        file = GlobalState.selectedFiles[0]
+        summarizeLog(file, self.log)
+
+    def time_window_action(self):
+        if not GlobalState.selectedFiles:
+            messagebox.showwarning("No File", "No file selected. Please load a file first.")
+            return
+        file = GlobalState.selectedFiles[0]
+        start_dialog = ctk.CTkInputDialog(
+            text="Enter window start in Zulu format (e.g. 2025-01-12T17:00:00Z):",
+            title="Export Time Window"
+        )
+        start_time = start_dialog.get_input()
+        if not start_time:
+            return
+        end_dialog = ctk.CTkInputDialog(
+            text="Enter window end in Zulu format (e.g. 2025-01-12T18:00:00Z):",
+            title="Export Time Window"
+        )
+        end_time = end_dialog.get_input()
+        if not end_time:
+            return
+        exportTimeWindow(file, start_time, end_time, self.log)
+
     def return_home_action(self):
         self.destroy()
         import Home_Page
@@ -1,12 +1,598 @@
 import customtkinter as ctk
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone, timedelta
 import os
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import hashlib
+import json
+import pickle
+import shutil
+import tempfile
 from tkinter import filedialog, messagebox
+from openpyxl import load_workbook
+from openpyxl.styles import Alignment, Border, Font, Side
+import xlsxwriter
 
 import Home_Page
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+GEOCHAT_MMAP_BYTES = 256 * 1024 * 1024  # how much of the database SQLite may memory-map
+GEOCHAT_CHUNK_ROWS = 100000  # chat rows read from the database and written at a time
+GEOCHAT_STATE_SUFFIX = ".state.json"  # incremental export progress, next to the export
+GEOCHAT_STATE_VERSION = 1
+EXCEL_MAX_ROWS = 1048576  # rows in one worksheet, header included
+CHAT_COLUMNS = ['conversationId', 'receiveTime', 'sentTime', 'message', 'senderCallsign', 'status']
+# Chat rows with the conversation name from Groups in place of the conversationId
+# where one is known. Groups can list a conversation more than once; the last row
+# (highest rowid) names it. LIMIT -1 stops SQLite flattening the subquery into
+# the join, so the names are materialized once and looked up through an
+# automatic index even when a rowid range makes Chat look small to the planner.
+CHAT_SELECT = """
+SELECT COALESCE(g.conversationName, c.conversationId) AS conversationId,
+       c.receiveTime, c.sentTime, c.message, c.senderCallsign, c.status"""
+CHAT_JOIN = """
+FROM Chat AS c
+LEFT JOIN (
+    SELECT conversationId, conversationName FROM Groups
+    WHERE rowid IN (SELECT MAX(rowid) FROM Groups GROUP BY conversationId)
+    LIMIT -1
+) AS g ON g.conversationId = c.conversationId
+"""
+CHAT_QUERY = CHAT_SELECT + CHAT_JOIN
+# Batch exports also read the raw conversationId and sentTime: messages from
+# different devices are matched on those, since each device names its
+# conversations from its own Groups table.
+BATCH_CHAT_QUERY = CHAT_SELECT + ",\n       c.conversationId AS rawConversationId, c.sentTime AS rawSentTime" + CHAT_JOIN
+GROUPS_COLUMNS = ['conversationId', 'conversationName', 'createdLocally', 'destinations', 'parent']
+GROUPS_QUERY = f"""
+SELECT {', '.join(GROUPS_COLUMNS)}
+FROM Groups
+"""
+# Batch exports say which database each message was first found in
+BATCH_CHAT_COLUMNS = CHAT_COLUMNS + ['sourceDatabase']
+
+
+def open_statesaver(db_path, immutable=False):
+    """
+    Opens a WinTAK statesaver database read-only, with reads going through a
+    memory map of up to GEOCHAT_MMAP_BYTES. By default SQLite takes its usual
+    shared locks and reads the -wal file, so the database of a running WinTAK
+    gives a consistent snapshot. immutable=True tells SQLite the file can't
+    change, so it skips locking and the -wal file; only pass it for copies
+    of databases that nothing writes any more.
+    """
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.execute(f"PRAGMA mmap_size = {GEOCHAT_MMAP_BYTES}")
+    return conn
+
+
+def local_time_to_ms(time_str, tz_offset):
+    """Converts 'YYYY-MM-DD HH:MM:SS' at UTC offset tz_offset (hours) to a UNIX timestamp in milliseconds."""
+    local_time = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone(timedelta(hours=tz_offset)))
+    return int(local_time.timestamp() * 1000)
+
+
+def build_chat_query(start_ms=None, end_ms=None, conversations=(), after_rowid=None, max_rowid=None,
+                     base_query=CHAT_QUERY):
+    """
+    Returns (sql, params) for the Chat rows to export: optionally only those
+    sent at or after start_ms and before end_ms, and only those in
+    conversations, matched against the conversationId or its name.
+    after_rowid and max_rowid limit the rows to a range of Chat rowids, which
+    incremental exports use to read only the rows added since the last one.
+    base_query is CHAT_QUERY or BATCH_CHAT_QUERY.
+    """
+    conditions = []
+    params = []
+    if after_rowid is not None:
+        conditions.append("c.rowid > ?")
+        params.append(after_rowid)
+    if max_rowid is not None:
+        conditions.append("c.rowid <= ?")
+        params.append(max_rowid)
+    if start_ms is not None:
+        conditions.append("c.sentTime >= ?")
+        params.append(start_ms)
+    if end_ms is not None:
+        conditions.append("c.sentTime < ?")
+        params.append(end_ms)
+    if conversations:
+        placeholders = ', '.join('?' * len(conversations))
+        conditions.append(f"(c.conversationId IN ({placeholders}) OR g.conversationName IN ({placeholders}))")
+        params.extend(conversations)
+        params.extend(conversations)
+    sql = base_query
+    if conditions:
+        sql += "WHERE " + " AND ".join(conditions) + "\n"
+    # Rows come out in table order. With a time window the unary + stops that
+    # ORDER BY from steering SQLite away from an index on sentTime; the rows in
+    # the window are sorted afterwards instead.
+    if start_ms is not None or end_ms is not None:
+        return sql + "ORDER BY +c.rowid", params
+    return sql + "ORDER BY c.rowid", params
+
+
+def convert_timestamps(column, tz_offset):
+    """
+    Converts a column of UNIX timestamps in milliseconds to 'YYYY-MM-DD HH:MM:SS'
+    strings at UTC offset tz_offset (hours), with None where the timestamp is
+    missing. The whole column is converted at once with datetime64 arithmetic.
+    """
+    local_times = pd.to_datetime(column, unit='ms') + pd.Timedelta(hours=tz_offset)
+    seconds = local_times.to_numpy().astype('datetime64[s]')  # drops the milliseconds
+    text = np.datetime_as_string(seconds, unit='s').astype('U19')
+    # Swap the ISO 'T' separator for a space in place
+    text.view(np.uint32).reshape(len(text), 19)[:, 10] = ord(' ')
+    text = text.astype(object)
+    text[np.isnat(seconds)] = None
+    return pd.Series(text, index=column.index)
+
+
+def export_chat(conn, chat_query, chat_params, tz_offset, sink, chunk_rows=GEOCHAT_CHUNK_ROWS):
+    """
+    Reads the Chat rows chat_query selects chunk_rows at a time, converts their
+    times to tz_offset and hands each chunk to sink.write. Returns the number of
+    rows exported.
+    """
+    rows = 0
+    for chat_df in pd.read_sql_query(chat_query, conn, params=chat_params, chunksize=chunk_rows):
+        chat_df['receiveTime'] = convert_timestamps(chat_df['receiveTime'], tz_offset)
+        chat_df['sentTime'] = convert_timestamps(chat_df['sentTime'], tz_offset)
+        sink.write(chat_df)
+        rows += len(chat_df)
+    return rows
+
+
+def find_statesavers(folder):
+    """Every .sqlite file under folder (including subfolders, one per device), in path order."""
+    db_paths = []
+    for root, _dirs, files in os.walk(folder):
+        db_paths.extend(os.path.join(root, name) for name in files if name.lower().endswith('.sqlite'))
+    return sorted(db_paths)
+
+
+def message_keys(chat_df):
+    """
+    64-bit hashes of the raw conversationId, sender, raw sentTime and message
+    of each row (see BATCH_CHAT_QUERY), which identify the same message pulled
+    from different devices. The columns are normalised first so a column read
+    as ints from one database and as floats (because of a NULL) from another
+    still hashes the same.
+    """
+    key_df = pd.DataFrame({
+        column: chat_df[column].astype(object).where(chat_df[column].notna(), '').astype(str)
+        for column in ('rawConversationId', 'senderCallsign', 'message')
+    })
+    key_df['rawSentTime'] = pd.to_numeric(chat_df['rawSentTime'], errors='coerce').round().astype('Int64')
+    return pd.util.hash_pandas_object(key_df, index=False).to_numpy()
+
+
+class GeoChatSpillSink:
+    """
+    Sink for batch workers: adds each chunk's message_keys as a 'messageKey'
+    column, drops the raw key columns and pickles the chunk to a temporary
+    file, which the merging process reads back a chunk at a time with
+    read_spilled_chunks. close() returns the file's path.
+    """
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix='geochat-', suffix='.pickle')
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, chat_df):
+        chat_df['messageKey'] = message_keys(chat_df)
+        pickle.dump(chat_df.drop(columns=['rawConversationId', 'rawSentTime']), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self):
+        self.file.close()
+        return self.path
+
+
+class MessageKeySet:
+    """
+    Set of message_keys held as sorted np.uint64 runs. A new run is merged
+    into the newest one while that is no larger (like a binary counter), so
+    there are O(log n) runs, a lookup is one searchsorted per run, and
+    adding a chunk costs O(chunk log n) rather than a copy of every key seen.
+    """
+    def __init__(self):
+        self.runs = []
+
+    def contains(self, keys):
+        """Boolean mask of which of the np.uint64 keys are in the set."""
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[positions] == keys
+        return found
+
+    def add(self, keys):
+        """Adds np.uint64 keys that are unique and not in the set yet."""
+        if not len(keys):
+            return
+        run = np.sort(keys)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]))
+        self.runs.append(run)
+
+    def new_keys(self, keys):
+        """
+        Mask of the keys to keep: the first occurrence of each key in keys
+        that is not in the set yet. Those keys are added to the set.
+        """
+        first = np.unique(keys, return_index=True)[1]
+        first = first[~self.contains(keys[first])]
+        new = np.zeros(len(keys), dtype=bool)
+        new[first] = True
+        self.add(keys[first])
+        return new
+
+
+def read_spilled_chunks(spill_path):
+    with open(spill_path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def extract_statesaver(db_path, chat_query, chat_params, tz_offset, chunk_rows=GEOCHAT_CHUNK_ROWS):
+    """
+    Process-pool worker for batch exports: reads the Chat rows chat_query
+    (built on BATCH_CHAT_QUERY) selects from one database with export_chat,
+    chunk_rows at a time, into a GeoChatSpillSink, and reads the Groups table.
+    Returns (spill_path, groups_df, error); the caller removes the spill file.
+    """
+    spill = GeoChatSpillSink()
+    try:
+        # Batch folders hold databases copied off the devices after the exercise
+        conn = open_statesaver(db_path, immutable=True)
+        try:
+            export_chat(conn, chat_query, chat_params, tz_offset, spill, chunk_rows)
+            groups_df = pd.read_sql_query(GROUPS_QUERY, conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        os.remove(spill.close())
+        # pandas wraps SQLite errors in a message that repeats the whole query
+        return None, None, f"{db_path}: {e.__cause__ or e}"
+    return spill.close(), groups_df, None
+
+
+def export_chat_batch(db_paths, folder, tz_offset, sink, workers=1, start_ms=None, end_ms=None, conversations=(),
+                      chunk_rows=GEOCHAT_CHUNK_ROWS):
+    """
+    Extracts the databases in db_paths in a pool of worker processes and
+    writes their Chat rows to sink as one export, with a 'sourceDatabase'
+    column (the path relative to folder). The filters are those of
+    build_chat_query. A message already exported from another database, or
+    earlier in the same one, is skipped. The databases are merged in
+    db_paths order, so the output doesn't depend on which worker finishes
+    first.
+
+    Workers read their database chunk_rows at a time and spill the chunks to
+    a temporary file, which is merged a chunk at a time, so memory does not
+    grow with the size of the databases.
+
+    Returns (rows exported, duplicates skipped, merged Groups rows, errors).
+    """
+    chat_query, chat_params = build_chat_query(start_ms, end_ms, conversations, base_query=BATCH_CHAT_QUERY)
+    seen_keys = MessageKeySet()
+    groups_frames = []
+    errors = []
+    rows = duplicates = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(db_path):
+            return db_path, pool.submit(extract_statesaver, db_path, chat_query, chat_params, tz_offset, chunk_rows)
+
+        # Keep a bounded window of databases in flight, so only a few spill
+        # files wait on disk to be merged.
+        path_iter = iter(db_paths)
+        pending = deque(submit(db_path) for db_path in itertools.islice(path_iter, workers * 2))
+        try:
+            while pending:
+                db_path, future = pending.popleft()
+                spill_path, groups_df, error = future.result()
+                next_path = next(path_iter, None)
+                if next_path is not None:
+                    pending.append(submit(next_path))
+                if error:
+                    errors.append(error)
+                    continue
+
+                source = os.path.relpath(db_path, folder)
+                try:
+                    for chat_df in read_spilled_chunks(spill_path):
+                        keys = chat_df.pop('messageKey').to_numpy()
+                        new = seen_keys.new_keys(keys)
+                        duplicates += len(chat_df) - int(new.sum())
+                        chat_df = chat_df[new].assign(sourceDatabase=source)
+                        sink.write(chat_df)
+                        rows += len(chat_df)
+                finally:
+                    os.remove(spill_path)
+                groups_frames.append(groups_df)
+        finally:
+            # Don't leave the spill files of databases still in flight behind
+            for _db_path, future in pending:
+                if not future.cancel():
+                    spill_path = future.result()[0]
+                    if spill_path:
+                        os.remove(spill_path)
+
+    if groups_frames:
+        groups_df = pd.concat(groups_frames, ignore_index=True)
+        groups_df = groups_df.astype(object).where(groups_df.notna(), None).drop_duplicates(ignore_index=True)
+    else:
+        groups_df = pd.DataFrame(columns=GROUPS_COLUMNS)
+    return rows, duplicates, groups_df, errors
+
+
+def frame_rows(df):
+    """The rows of df as tuples, with None for every missing value."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class GeoChatExcelSink:
+    """
+    Streams chat rows into an .xlsx workbook with xlsxwriter's constant_memory
+    mode, which writes each row to disk as soon as the next one starts. When
+    'Chat Data' reaches max_rows a new sheet ('Chat Data 2', ...) is started,
+    and close() adds the 'Groups Data' sheet.
+    """
+    def __init__(self, output_path, max_rows=EXCEL_MAX_ROWS, columns=CHAT_COLUMNS):
+        self.output_path = output_path
+        self.max_rows = max_rows
+        self.columns = columns
+        self.workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+        # The header style pandas' to_excel uses
+        self.header_format = self.workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self.sheets = 0
+        self.sheet = None
+        self.next_row = 0
+        self.new_chat_sheet()
+
+    def new_chat_sheet(self):
+        self.sheets += 1
+        name = 'Chat Data' if self.sheets == 1 else f'Chat Data {self.sheets}'
+        self.sheet = self.workbook.add_worksheet(name)
+        self.sheet.write_row(0, 0, self.columns, self.header_format)
+        self.next_row = 1
+
+    def write(self, chat_df):
+        for row in frame_rows(chat_df):
+            if self.next_row >= self.max_rows:
+                self.new_chat_sheet()
+            self.sheet.write_row(self.next_row, 0, row)
+            self.next_row += 1
+
+    def close(self, groups_df):
+        sheet = self.workbook.add_worksheet('Groups Data')
+        sheet.write_row(0, 0, list(groups_df.columns), self.header_format)
+        for row_number, row in enumerate(frame_rows(groups_df), 1):
+            sheet.write_row(row_number, 0, row)
+        self.workbook.close()
+        return f"{self.output_path} ({self.sheets} Chat Data sheet{'s' if self.sheets > 1 else ''} and a Groups Data sheet)"
+
+
+class GeoChatCsvSink:
+    """
+    Appends chat rows to a CSV as they come; close() writes Groups to a CSV
+    next to it. With append=True the rows go on the end of an existing export.
+    """
+    def __init__(self, output_path, columns=CHAT_COLUMNS, append=False):
+        self.output_path = output_path
+        if not append:
+            pd.DataFrame(columns=columns).to_csv(output_path, index=False)
+
+    def write(self, chat_df):
+        chat_df.to_csv(self.output_path, mode='a', header=False, index=False)
+
+    def close(self, groups_df):
+        groups_path = f"{os.path.splitext(self.output_path)[0]} Groups.csv"
+        groups_df.to_csv(groups_path, index=False)
+        return f"{self.output_path} and {groups_path}"
+
+
+class GeoChatParquetSink:
+    """
+    Writes each chunk of chat rows as a row group of one Parquet file, every
+    column stored as strings so the chunks share a schema; close() writes
+    Groups to a Parquet file next to it.
+    """
+    def __init__(self, output_path, columns=CHAT_COLUMNS, groups_path=None):
+        self.output_path = output_path
+        self.groups_path = groups_path or f"{os.path.splitext(output_path)[0]} Groups.parquet"
+        self.schema = pa.schema([(column, pa.string()) for column in columns])
+        self.writer = pq.ParquetWriter(output_path, self.schema)
+
+    @staticmethod
+    def string_table(df, schema):
+        columns = [[None if value is None else str(value) for value in df[column].astype(object).where(df[column].notna(), None)]
+                   for column in schema.names]
+        return pa.Table.from_arrays([pa.array(values, type=pa.string()) for values in columns], schema=schema)
+
+    def write(self, chat_df):
+        self.writer.write_table(self.string_table(chat_df, self.schema))
+
+    def close(self, groups_df):
+        self.writer.close()
+        groups_schema = pa.schema([(column, pa.string()) for column in groups_df.columns])
+        pq.write_table(self.string_table(groups_df, groups_schema), self.groups_path)
+        return f"{self.output_path} and {self.groups_path}"
+
+
+class GeoChatExcelAppendSink:
+    """
+    Adds chat rows to a workbook GeoChatExcelSink wrote, continuing its last
+    Chat Data sheet (and rolling over at max_rows), and replaces its Groups
+    Data sheet. xlsxwriter can only write new files, so the workbook is loaded
+    with openpyxl and a refresh costs about as much as the whole workbook;
+    CSV and Parquet refreshes only touch the new rows.
+    """
+    def __init__(self, output_path, max_rows=EXCEL_MAX_ROWS, columns=CHAT_COLUMNS):
+        self.output_path = output_path
+        self.max_rows = max_rows
+        self.columns = columns
+        self.workbook = load_workbook(output_path)
+        chat_sheets = [name for name in self.workbook.sheetnames if name.startswith('Chat Data')]
+        self.sheets = len(chat_sheets)
+        self.sheet = self.workbook[chat_sheets[-1]]
+        # The header style GeoChatExcelSink uses
+        side = Side(style='thin')
+        self.header_style = {'font': Font(bold=True), 'border': Border(left=side, right=side, top=side, bottom=side),
+                             'alignment': Alignment(horizontal='center', vertical='top')}
+
+    def append_header(self, sheet, columns):
+        sheet.append(list(columns))
+        for cell in sheet[1]:
+            for name, style in self.header_style.items():
+                setattr(cell, name, style)
+
+    def write(self, chat_df):
+        for row in frame_rows(chat_df):
+            if self.sheet.max_row >= self.max_rows:
+                self.sheets += 1
+                self.sheet = self.workbook.create_sheet(f'Chat Data {self.sheets}')
+                self.append_header(self.sheet, self.columns)
+            self.sheet.append(row)
+
+    def close(self, groups_df):
+        if 'Groups Data' in self.workbook.sheetnames:
+            del self.workbook['Groups Data']
+        sheet = self.workbook.create_sheet('Groups Data')
+        self.append_header(sheet, groups_df.columns)
+        for row in frame_rows(groups_df):
+            sheet.append(row)
+        self.workbook.save(self.output_path)
+        return f"{self.output_path} ({self.sheets} Chat Data sheet{'s' if self.sheets > 1 else ''} and a Groups Data sheet)"
+
+
+EXPORT_SINKS = {
+    'Excel': ('.xlsx', GeoChatExcelSink),
+    'CSV': ('.csv', GeoChatCsvSink),
+    'Parquet': ('.parquet', GeoChatParquetSink),
+}
+
+
+def incremental_export_path(db_path, export_dir, extension):
+    """
+    The fixed export that incremental refreshes of db_path add to, named after
+    the database file and a hash of its full path (every WinTAK install names
+    its database statesaver.sqlite). A Parquet export is a folder of part files.
+    """
+    db_path = os.path.abspath(db_path)
+    path_hash = hashlib.sha1(db_path.encode('utf-8')).hexdigest()[:8]
+    base_path = os.path.join(export_dir, f"GeoChat Logs - {Path(db_path).stem} {path_hash} (incremental)")
+    return base_path if extension == '.parquet' else base_path + extension
+
+
+def load_geochat_state(state_path):
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != GEOCHAT_STATE_VERSION:
+        return None
+    return state
+
+
+def save_geochat_state(state_path, state):
+    temp_path = state_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, state_path)
+
+
+def export_chat_incremental(db_path, output_path, export_format, tz_offset, start_ms=None, end_ms=None, conversations=()):
+    """
+    Incremental mode for the database of a running WinTAK. Keeps one export
+    per database at output_path and a <export>.state.json next to it with the
+    highest Chat rowid exported so far (and that row's receiveTime). Each call
+    reads only the rows after that watermark, up to the highest rowid when the
+    call starts, and appends them to the export, so a refresh costs about as
+    much as the new messages.
+
+    The export is rebuilt from the first row if the state or the export is
+    missing, the format, timezone or filters changed, or the watermark row no
+    longer matches (the database was replaced or its chat history cleared).
+
+    Returns (rows added, rows in the export, what was written, whether the
+    export was rebuilt).
+    """
+    db_path = os.path.abspath(db_path)
+    state_path = output_path + GEOCHAT_STATE_SUFFIX
+    settings = {"database": db_path, "export_format": export_format, "tz_offset": tz_offset,
+                "start_ms": start_ms, "end_ms": end_ms, "conversations": list(conversations)}
+
+    conn = open_statesaver(db_path)
+    try:
+        # Rows added while this export runs are left for the next refresh
+        max_rowid = conn.execute("SELECT MAX(rowid) FROM Chat").fetchone()[0] or 0
+
+        state = load_geochat_state(state_path)
+        if state and state["settings"] == settings and os.path.exists(output_path) and state["last_rowid"] <= max_rowid:
+            if state["last_rowid"]:
+                watermark_row = conn.execute("SELECT receiveTime FROM Chat WHERE rowid = ?", (state["last_rowid"],)).fetchone()
+                if watermark_row is None or watermark_row[0] != state["last_receive_time"]:
+                    state = None
+        else:
+            state = None
+
+        rebuilt = state is None
+        if rebuilt:
+            if os.path.isdir(output_path):
+                shutil.rmtree(output_path)
+            elif os.path.isfile(output_path):
+                os.remove(output_path)
+            state = {"version": GEOCHAT_STATE_VERSION, "settings": settings, "last_rowid": 0,
+                     "last_receive_time": None, "rows": 0, "next_part": 0}
+
+        groups_df = pd.read_sql_query(GROUPS_QUERY, conn)
+        chat_query, chat_params = build_chat_query(start_ms, end_ms, conversations,
+                                                   after_rowid=state["last_rowid"], max_rowid=max_rowid)
+        if export_format == 'Excel':
+            sink = GeoChatExcelSink(output_path) if rebuilt else GeoChatExcelAppendSink(output_path)
+        elif export_format == 'CSV':
+            sink = GeoChatCsvSink(output_path, append=not rebuilt)
+        else:
+            # Each refresh adds a part file; read the folder as one dataset
+            os.makedirs(output_path, exist_ok=True)
+            part_path = os.path.join(output_path, f"chat-{state['next_part']:05d}.parquet")
+            sink = GeoChatParquetSink(part_path, groups_path=f"{output_path} Groups.parquet")
+        rows = export_chat(conn, chat_query, chat_params, tz_offset, sink)
+        written = sink.close(groups_df)
+        if export_format == 'Parquet':
+            if rows:
+                state["next_part"] += 1
+            else:
+                os.remove(part_path)
+            written = f"{output_path} and {sink.groups_path}"
+
+        watermark_row = conn.execute("SELECT receiveTime FROM Chat WHERE rowid = ?", (max_rowid,)).fetchone()
+    finally:
+        conn.close()
+
+    state["last_rowid"] = max_rowid
+    state["last_receive_time"] = watermark_row[0] if watermark_row else None
+    state["rows"] += rows
+    save_geochat_state(state_path, state)
+    return rows, state["rows"], written, rebuilt
+
 
 class GeoChatParserGUI(ctk.CTk):
     def __init__(self):
@@ -14,7 +600,7 @@ class GeoChatParserGUI(ctk.CTk):
 
         # Window settings
         self.title("GeoChat Parser")
-        self.geometry("800x600")
+        self.geometry("800x1200")
 
         # Set up main frame
         frame = ctk.CTkFrame(self)
@@ -41,6 +627,17 @@ class GeoChatParserGUI(ctk.CTk):
         browse_button = ctk.CTkButton(frame, text="Browse", command=self.browse_db)
         browse_button.pack(pady=(0, 10))
 
+        # Batch mode: every database in a folder (one per device), merged into one export
+        self.folder_path_var = ctk.StringVar(value="")
+        self.workers_var = ctk.StringVar(value=str(os.cpu_count() or 1))
+
+        ctk.CTkLabel(frame, text="Database Folder (batch export):").pack(pady=(10, 0))
+        ctk.CTkEntry(frame, textvariable=self.folder_path_var, width=400).pack(pady=(0, 10))
+        ctk.CTkButton(frame, text="Browse Folder", command=self.browse_folder).pack(pady=(0, 10))
+
+        ctk.CTkLabel(frame, text="Parallel Workers:").pack(pady=(10, 0))
+        ctk.CTkEntry(frame, textvariable=self.workers_var, width=100).pack(pady=(0, 10))
+
         # Dropdown menu for timezone selection
         self.timezone_var = ctk.StringVar(value="EST")  # Default to EST
         timezone_label = ctk.CTkLabel(frame, text="Select Timezone:")
@@ -49,9 +646,34 @@ class GeoChatParserGUI(ctk.CTk):
         timezone_menu = ctk.CTkOptionMenu(frame, variable=self.timezone_var, values=["EST", "CST", "MST", "PST"])
         timezone_menu.pack(pady=(0, 10))
 
+        # Output format for the export
+        self.export_format_var = ctk.StringVar(value="Excel")
+        ctk.CTkLabel(frame, text="Export Format:").pack(pady=(10, 0))
+        ctk.CTkOptionMenu(frame, variable=self.export_format_var, values=list(EXPORT_SINKS)).pack(pady=(0, 10))
+
+        # Optional filters, applied in the database query
+        self.start_time_var = ctk.StringVar(value="")
+        self.end_time_var = ctk.StringVar(value="")
+        self.conversations_var = ctk.StringVar(value="")
+
+        ctk.CTkLabel(frame, text="Sent From (YYYY-MM-DD HH:MM:SS, optional):").pack(pady=(10, 0))
+        ctk.CTkEntry(frame, textvariable=self.start_time_var, width=400).pack(pady=(0, 10))
+
+        ctk.CTkLabel(frame, text="Sent Until (YYYY-MM-DD HH:MM:SS, optional):").pack(pady=(10, 0))
+        ctk.CTkEntry(frame, textvariable=self.end_time_var, width=400).pack(pady=(0, 10))
+
+        ctk.CTkLabel(frame, text="Conversations (comma-separated names or IDs, optional):").pack(pady=(10, 0))
+        ctk.CTkEntry(frame, textvariable=self.conversations_var, width=400).pack(pady=(0, 10))
+
         # Start Parsing Button
         start_button = ctk.CTkButton(frame, text="Start Parsing", command=self.start_parsing)
-        start_button.pack(pady=20)
+        start_button.pack(pady=(20, 10))
+
+        refresh_button = ctk.CTkButton(frame, text="Refresh Incremental Export", command=self.refresh_incremental_export)
+        refresh_button.pack(pady=(0, 10))
+
+        batch_button = ctk.CTkButton(frame, text="Start Batch Export", command=self.start_batch_parsing)
+        batch_button.pack(pady=(0, 20))
 
         # Return to Home Page Button
         return_button = ctk.CTkButton(frame, text="Return to Home Page", command=self.return_to_home)
@@ -65,14 +687,18 @@ class GeoChatParserGUI(ctk.CTk):
         if file_path:
             self.db_path_var.set(file_path)
 
-    def start_parsing(self):
-        db_path = self.db_path_var.get()
-
-        # Check if the database file exists
-        if not os.path.exists(db_path):
-            messagebox.showerror("Error", f"The database file was not found at {db_path}")
-            return
-
+    def browse_folder(self):
+        # Open a dialog to select a folder of databases for a batch export
+        folder_path = filedialog.askdirectory()
+        if folder_path:
+            self.folder_path_var.set(folder_path)
+
+    def read_export_settings(self):
+        """
+        Reads the timezone, filters and export format shared by every export.
+        Returns (tz_offset, (start_ms, end_ms, conversations), export_format),
+        or None after showing an error if an input is invalid.
+        """
         # Get the selected timezone from the dropdown
         selected_timezone = self.timezone_var.get()
 
@@ -85,64 +711,145 @@ class GeoChatParserGUI(ctk.CTk):
         }
         tz_offset = timezone_offsets.get(selected_timezone, -5)  # Default to EST if not found
 
+        # Optional sent-time window and conversation filter
+        start_str = self.start_time_var.get().strip()
+        end_str = self.end_time_var.get().strip()
         try:
-            # Connect to the SQLite database
-            conn = sqlite3.connect(db_path)
-
-            # Query to extract the necessary columns from the Chat and Groups tables
-            chat_query = """
-            SELECT conversationId, receiveTime, sentTime, message, senderCallsign, status
-            FROM Chat
-            """
-            groups_query = """
-            SELECT conversationId, conversationName, createdLocally, destinations, parent
-            FROM Groups
-            """
-
-            # Load the data into pandas DataFrames
-            chat_df = pd.read_sql_query(chat_query, conn)
-            groups_df = pd.read_sql_query(groups_query, conn)
-
-            # Close the connection
-            conn.close()
+            start_ms = local_time_to_ms(start_str, tz_offset) if start_str else None
+            # Times are exported to the second, so the end second is included whole
+            end_ms = local_time_to_ms(end_str, tz_offset) + 1000 if end_str else None
+        except ValueError:
+            messagebox.showerror("Error", "Invalid sent time. Please use YYYY-MM-DD HH:MM:SS")
+            return None
+        conversations = [name.strip() for name in self.conversations_var.get().split(',') if name.strip()]
+
+        export_format = self.export_format_var.get()
+        if export_format == 'Parquet' and pq is None:
+            messagebox.showerror("Error", "Parquet export requires the pyarrow package (pip install pyarrow).")
+            return None
+        return tz_offset, (start_ms, end_ms, conversations), export_format
+
+    @staticmethod
+    def export_folder():
+        # Define the path for the folder the exports go in
+        home_dir = os.path.expanduser("~")
+        folder_path = os.path.join(home_dir, 'Desktop', 'GeoChat Logs')  # Folder on Desktop
+
+        # Check if the folder exists; if not, create it
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+        return folder_path
+
+    def new_export_path(self, extension):
+        folder_path = self.export_folder()
+
+        # Add the current date and time to the file name
+        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")  # Format: YYYY-MM-DD_HH-MM-SS
+        return os.path.join(folder_path, f'GeoChat Logs_{current_time}{extension}')
+
+    def start_parsing(self):
+        db_path = self.db_path_var.get()
 
-            # Function to convert the UNIX timestamp to the selected timezone
-            def convert_to_timezone(unix_timestamp):
-                if pd.isna(unix_timestamp):
-                    return None
-                utc_time = datetime.fromtimestamp(unix_timestamp / 1000, tz=timezone.utc)  # Convert from milliseconds to seconds
-                local_time = utc_time.astimezone(timezone(timedelta(hours=tz_offset)))  # Convert to the selected timezone
-                return local_time.strftime('%Y-%m-%d %H:%M:%S')
+        # Check if the database file exists
+        if not os.path.exists(db_path):
+            messagebox.showerror("Error", f"The database file was not found at {db_path}")
+            return
 
-            # Apply the conversion function to receiveTime and sentTime columns in the Chat DataFrame
-            chat_df['receiveTime'] = chat_df['receiveTime'].apply(convert_to_timezone)
-            chat_df['sentTime'] = chat_df['sentTime'].apply(convert_to_timezone)
+        settings = self.read_export_settings()
+        if settings is None:
+            return
+        tz_offset, filters, export_format = settings
+        extension, sink_class = EXPORT_SINKS[export_format]
+        # The conversation names, time window and conversation filter are all
+        # applied by SQLite
+        chat_query, chat_params = build_chat_query(*filters)
 
-            # Create a dictionary mapping conversationId to conversationName
-            conversation_mapping = dict(zip(groups_df['conversationId'], groups_df['conversationName']))
+        try:
+            export_path = self.new_export_path(extension)
 
-            # Replace conversationId in chat_df with corresponding conversationName, if available
-            chat_df['conversationId'] = chat_df['conversationId'].map(conversation_mapping).fillna(chat_df['conversationId'])
+            # Open the database read-only
+            conn = open_statesaver(db_path)
+            try:
+                groups_df = pd.read_sql_query(GROUPS_QUERY, conn)
 
-            # Define the path for the folder and Excel file
-            home_dir = os.path.expanduser("~")
-            folder_path = os.path.join(home_dir, 'Desktop', 'GeoChat Logs')  # Folder on Desktop
+                # The rows are read and written a chunk at a time
+                sink = sink_class(export_path)
+                rows = export_chat(conn, chat_query, chat_params, tz_offset, sink)
+                written = sink.close(groups_df)
+            finally:
+                conn.close()
 
-            # Check if the folder exists; if not, create it
-            if not os.path.exists(folder_path):
-                os.makedirs(folder_path)
+            messagebox.showinfo("Success", f"{rows} chat messages have been successfully exported to {written}.")
+        
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {e}")
 
-            # Add the current date and time to the file name
-            current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")  # Format: YYYY-MM-DD_HH-MM-SS
-            excel_file_path = os.path.join(folder_path, f'GeoChat Logs_{current_time}.xlsx')
+    def refresh_incremental_export(self):
+        db_path = self.db_path_var.get()
+
+        # Check if the database file exists
+        if not os.path.exists(db_path):
+            messagebox.showerror("Error", f"The database file was not found at {db_path}")
+            return
 
-            # Use ExcelWriter to save multiple DataFrames to separate sheets in the same Excel file
-            with pd.ExcelWriter(excel_file_path, engine='xlsxwriter') as writer:
-                chat_df.to_excel(writer, sheet_name='Chat Data', index=False)
-                groups_df.to_excel(writer, sheet_name='Groups Data', index=False)
+        settings = self.read_export_settings()
+        if settings is None:
+            return
+        tz_offset, filters, export_format = settings
+        extension = EXPORT_SINKS[export_format][0]
+
+        try:
+            # One export per database, added to on every refresh
+            output_path = incremental_export_path(db_path, self.export_folder(), extension)
+            rows, total_rows, written, rebuilt = export_chat_incremental(db_path, output_path, export_format, tz_offset, *filters)
+            if rebuilt:
+                message = f"Started a new incremental export: {total_rows} chat messages exported to {written}."
+            else:
+                message = f"{rows} new chat messages ({total_rows} in total) have been added to {written}."
+            messagebox.showinfo("Success", message)
+
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {e}")
+
+    def start_batch_parsing(self):
+        folder_path = self.folder_path_var.get()
+
+        # Check the folder exists and has databases in it
+        if not os.path.isdir(folder_path):
+            messagebox.showerror("Error", f"The folder was not found at {folder_path}")
+            return
+        db_paths = find_statesavers(folder_path)
+        if not db_paths:
+            messagebox.showerror("Error", f"No .sqlite databases were found in {folder_path}")
+            return
+
+        try:
+            workers = int(self.workers_var.get())
+            if workers < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Parallel workers must be a whole number of at least 1.")
+            return
+
+        settings = self.read_export_settings()
+        if settings is None:
+            return
+        tz_offset, filters, export_format = settings
+        extension, sink_class = EXPORT_SINKS[export_format]
+
+        try:
+            export_path = self.new_export_path(extension)
+            sink = sink_class(export_path, columns=BATCH_CHAT_COLUMNS)
+            rows, duplicates, groups_df, errors = export_chat_batch(
+                db_paths, folder_path, tz_offset, sink, min(workers, len(db_paths)), *filters)
+            written = sink.close(groups_df)
+
+            message = (f"{rows} chat messages from {len(db_paths) - len(errors)} database(s) have been successfully "
+                       f"exported to {written}. {duplicates} duplicate message(s) seen on more than one device were skipped.")
+            if errors:
+                message += f"\n\n{len(errors)} database(s) could not be read:\n" + "\n".join(errors)
+            messagebox.showinfo("Success", message)
 
-            messagebox.showinfo("Success", f"Data has been successfully exported to {excel_file_path} with separate tabs for Chat and Groups data.")
-        
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
 
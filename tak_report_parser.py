@@ -1,4 +1,6 @@
 import csv
+import hashlib
+import json
 import time
 import tkinter
 import customtkinter as ctk
@@ -7,7 +9,6 @@ import os
 import requests
 import xml.etree.ElementTree as ET
 import zipfile
-from io import BytesIO
 from cryptography.hazmat.primitives.serialization import pkcs12
 from cryptography.hazmat.primitives.serialization import Encoding, PrivateFormat, NoEncryption
 from cryptography.hazmat.backends import default_backend
@@ -15,14 +16,415 @@ from openpyxl import Workbook
 from datetime import datetime, timezone, timedelta
 import re
 import shutil
+import tempfile
 import threading
-from pygeodesy import ellipsoidalVincenty as ev
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import numpy as np
+from pygeodesy import Datums, ellipsoidalVincenty as ev
 import Home_Page
 import urllib3
 
 # Suppress InsecureRequestWarning messages for faster parsing
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+DOWNLOAD_WORKERS = 8  # default number of files fetched at once
+DOWNLOAD_RETRIES = 3  # attempts per file before giving up
+DOWNLOAD_BACKOFF_SECONDS = 1  # first retry delay, doubled on every further attempt
+PIPELINE_POLL_MS = 100  # how often the GUI checks the report pipeline's event queue
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+PACKAGE_CACHE_MAX_BYTES = 10 * 1024 ** 3  # downloaded files kept between runs
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024  # response bodies are written to disk in pieces this size
+# Report locations are stored as WKT points, longitude first
+LOCATION_POINT_PATTERN = re.compile(r"POINT \(([-\d.]+) ([-\d.]+)\)")
+# UTM/MGRS parameters; the ellipsoid constants come from pygeodesy so the
+# batch conversion agrees with ev.LatLon(...).toMgrs() digit for digit
+MGRS_ELLIPSOID = Datums.WGS84.ellipsoid
+UTM_SCALE_FACTOR = 0.9996
+UTM_FALSE_EASTING = 500000.0
+UTM_FALSE_NORTHING = 10000000.0
+MGRS_BANDS = 'CDEFGHJKLMNPQRSTUVWXX'  # 8 degree rows from 80S, X stretched to 84N
+MGRS_COLUMN_LETTERS = ('ABCDEFGH', 'JKLMNPQR', 'STUVWXYZ')  # repeating every third zone
+MGRS_ROW_LETTERS = ('ABCDEFGHJKLMNPQRSTUV', 'FGHJKLMNPQRSTUVABCDE')  # odd zones, even zones
+MGRS_EDGE_METERS = 1e-4  # closer than this to a whole meter, pygeodesy converts the point
+MGRS_CACHE_MAX_POINTS = 100000  # distinct positions remembered between conversions
+mgrs_cache = {}  # (lat, lon) -> MGRS string
+# Column F (the first template section, which never holds a value) is left
+# out of every exported sheet
+EXPORT_DROPPED_COLUMN = 5
+
+def metadata_keywords(file_info):
+    # Keywords come back as a string on some servers and as a list on others
+    keywords = file_info.get('Keywords') or ''
+    if isinstance(keywords, list):
+        keywords = ' '.join(str(keyword) for keyword in keywords)
+    return keywords.lower()
+
+def metadata_submission_time(file_info):
+    """Returns the entry's submission time as an aware UTC datetime, or None if it has none we can read."""
+    value = file_info.get('SubmissionDateTime') or file_info.get('SubmissionTime')
+    if not value:
+        return None
+    try:
+        submitted = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if submitted.tzinfo is None:
+        submitted = submitted.replace(tzinfo=timezone.utc)
+    return submitted.astimezone(timezone.utc)
+
+def prefilter_metadata(entries, start_utc=None, seen_hashes=()):
+    """
+    Narrows the /Marti/api/files/metadata listing to the entries a run will
+    actually download: citrap keyword, a Hash and MimeType to fetch them by,
+    submitted at or after start_utc, and not a Hash already seen (earlier in
+    the listing or in seen_hashes). Entries with no readable submission time
+    are kept.
+    """
+    relevant = []
+    hashes = set(seen_hashes)
+    for file_info in entries:
+        if 'citrap' not in metadata_keywords(file_info):
+            continue
+        report_hash = file_info.get('Hash')
+        if not report_hash or not file_info.get('MimeType') or report_hash in hashes:
+            continue
+        submitted = metadata_submission_time(file_info)
+        if start_utc is not None and submitted is not None and submitted < start_utc:
+            continue
+        hashes.add(report_hash)
+        relevant.append(file_info)
+    return relevant
+
+def advance_sync_state(state, fetched_entries, failed_entries=()):
+    """
+    Adds a run's fetched entries to Sync Mode state: their Hashes, and the
+    latest of their SubmissionTimes as the high-water mark. The mark is kept
+    below the earliest SubmissionTime of an entry whose download failed, so
+    prefilter_metadata still lets that entry through on the next run; the
+    entries fetched after it are skipped by their Hash instead.
+    """
+    failed_times = [submitted for submitted in map(metadata_submission_time, failed_entries) if submitted]
+    earliest_failure = min(failed_times) if failed_times else None
+    hashes = set(state['hashes'])
+    for file_info in fetched_entries:
+        hashes.add(file_info['Hash'])
+        submitted = metadata_submission_time(file_info)
+        if not submitted or (earliest_failure is not None and submitted >= earliest_failure):
+            continue
+        if not state['high_water'] or submitted > datetime.fromisoformat(state['high_water']):
+            state['high_water'] = submitted.isoformat()
+    state['hashes'] = sorted(hashes)
+    return state
+
+def prune_sheet_times(state, tz_offset):
+    """
+    Drops the Date/Times in Sync Mode state's sheet_times that are earlier
+    than the high-water mark (shown in the export's timezone, as column C
+    is). Reports submitted after the mark are almost always dated after it
+    too, so the list stays bounded by what one sync window can repeat rather
+    than growing with the whole history.
+    """
+    if not state['high_water']:
+        return state
+    cutoff = datetime.fromisoformat(state['high_water']).astimezone(timezone(timedelta(hours=tz_offset)))
+    cutoff = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+    state['sheet_times'] = {sheet_name: [time for time in times if time >= cutoff]
+                            for sheet_name, times in state['sheet_times'].items()}
+    return state
+
+def export_row(row):
+    """Returns row as it is written to an exported sheet, without column F."""
+    return row[:EXPORT_DROPPED_COLUMN] + row[EXPORT_DROPPED_COLUMN + 1:]
+
+def is_sha256_hash(report_hash):
+    return re.fullmatch(r'[0-9a-fA-F]{64}', report_hash) is not None
+
+class PackageCache:
+    """
+    On-disk cache of downloaded files keyed by their server Hash. Files on
+    /Marti/api/files are addressed by the SHA-256 of their content, so an
+    entry never goes stale; downloads are checked against their Hash before
+    they are added. Reads refresh the file's mtime, and once the cache grows
+    past max_bytes the least recently used files are removed, except those
+    handed out and not yet released. Safe to use from the download threads.
+    """
+
+    def __init__(self, folder, max_bytes=PACKAGE_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.in_use = set()  # paths handed out by get()/add() and not yet released
+        os.makedirs(self.folder, exist_ok=True)
+        self.total_bytes = sum(os.path.getsize(path) for path in self.cached_paths())
+
+    def cached_paths(self):
+        for prefix in os.scandir(self.folder):
+            if prefix.is_dir():
+                for entry in os.scandir(prefix.path):
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        yield entry.path
+
+    def path_for(self, report_hash):
+        return os.path.join(self.folder, report_hash[:2], report_hash)
+
+    def temp_path_for(self, report_hash):
+        """Where a download in progress is written, on the same disk as the cache."""
+        path = self.path_for(report_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{threading.get_ident()}.tmp"
+
+    def get(self, report_hash):
+        """Returns the path of the cached file for report_hash, or None."""
+        path = self.path_for(report_hash)
+        with self.lock:
+            try:
+                os.utime(path)
+            except OSError:
+                return None
+            self.in_use.add(path)
+        return path
+
+    def add(self, report_hash, temp_path):
+        """Moves a finished download into the cache and returns its cached path."""
+        path = self.path_for(report_hash)
+        with self.lock:
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self.total_bytes += os.path.getsize(path) - replaced
+            self.in_use.add(path)
+        self.evict()
+        return path
+
+    def release(self, path):
+        with self.lock:
+            self.in_use.discard(path)
+
+    def remove(self, path):
+        with self.lock:
+            if path in self.in_use:
+                return
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            self.total_bytes -= size
+
+    def evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        with self.lock:
+            by_age = sorted(self.cached_paths(), key=os.path.getmtime)
+        for path in by_age:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.remove(path)
+
+class TAKFileDownloader:
+    """
+    Fetches files from /Marti/api/files/{hash} on a thread pool. All requests
+    share one requests.Session, so the client-certificate TLS handshake is done
+    once per pooled connection instead of once per file. Connection errors,
+    timeouts and 408/429/5xx responses are retried with exponential backoff;
+    other HTTP errors fail straight away.
+
+    Response bodies are streamed to disk in DOWNLOAD_CHUNK_BYTES pieces, so
+    memory per download stays small whatever the package size. With a
+    PackageCache they land in the cache, and files an earlier run downloaded
+    are not fetched again; without one they go to a temporary folder. Either
+    way, hand the path back to release() once it has been handled.
+    """
+
+    def __init__(self, file_url_template, ssl_cert, workers=DOWNLOAD_WORKERS,
+                 retries=DOWNLOAD_RETRIES, backoff_seconds=DOWNLOAD_BACKOFF_SECONDS, cache=None):
+        self.file_url_template = file_url_template
+        self.cache = cache
+        self.workers = workers
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.temp_folder = None if cache is not None else tempfile.mkdtemp(prefix='tak-downloads-')
+        self.session = requests.Session()
+        self.session.cert = ssl_cert
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tak-download')
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', 60)
+        return self.session.get(url, **kwargs)
+
+    def fetch(self, file_info):
+        """Returns (path, None) or (None, error message) for one metadata entry."""
+        report_hash = file_info['Hash']
+        if self.cache is not None:
+            path = self.cache.get(report_hash)
+            if path is not None:
+                print(f"Using cached copy of {file_info['Name']}")
+                return path, None
+            temp_path = self.cache.temp_path_for(report_hash)
+        else:
+            temp_path = os.path.join(self.temp_folder, f"{report_hash}.{threading.get_ident()}.tmp")
+
+        file_url = self.file_url_template.format(hash=report_hash)
+        for attempt in range(1, self.retries + 1):
+            try:
+                self.download_to(file_url, temp_path, report_hash)
+                if self.cache is not None:
+                    return self.cache.add(report_hash, temp_path), None
+                return temp_path, None
+            except (requests.exceptions.RequestException, OSError) as e:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                status = getattr(e, 'response', None)
+                status = status.status_code if status is not None else None
+                if status is not None and status not in RETRYABLE_STATUS_CODES:
+                    return None, f"Failed to fetch report from {file_url}: {e}"
+                if attempt == self.retries:
+                    return None, f"Giving up on {file_info['Name']} after {self.retries} attempts: {e}"
+                delay = self.backoff_seconds * 2 ** (attempt - 1)
+                print(f"Failed to fetch {file_info['Name']} ({e}); retrying in {delay}s...")
+                time.sleep(delay)
+
+    def download_to(self, file_url, path, report_hash):
+        digest = hashlib.sha256()
+        with self.get(file_url, stream=True) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as out_file:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                    digest.update(chunk)
+                    out_file.write(chunk)
+        if is_sha256_hash(report_hash) and digest.hexdigest() != report_hash.lower():
+            raise requests.exceptions.ContentDecodingError(f"downloaded content does not match its Hash {report_hash}")
+
+    def submit(self, file_info):
+        return self.executor.submit(self.fetch, file_info)
+
+    def release(self, path):
+        """Call once a fetched file has been handled."""
+        if self.cache is not None:
+            self.cache.release(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self.temp_folder:
+            shutil.rmtree(self.temp_folder, ignore_errors=True)
+
+class ReportIndex:
+    """
+    Everything the template fields look up in one report, gathered in a single
+    walk of its tree:
+      options         title -> first <option> with that title anywhere in the
+                      report (what .//option[@title="..."] finds)
+      list_selections title -> titles of the selected options of the first
+                      <list> with that title
+      geometry        title -> value of the first geometry <option> directly
+                      under a <section>, sections taken in document order
+    """
+
+    def __init__(self, report):
+        self.options = {}
+        for option in report.iter('option'):
+            self.options.setdefault(option.get('title'), option)
+
+        self.list_selections = {}
+        for list_ in report.iter('list'):
+            title = list_.get('title')
+            if title not in self.list_selections:
+                self.list_selections[title] = [
+                    option.get('title') for option in list_.iter('option')
+                    if option.get('selected') == 'true'
+                ]
+
+        self.geometry = {}
+        for section in report.iter('section'):
+            for option in section.findall('option'):
+                if option.get('type') == 'geometry':
+                    self.geometry.setdefault(option.get('title'), option.get('value'))
+
+def latlon_to_mgrs_batch(lats, lons):
+    """
+    Converts arrays of WGS84 latitudes and longitudes (degrees) to MGRS strings
+    exactly as str(ev.LatLon(lat, lon).toMgrs()) writes them, e.g.
+    "18S UJ 23394 07395", and returns them as a list with None for any point
+    that can't be converted.
+
+    The UTM projection (Karney's 8th order Kruger series, the one pygeodesy
+    uses) and the grid letters are computed for the whole array at once.
+    Points that pygeodesy treats specially are handed to it one at a time:
+    the polar (UPS) caps, the Norway and Svalbard zone exceptions, and points
+    whose easting or northing is within MGRS_EDGE_METERS of the whole meter
+    the grid reference truncates to, where rounding could tip the digits.
+    """
+    lat = np.asarray(lats, dtype=np.float64)
+    lon = np.asarray(lons, dtype=np.float64)
+    results = [None] * len(lat)
+
+    with np.errstate(invalid='ignore'):
+        batch = (np.isfinite(lat) & np.isfinite(lon)
+                 & (lat >= -80) & (lat < 84) & (lon >= -180) & (lon <= 180)
+                 & ~((lat >= 56) & (lon >= 0) & (lon < 42)))
+    lat = np.where(batch, lat, 0.0)
+    lon = np.where(batch, lon, 0.0)
+
+    # Zone from the longitude wrapped into [-180, 180), band from 8 degree latitude rows
+    wrapped = np.mod(lon + 180.0, 360.0)
+    zone = wrapped.astype(np.int64) // 6 + 1
+    band = (lat + 80.0).astype(np.int64) >> 3
+
+    a = np.radians(lat)
+    b = np.radians(wrapped - 180.0 - (zone * 6 - 183))
+    sin_b, cos_b = np.sin(b), np.cos(b)
+    t = np.tan(a)
+    t12 = np.hypot(1.0, t)
+    s = np.sinh(MGRS_ELLIPSOID.e * np.arctanh(MGRS_ELLIPSOID.e * t / t12))
+    t_ = t * np.hypot(1.0, s) - s * t12
+    h = np.hypot(t_, cos_b)
+    ksi = np.arctan2(t_, cos_b)
+    eta = np.arcsinh(sin_b / h)
+    x, y = eta.copy(), ksi.copy()
+    for j, alpha in enumerate(MGRS_ELLIPSOID.AlphaKs, 1):
+        x += alpha * np.cos(2 * j * ksi) * np.sinh(2 * j * eta)
+        y += alpha * np.sin(2 * j * ksi) * np.cosh(2 * j * eta)
+    scale = MGRS_ELLIPSOID.A * UTM_SCALE_FACTOR
+    easting = x * scale + UTM_FALSE_EASTING
+    northing = np.where(lat < 0, y * scale + UTM_FALSE_NORTHING, y * scale)
+
+    for meters in (easting, northing):
+        fraction = meters - np.floor(meters)
+        batch &= (fraction > MGRS_EDGE_METERS) & (fraction < 1 - MGRS_EDGE_METERS)
+
+    rows = zip(batch.tolist(), zone.tolist(), band.tolist(),
+               np.floor(easting).astype(np.int64).tolist(), np.floor(northing).astype(np.int64).tolist())
+    for i, (in_batch, z, band_index, e, n) in enumerate(rows):
+        if not in_batch:
+            try:
+                results[i] = str(ev.LatLon(float(lats[i]), float(lons[i])).toMgrs())
+            except Exception:
+                pass
+            continue
+        square = MGRS_COLUMN_LETTERS[(z - 1) % 3][e // 100000 - 1] + MGRS_ROW_LETTERS[(z - 1) % 2][n // 100000 % 20]
+        results[i] = f"{z:02d}{MGRS_BANDS[band_index]} {square} {e % 100000:05d} {n % 100000:05d}"
+    return results
+
+def cache_mgrs(points):
+    """Converts the (lat, lon) points not already in mgrs_cache in one batch and caches them."""
+    missing = list({point for point in points if point not in mgrs_cache})
+    if not missing:
+        return
+    if len(mgrs_cache) + len(missing) > MGRS_CACHE_MAX_POINTS:
+        mgrs_cache.clear()
+    lats, lons = zip(*missing)
+    for point, mgrs in zip(missing, latlon_to_mgrs_batch(lats, lons)):
+        if mgrs is not None:
+            mgrs_cache[point] = mgrs
+
 # Set up customtkinter
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("dark-blue")
@@ -37,6 +439,7 @@ class TAKReportGUI(ctk.CTk):
         self.repository_folder = os.path.join(app_dir, 'ServerConnections')
         self.repository_file = os.path.join(self.repository_folder, 'connections.csv')
         os.makedirs(self.repository_folder, exist_ok=True)
+        self.package_cache_folder = os.path.join(app_dir, 'PackageCache')
 
         # User input variables
         self.pfx_file_path = ctk.StringVar()
@@ -48,6 +451,12 @@ class TAKReportGUI(ctk.CTk):
         self.timezone_selection = ctk.StringVar(value="EST")
         self.start_datetime_str = ctk.StringVar()
         self.output_option = ctk.StringVar(value="Combined Workbook")
+        self.download_workers = ctk.StringVar(value=str(DOWNLOAD_WORKERS))
+        self.sync_mode = ctk.BooleanVar(value=False)
+        self.current_ticket_number = None
+        self.sync_state = None
+        self.pipeline_thread = None
+        self.pipeline_events = queue.Queue()
 
         # We'll define directories after the user chooses the output folder
         self.output_parent_folder = None
@@ -123,9 +532,14 @@ class TAKReportGUI(ctk.CTk):
         ctk.CTkLabel(input_frame, text="CSV Output Option:").grid(row=9, column=0, padx=10, pady=10, sticky="e")
         ctk.CTkOptionMenu(input_frame, values=["Combined Workbook", "Separate Workbooks"], variable=self.output_option).grid(row=9, column=1, padx=10, pady=10, sticky="w")
 
-        ctk.CTkButton(input_frame, text="Use Previous Connection", command=self.select_previous_connection, width=120).grid(row=10, column=0, columnspan=3, padx=20, pady=20, sticky="n")
+        ctk.CTkLabel(input_frame, text="Parallel Downloads:").grid(row=10, column=0, padx=10, pady=10, sticky="e")
+        ctk.CTkEntry(input_frame, textvariable=self.download_workers, width=100).grid(row=10, column=1, padx=10, pady=10, sticky="w")
 
-        ctk.CTkButton(input_frame, text="Start Parsing", command=self.start_parsing, width=120).grid(row=11, column=0, columnspan=3, padx=20, pady=20, sticky="n")
+        ctk.CTkCheckBox(input_frame, text="Sync Mode (only fetch and export new reports)", variable=self.sync_mode).grid(row=11, column=1, padx=10, pady=10, sticky="w")
+
+        ctk.CTkButton(input_frame, text="Use Previous Connection", command=self.select_previous_connection, width=120).grid(row=12, column=0, columnspan=3, padx=20, pady=20, sticky="n")
+
+        ctk.CTkButton(input_frame, text="Start Parsing", command=self.start_parsing, width=120).grid(row=13, column=0, columnspan=3, padx=20, pady=20, sticky="n")
 
         return_button = ctk.CTkButton(self, text="Return to Home Page", command=self.return_to_home)
         return_button.grid(pady=20)
@@ -154,6 +568,10 @@ class TAKReportGUI(ctk.CTk):
             messagebox.showerror("Input Error", "Invalid Start Date/Time format. Please use YYYY-MM-DD HH:MM:SS")
             return
 
+        if not self.download_workers.get().isdigit() or int(self.download_workers.get()) < 1:
+            messagebox.showerror("Input Error", "Parallel Downloads must be a whole number of at least 1.")
+            return
+
         confirmation = messagebox.askyesno(
             "Confirmation",
             f"Proceed with the following details?\n\n"
@@ -164,7 +582,8 @@ class TAKReportGUI(ctk.CTk):
             f"Output Folder: {output_folder}\n"
             f"Timezone: {timezone}\n"
             f"Start Date/Time: {start_datetime_str}\n"
-            f"Output Option: {output_option}"
+            f"Output Option: {output_option}\n"
+            f"Sync Mode: {'On' if self.sync_mode.get() else 'Off'}"
         )
         if confirmation:
             # Directories are ensured when output folder was chosen. Just run the process.
@@ -202,6 +621,31 @@ class TAKReportGUI(ctk.CTk):
             return max(ticket_numbers) + 1
         return 1
 
+    def sync_state_path(self, ticket_number):
+        return os.path.join(self.repository_folder, f"sync_ticket_{ticket_number}.json")
+
+    def read_sync_state(self, ticket_number):
+        """
+        Sync Mode progress for one saved connection: the SubmissionTime the
+        next run starts from (UTC, ISO format; see advance_sync_state), the
+        Hashes fetched so far, the workbook the latest sync wrote per key and,
+        per sheet, the Date/Times already exported on its main sheet from the
+        high-water mark on (see prune_sheet_times).
+        """
+        state = {'high_water': None, 'hashes': [], 'workbooks': {}, 'sheet_times': {}}
+        try:
+            with open(self.sync_state_path(ticket_number), 'r', encoding='utf-8') as file:
+                state.update(json.load(file))
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def write_sync_state(self, ticket_number, state):
+        path = self.sync_state_path(ticket_number)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=2)
+        os.replace(path + '.tmp', path)
+
     def select_previous_connection(self):
         connections = self.read_connections()
         if not connections:
@@ -350,6 +794,7 @@ class TAKReportGUI(ctk.CTk):
 
         ssl_cert = (cert_file, key_file)
         self.write_connection(ticket_number, base_url, port, pfx_file, password, template_path, output_folder)
+        self.current_ticket_number = str(ticket_number)
 
         return metadata_url, file_url_template, ssl_cert
 
@@ -363,6 +808,7 @@ class TAKReportGUI(ctk.CTk):
                     break
 
             if selected_connection:
+                self.current_ticket_number = selected_connection['Ticket Number']
                 base_url = selected_connection['Base URL']
                 port = selected_connection['Port']
                 pfx_file = selected_connection['PFX File']
@@ -410,161 +856,232 @@ class TAKReportGUI(ctk.CTk):
         self.fetch_reports(metadata_url, file_url_template, ssl_cert)
 
     def fetch_reports(self, metadata_url, file_url_template, ssl_cert):
-        reports = []
-        combined_reports = ET.Element('CombinedReports')
-        processed_hashes = set()
-
-        try:
-            response = requests.get(metadata_url, cert=ssl_cert, verify=False, timeout=60)
-            response.raise_for_status()
-            metadata = response.json()
-            messagebox.showinfo("Metadata Received", f"Metadata received with {len(metadata['data'])} entries.")
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Request Failed", f"Request failed: {e}")
+        """
+        Runs on the Tk thread: reads the settings the run needs, opens the
+        progress window and starts run_pipeline on a worker thread, which
+        reports back through self.pipeline_events.
+        """
+        if self.pipeline_thread is not None and self.pipeline_thread.is_alive():
+            messagebox.showerror("Busy", "Reports are still being fetched. Wait for the current run to finish.")
             return
 
-        if 'data' not in metadata or not metadata['data']:
-            messagebox.showinfo("No Reports", "No reports available on the server.")
-            return
+        tz_offsets = {'EST': -5, 'CST': -6, 'MST': -7, 'PST': -8}
+        tz_name = self.timezone_selection.get()
+        tz_offset = tz_offsets.get(tz_name, -5)
+        settings = {
+            'workers': int(self.download_workers.get()),
+            'tz_offset': tz_offset,
+            'tz_name': tz_name,
+            'output_option': self.output_option.get(),
+            'sync': bool(self.sync_mode.get() and self.current_ticket_number),
+        }
 
         progress_window = ctk.CTkToplevel(self)
         progress_window.title("Processing Reports")
         progress_window.geometry("500x150")
         progress_window.grab_set()
 
-        progress_label = ctk.CTkLabel(progress_window, text="Starting...")
+        progress_label = ctk.CTkLabel(progress_window, text="Requesting metadata...")
         progress_label.pack(pady=10)
 
         progress_bar = ctk.CTkProgressBar(progress_window, orientation='horizontal', width=300)
         progress_bar.pack(pady=20)
         progress_bar.set(0)
 
-        self.total_entries = len(metadata['data'])
-        self.current_index = 0
-        self.metadata = metadata
-        self.file_url_template = file_url_template
-        self.ssl_cert = ssl_cert
-        self.reports = reports
-        self.combined_reports = combined_reports
-        self.processed_hashes = processed_hashes
-        self.folder_counter = 1
         self.progress_bar = progress_bar
         self.progress_label = progress_label
         self.progress_window = progress_window
+        self.reports_by_type = {}
+        self.combined_reports = ET.Element('CombinedReports')
+        self.processed_hashes = set()
+        self.folder_counter = 1
+        self.fetched_entries = []
+        self.failed_entries = []
 
-        self.process_next_entry()
+        self.pipeline_events = queue.Queue()
+        self.pipeline_thread = threading.Thread(target=self.run_pipeline, daemon=True,
+                                                args=(metadata_url, file_url_template, ssl_cert, settings))
+        self.pipeline_thread.start()
+        self.after(PIPELINE_POLL_MS, self.poll_pipeline)
 
-    def process_next_entry(self):
-        if self.current_index >= self.total_entries:
-            if len(self.combined_reports) > 0:
-                combined_tree = ET.ElementTree(self.combined_reports)
-                combined_tree.write(self.combined_reports_path, encoding='utf-8', xml_declaration=True)
-                messagebox.showinfo("Reports Saved", f"Combined XML reports saved to {self.combined_reports_path}.")
-            else:
-                messagebox.showinfo("No Reports", "No citrap reports found to save.")
+    def notify(self, kind, title, message):
+        """Queues a messagebox (kind is 'showinfo' or 'showerror') for the Tk thread to show."""
+        self.pipeline_events.put((kind, title, message))
 
-            self.progress_window.destroy()
+    def report_progress(self, fraction, text):
+        self.pipeline_events.put(('progress', fraction, text))
 
+    def poll_pipeline(self):
+        """Runs on the Tk thread: applies everything run_pipeline has queued since the last poll."""
+        while True:
             try:
-                timezone = self.timezone_selection.get()
-                tz_offsets = {'EST': -5, 'CST': -6, 'MST': -7, 'PST': -8}
-                tz_offset = tz_offsets.get(timezone, -5)
-                tz_name = timezone
-                self.parse_reports(self.templates, self.reports, tz_offset, tz_name)
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {e}")
-            return
-
-        file_info = self.metadata['data'][self.current_index]
-        index = self.current_index + 1
+                event = self.pipeline_events.get_nowait()
+            except queue.Empty:
+                break
+            kind = event[0]
+            if kind == 'progress':
+                self.progress_bar.set(event[1])
+                self.progress_label.configure(text=event[2])
+            elif kind == 'done':
+                self.progress_window.destroy()
+                return
+            else:
+                getattr(messagebox, kind)(event[1], event[2])
+        self.after(PIPELINE_POLL_MS, self.poll_pipeline)
+
+    def run_pipeline(self, metadata_url, file_url_template, ssl_cert, settings):
+        """
+        Runs on a worker thread: metadata -> download -> unpack -> parse ->
+        export. Never touches Tk; messages and progress go through
+        self.pipeline_events, ending with a 'done' event.
+        """
+        downloader = TAKFileDownloader(file_url_template, ssl_cert, workers=settings['workers'],
+                                       cache=PackageCache(self.package_cache_folder))
+        try:
+            try:
+                metadata = self.fetch_metadata(downloader, metadata_url)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.notify('showerror', "Request Failed", f"Request failed: {e}")
+                return
 
-        print(f"Processing entry {index}/{self.total_entries}: {file_info['Name']}")
+            if 'data' not in metadata or not metadata['data']:
+                self.notify('showinfo', "No Reports", "No reports available on the server.")
+                return
 
-        if 'citrap' not in file_info.get('Keywords', '').lower():
-            print(f"Skipping non-citrap report: {file_info['Name']}")
-            progress = index / self.total_entries
-            self.progress_bar.set(progress)
-            self.progress_label.configure(text=f"Processing {index}/{self.total_entries}: Skipped")
-            self.current_index += 1
-            self.after(0, self.process_next_entry)
-            return
+            # The start time is entered in the selected timezone; submissions are in UTC
+            start_utc = self.start_datetime.replace(tzinfo=timezone(timedelta(hours=settings['tz_offset']))).astimezone(timezone.utc)
+            self.sync_state = None
+            seen_hashes = ()
+            if settings['sync']:
+                # Only what was submitted since the last sync and has not been fetched yet
+                self.sync_state = self.read_sync_state(self.current_ticket_number)
+                if self.sync_state['high_water']:
+                    start_utc = max(start_utc, datetime.fromisoformat(self.sync_state['high_water']))
+                seen_hashes = self.sync_state['hashes']
+            entries = prefilter_metadata(metadata['data'], start_utc, seen_hashes)
+            self.notify('showinfo', "Metadata Received",
+                        f"Metadata received with {len(metadata['data'])} entries, "
+                        f"{len(entries)} citrap files submitted since the start time.")
+            if not entries:
+                self.notify('showinfo', "No Reports", "No citrap reports found to save.")
+                return
 
-        report_hash = file_info['Hash']
-        if report_hash in self.processed_hashes:
-            print(f"Skipping already processed report: {file_info['Name']}")
-            progress = index / self.total_entries
-            self.progress_bar.set(progress)
-            self.progress_label.configure(text=f"Processing {index}/{self.total_entries}: Skipped")
-            self.current_index += 1
-            self.after(0, self.process_next_entry)
-            return
+            self.process_entries(downloader, entries)
 
-        self.processed_hashes.add(report_hash)
+            if len(self.combined_reports) > 0:
+                combined_tree = ET.ElementTree(self.combined_reports)
+                combined_tree.write(self.combined_reports_path, encoding='utf-8', xml_declaration=True)
+                self.notify('showinfo', "Reports Saved", f"Combined XML reports saved to {self.combined_reports_path}.")
+            else:
+                self.notify('showinfo', "No Reports", "No citrap reports found to save.")
 
-        retries = 3
-        while retries > 0:
+            self.report_progress(1, "Writing workbooks...")
+            saved_workbooks = self.parse_reports(self.templates, self.reports_by_type, settings['tz_offset'],
+                                                 settings['tz_name'], settings['output_option'])
+            if self.sync_state is not None and saved_workbooks is not None:
+                self.record_sync(saved_workbooks, settings['tz_offset'])
+        except Exception as e:
+            self.notify('showerror', "Error", f"An error occurred: {e}")
+        finally:
+            downloader.close()
+            self.pipeline_events.put(('done',))
+
+    def fetch_metadata(self, downloader, metadata_url):
+        """
+        Requests the full metadata listing. It is not narrowed server-side: a
+        server's keyword filter may match more strictly than the substring
+        check in prefilter_metadata, and a partial listing can't be told from a
+        complete one, so all narrowing happens locally.
+        """
+        response = downloader.get(metadata_url)
+        response.raise_for_status()
+        return response.json()
+
+    def record_sync(self, saved_workbooks, tz_offset):
+        state = advance_sync_state(self.sync_state, self.fetched_entries, self.failed_entries)
+        state = prune_sheet_times(state, tz_offset)
+        state['workbooks'].update(saved_workbooks)
+        self.write_sync_state(self.current_ticket_number, state)
+
+    def process_entries(self, downloader, entries):
+        """
+        Hands the downloads to handle_downloaded_entry in metadata order as
+        they complete, keeping a bounded window of downloads in flight ahead
+        of the entry being handled.
+        """
+        window = downloader.workers * 2
+        pending = deque()  # (index, file_info, future), in metadata order
+        next_entry_index = 0
+        while pending or next_entry_index < len(entries):
+            while len(pending) < window and next_entry_index < len(entries):
+                file_info = entries[next_entry_index]
+                next_entry_index += 1
+                self.processed_hashes.add(file_info['Hash'])
+                pending.append((next_entry_index, file_info, downloader.submit(file_info)))
+
+            index, file_info, future = pending.popleft()
+            path, error = future.result()
+            print(f"Processing entry {index}/{len(entries)}: {file_info['Name']}")
+            if error:
+                self.notify('showerror', "Retry Failed", error)
+                self.failed_entries.append(file_info)
+            else:
+                try:
+                    self.handle_downloaded_entry(file_info, path)
+                finally:
+                    downloader.release(path)
+                self.fetched_entries.append(file_info)
+
+            self.report_progress(index / len(entries), f"Processing {index}/{len(entries)}: {file_info['Name']}")
+
+    def add_report(self, report):
+        # Bucketed by type on arrival, so each report type only ever walks its own reports
+        self.combined_reports.append(report)
+        self.reports_by_type.setdefault(report.get('type'), []).append(report)
+
+    def handle_downloaded_entry(self, file_info, path):
+        """
+        Feeds one downloaded file into the zip/XML/media handling. Works from
+        the file on disk, so zip members and media are copied straight to
+        their destination without holding the package in memory.
+        """
+        if file_info['MimeType'] == 'application/zip':
             try:
-                file_url = self.file_url_template.format(hash=report_hash)
-                file_response = requests.get(file_url, cert=self.ssl_cert, verify=False, timeout=60)
-                file_response.raise_for_status()
-
-                if file_info['MimeType'] == 'application/zip':
-                    try:
-                        with zipfile.ZipFile(BytesIO(file_response.content)) as z:
-                            for file_name in z.namelist():
-                                if file_name.endswith('.xml'):
-                                    with z.open(file_name) as xml_file:
-                                        try:
-                                            report_tree = ET.ElementTree(ET.parse(xml_file).getroot())
-                                            self.combined_reports.append(report_tree.getroot())
-                                            self.reports.append(report_tree.getroot())
-                                        except ET.ParseError as e:
-                                            messagebox.showerror("XML Parsing Error", f"Failed to parse XML from {file_name}: {e}")
-                                else:
-                                    folder_name = f"{self.folder_counter:02d}"
-                                    media_folder_path = os.path.join(self.media_folder, folder_name)
-                                    os.makedirs(os.path.dirname(os.path.join(media_folder_path, file_name)), exist_ok=True)
-                                    media_path = os.path.join(media_folder_path, file_name)
-                                    with z.open(file_name) as media_file:
-                                        with open(media_path, 'wb') as out_file:
-                                            shutil.copyfileobj(media_file, out_file)
-                                    print(f"Saved media file: {file_name} to {media_path}")
-                            self.folder_counter += 1
-                    except zipfile.BadZipFile:
-                        break
-                elif file_info['MimeType'] == 'application/xml' or file_info['Name'].endswith('.xml'):
-                    try:
-                        report_tree = ET.ElementTree(ET.fromstring(file_response.content))
-                        self.combined_reports.append(report_tree.getroot())
-                        self.reports.append(report_tree.getroot())
-                    except ET.ParseError as e:
-                        messagebox.showerror("XML Parsing Error", f"Failed to parse XML: {e}")
-                else:
-                    folder_name = f"{self.folder_counter:02d}"
-                    media_folder_path = os.path.join(self.media_folder, folder_name)
-                    os.makedirs(os.path.dirname(os.path.join(media_folder_path, file_info['Name'])), exist_ok=True)
-                    media_path = os.path.join(media_folder_path, file_info['Name'])
-                    with open(media_path, 'wb') as out_file:
-                        out_file.write(file_response.content)
-                    print(f"Saved media file: {file_info['Name']} to {media_path}")
+                with zipfile.ZipFile(path) as z:
+                    for file_name in z.namelist():
+                        if file_name.endswith('.xml'):
+                            with z.open(file_name) as xml_file:
+                                try:
+                                    report_tree = ET.ElementTree(ET.parse(xml_file).getroot())
+                                    self.add_report(report_tree.getroot())
+                                except ET.ParseError as e:
+                                    self.notify('showerror', "XML Parsing Error", f"Failed to parse XML from {file_name}: {e}")
+                        else:
+                            folder_name = f"{self.folder_counter:02d}"
+                            media_folder_path = os.path.join(self.media_folder, folder_name)
+                            os.makedirs(os.path.dirname(os.path.join(media_folder_path, file_name)), exist_ok=True)
+                            media_path = os.path.join(media_folder_path, file_name)
+                            with z.open(file_name) as media_file:
+                                with open(media_path, 'wb') as out_file:
+                                    shutil.copyfileobj(media_file, out_file)
+                            print(f"Saved media file: {file_name} to {media_path}")
                     self.folder_counter += 1
-
-                break
-            except requests.exceptions.RequestException as e:
-                retries -= 1
-                messagebox.showerror("Fetching Error", f"Failed to fetch report from {file_url}: {e}")
-                if retries > 0:
-                    print("Retrying...")
-                    time.sleep(5)
-                else:
-                    messagebox.showerror("Retry Failed", f"Giving up on {file_info['Name']} after 3 attempts.")
-
-        progress = index / self.total_entries
-        self.progress_bar.set(progress)
-        self.progress_label.configure(text=f"Processing {index}/{self.total_entries}: {file_info['Name']}")
-
-        self.current_index += 1
-        self.after(0, self.process_next_entry)
+            except zipfile.BadZipFile:
+                return
+        elif file_info['MimeType'] == 'application/xml' or file_info['Name'].endswith('.xml'):
+            try:
+                report_tree = ET.parse(path)
+                self.add_report(report_tree.getroot())
+            except ET.ParseError as e:
+                self.notify('showerror', "XML Parsing Error", f"Failed to parse XML: {e}")
+        else:
+            folder_name = f"{self.folder_counter:02d}"
+            media_folder_path = os.path.join(self.media_folder, folder_name)
+            os.makedirs(os.path.dirname(os.path.join(media_folder_path, file_info['Name'])), exist_ok=True)
+            media_path = os.path.join(media_folder_path, file_info['Name'])
+            shutil.copyfile(path, media_path)
+            print(f"Saved media file: {file_info['Name']} to {media_path}")
+            self.folder_counter += 1
 
     def parse_template(self, template_path):
         try:
@@ -624,161 +1141,238 @@ class TAKReportGUI(ctk.CTk):
 
         return templates
 
-    def process_reports_for_type(self, reports, report_type, fields, main_sheet, duplicate_sheet, tz_offset, tz_name):
+    def compile_extraction_plan(self, fields, tz_offset, tz_name):
+        """
+        Turns the template fields for one report type into a list of
+        extractors, one per column, each called as extract(report, index) with
+        the ReportIndex of the report. All the per-field decisions are made
+        here once instead of for every report.
+        """
+        def attribute_of(name):
+            return lambda report, index: report.get(name)
+
+        def report_date_time(name):
+            return lambda report, index: self.convert_zulu_to_timezone(report.get(name), tz_offset, tz_name)
+
+        def location(name):
+            def extract(report, index):
+                lat, lon = self.extract_latlong_from_location(report.get(name))
+                if lat is not None and lon is not None:
+                    return self.convert_latlong_to_mgrs(lat, lon)
+                return None
+            return extract
+
+        def geometry(title):
+            def extract(report, index):
+                if title not in index.geometry:
+                    return None
+                lat, lon = self.extract_latlong_from_location(index.geometry[title])
+                if lat is not None and lon is not None:
+                    return self.convert_latlong_to_mgrs(lat, lon)
+                return None
+            return extract
+
+        def option_value(title):
+            def extract(report, index):
+                element = index.options.get(title)
+                return element.get('value') if element is not None else None
+            return extract
+
+        def checkbox(title):
+            def extract(report, index):
+                element = index.options.get(title)
+                return 'X' if element is not None and element.get('value') == 'True' else None
+            return extract
+
+        def option_time(title):
+            def extract(report, index):
+                element = index.options.get(title)
+                zulu_time = element.get('value') if element is not None else None
+                return self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name) if zulu_time else None
+            return extract
+
+        def number_with_units(title):
+            def extract(report, index):
+                element = index.options.get(title)
+                if element is None:
+                    return None
+                value = element.get('value')
+                unit = element.get('unitValue')
+                return f"{value} {unit}" if value and unit else None
+            return extract
+
+        def list_selection(title):
+            def extract(report, index):
+                selected = index.list_selections.get(title)
+                return selected[0] if selected else None
+            return extract
+
+        def multi_selection(title):
+            def extract(report, index):
+                selected = index.list_selections.get(title)
+                return ', '.join(selected) if selected else None
+            return extract
+
+        def element_text(path):
+            def extract(report, index):
+                element = report.find(path)
+                return element.text if element is not None else None
+            return extract
+
+        plan = []
+        for field in fields:
+            field_type = field['type']
+            if field['csv_header'] == 'Date/Time' and field['attribute'] == 'dateTime':
+                plan.append(report_date_time(field['attribute']))
+            elif field_type == 'location':
+                plan.append(location(field['attribute']))
+            elif field_type == 'geometry':
+                plan.append(geometry(field['csv_header']))
+            elif field_type == 'section':
+                plan.append(lambda report, index: None)
+            elif field_type in ('text', 'number', 'range', 'route'):
+                plan.append(option_value(field['xml_path']))
+            elif field_type == 'checkbox':
+                plan.append(checkbox(field['xml_path']))
+            elif field_type in ('date', 'time'):
+                plan.append(option_time(field['xml_path']))
+            elif field_type == 'number_with_units':
+                plan.append(number_with_units(field['xml_path']))
+            elif field_type == 'list':
+                plan.append(list_selection(field['csv_header']))
+            elif field_type == 'multi-select':
+                plan.append(multi_selection(field['csv_header']))
+            elif field['attribute']:
+                plan.append(attribute_of(field['attribute']))
+            else:
+                plan.append(element_text(field['xml_path']))
+        return plan
+
+    def process_reports_for_type(self, reports, report_type, fields, main_sheet, duplicate_sheet, tz_offset, tz_name,
+                                 seen_times=None):
+        """
+        Writes the rows for reports, which are all of report_type, to its main
+        and duplicate sheets. seen_times is the set of Date/Times (column C)
+        earlier syncs put on the main sheet: a new row with one of them goes to
+        the duplicates sheet, as it would have in a full run. The Date/Times of
+        the rows written to the main sheet are added to it.
+        """
+        unique_rows, duplicate_rows = self.build_rows_for_type(reports, fields, tz_offset, tz_name)
+
+        for row in unique_rows:
+            row = export_row(row)
+            if seen_times is None:
+                main_sheet.append(row)
+            elif str(row[2]) in seen_times:
+                duplicate_sheet.append(row)
+            else:
+                seen_times.add(str(row[2]))
+                main_sheet.append(row)
+
+        for row in duplicate_rows:
+            duplicate_sheet.append(export_row(row))
+
+    def add_report_sheets(self, workbook, report_type, fields, reports, tz_offset, tz_name):
+        """
+        Adds the main and duplicates sheets for one report type to workbook and
+        fills them; in Sync Mode the rows are checked against the Date/Times
+        earlier syncs exported for the sheet.
+        """
+        sheet_name = ''.join([c for c in report_type if c.isalnum() or c in (' ', '_')]).strip()[:31]
+        if not sheet_name:
+            sheet_name = 'Report'
+        header = export_row([field['csv_header'] for field in fields])
+
+        main_sheet = workbook.create_sheet(title=sheet_name)
+        main_sheet.append(header)
+
+        duplicate_sheet_name = f"{sheet_name}_duplicates"
+        duplicate_sheet = workbook.create_sheet(title=duplicate_sheet_name[:31])
+        duplicate_sheet.append(header)
+
+        seen_times = None
+        if self.sync_state is not None:
+            seen_times = set(self.sync_state['sheet_times'].get(sheet_name, []))
+        self.process_reports_for_type(reports, report_type, fields, main_sheet, duplicate_sheet, tz_offset, tz_name,
+                                      seen_times)
+        if seen_times is not None:
+            self.sync_state['sheet_times'][sheet_name] = sorted(seen_times)
+
+    def build_rows_for_type(self, reports, fields, tz_offset, tz_name):
+        """
+        Returns (unique_rows, duplicate_rows) for reports of one type, each sorted
+        by report time. Only reads the reports and fields it is given, so the
+        report types are independent of each other.
+        """
         def safe_value(value):
             if value is None or (isinstance(value, str) and value.strip() == ''):
                 return ' '
             else:
                 return value
 
+        plan = self.compile_extraction_plan(fields, tz_offset, tz_name)
+        date_time_columns = [i for i, field in enumerate(fields)
+                             if field['csv_header'] == 'Date/Time' and field['attribute'] == 'dateTime']
+
         seen_datetimes = {}
         duplicates = []
 
-        for report in reports:
-            if report.get('type') == report_type:
-                row = []
-                report_time = None
-
-                for field in fields:
-                    if field['csv_header'] == 'Date/Time' and field['attribute'] == 'dateTime':
-                        zulu_time = report.get(field['attribute'])
-                        local_time = self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name)
-                        row.append(safe_value(local_time))
-                        try:
-                            report_time = datetime.strptime(local_time, '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            continue
-                    elif field['type'] == 'location':
-                        location_str = report.get(field['attribute'])
-                        lat, lon = self.extract_latlong_from_location(location_str)
-                        if lat is not None and lon is not None:
-                            mgrs_coord = self.convert_latlong_to_mgrs(lat, lon)
-                            row.append(safe_value(mgrs_coord))
-                        else:
-                            row.append(' ')
-                    elif field['type'] == 'geometry':
-                        found_geometry = False
-                        for section in report.findall('.//section'):
-                            for option in section.findall('option'):
-                                if option.get('title') == field['csv_header'] and option.get('type') == 'geometry':
-                                    location_str = option.get('value')
-                                    lat, lon = self.extract_latlong_from_location(location_str)
-                                    if lat is not None and lon is not None:
-                                        mgrs_coord = self.convert_latlong_to_mgrs(lat, lon)
-                                        row.append(safe_value(mgrs_coord))
-                                    else:
-                                        row.append(' ')
-                                    found_geometry = True
-                                    break
-                            if found_geometry:
-                                break
-                        if not found_geometry:
-                            row.append(' ')
-                    elif field['type'] == 'section':
-                        row.append(' ')
-                    elif field['type'] == 'text':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        value = element.get(field['attribute']) if element is not None else None
-                        row.append(safe_value(value))
-                    elif field['type'] == 'checkbox':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        value = 'X' if element is not None and element.get('value') == 'True' else ' '
-                        row.append(value)
-                    elif field['type'] == 'date':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        zulu_time = element.get('value') if element is not None else None
-                        if zulu_time:
-                            local_time = self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name)
-                            row.append(safe_value(local_time))
-                        else:
-                            row.append(' ')
-                    elif field['type'] == 'number_with_units':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        if element is not None:
-                            value = element.get('value')
-                            unit = element.get('unitValue')
-                            combined_value = f"{value} {unit}" if value and unit else None
-                            row.append(safe_value(combined_value))
-                        else:
-                            row.append(' ')
-                    elif field['type'] == 'number':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        value = element.get('value') if element is not None else None
-                        row.append(safe_value(value))
-                    elif field['type'] == 'range':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        value = element.get('value') if element is not None else None
-                        row.append(safe_value(value))
-                    elif field['type'] == 'route':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        value = element.get('value') if element is not None else None
-                        row.append(safe_value(value))
-                    elif field['type'] == 'time':
-                        element = report.find('.//option[@title="' + field['xml_path'] + '"]')
-                        zulu_time = element.get('value') if element is not None else None
-                        if zulu_time:
-                            local_time = self.convert_zulu_to_timezone(zulu_time, tz_offset, tz_name)
-                            row.append(safe_value(local_time))
-                        else:
-                            row.append(' ')
-                    elif field['type'] == 'list':
-                        selected_option = None
-                        list_element = report.find('.//list[@title="' + field['csv_header'] + '"]')
-                        if list_element is not None:
-                            for option_el in list_element.findall('.//option'):
-                                if option_el.get('selected') == 'true':
-                                    selected_option = option_el.get('title')
-                                    break
-                        row.append(safe_value(selected_option))
-                    elif field['type'] == 'multi-select':
-                        selected_options = []
-                        list_element = report.find('.//list[@title="' + field['csv_header'] + '"]')
-                        if list_element is not None:
-                            for option_el in list_element.findall('.//option'):
-                                if option_el.get('selected') == 'true':
-                                    selected_options.append(option_el.get('title'))
-                        multi_value = ', '.join(selected_options) if selected_options else None
-                        row.append(safe_value(multi_value))
-                    elif field['attribute']:
-                        value = report.get(field['attribute'])
-                        row.append(safe_value(value))
-                    else:
-                        element = report.find(field['xml_path'])
-                        value = element.text if element is not None else None
-                        row.append(safe_value(value))
-
-                if report_time and report_time < self.start_datetime:
-                    continue
-                if report_time:
-                    if report_time in seen_datetimes:
-                        duplicates.append((report_time, row))
-                    else:
-                        seen_datetimes[report_time] = row
+        indexed_reports = [(report, ReportIndex(report)) for report in reports]
+        self.cache_report_locations(fields, indexed_reports)
 
-        sorted_unique_rows = sorted(seen_datetimes.items())
-        sorted_duplicates = sorted(duplicates, key=lambda x: x[0])
+        for report, index in indexed_reports:
+            values = [extract(report, index) for extract in plan]
+            row = [safe_value(value) for value in values]
 
-        for _, row in sorted_unique_rows:
-            main_sheet.append(row)
+            report_time = None
+            for column in date_time_columns:
+                try:
+                    report_time = datetime.strptime(values[column], '%Y-%m-%d %H:%M:%S')
+                except (TypeError, ValueError):
+                    continue
 
-        for _, row in sorted_duplicates:
-            duplicate_sheet.append(row)
+            if report_time and report_time < self.start_datetime:
+                continue
+            if report_time:
+                if report_time in seen_datetimes:
+                    duplicates.append((report_time, row))
+                else:
+                    seen_datetimes[report_time] = row
 
-    def delete_columns(self, workbook):
-        # Only keep unconditional deletion of the 6th column
-        for sheet in workbook.worksheets:
-            try:
-                sheet.delete_cols(6)
-            except Exception as e:
-                print(f"Failed to delete column F in sheet '{sheet.title}': {e}")
+        sorted_unique_rows = sorted(seen_datetimes.items())
+        sorted_duplicates = sorted(duplicates, key=lambda x: x[0])
+        return [row for _, row in sorted_unique_rows], [row for _, row in sorted_duplicates]
+
+    def cache_report_locations(self, fields, indexed_reports):
+        """
+        Converts every location and geometry point of the reports to MGRS in
+        one batch, so the row extractors find them all in mgrs_cache.
+        """
+        location_attributes = [field['attribute'] for field in fields if field['type'] == 'location']
+        geometry_titles = [field['csv_header'] for field in fields if field['type'] == 'geometry']
+        points = []
+        for report, index in indexed_reports:
+            locations = [report.get(name) for name in location_attributes]
+            locations += [index.geometry.get(title) for title in geometry_titles]
+            for location_str in locations:
+                match = LOCATION_POINT_PATTERN.search(location_str) if location_str else None
+                if match:
+                    try:
+                        points.append((float(match.group(2)), float(match.group(1))))
+                    except ValueError:
+                        continue
+        cache_mgrs(points)
 
     def convert_latlong_to_mgrs(self, lat_str, lon_str):
         try:
             lat = float(lat_str)
             lon = float(lon_str)
-            latlon = ev.LatLon(lat, lon)
-            mgrs_coord = latlon.toMgrs()
-            return str(mgrs_coord)
+            mgrs_coord = mgrs_cache.get((lat, lon))
+            if mgrs_coord is None:
+                mgrs_coord = str(ev.LatLon(lat, lon).toMgrs())
+                if len(mgrs_cache) < MGRS_CACHE_MAX_POINTS:
+                    mgrs_cache[lat, lon] = mgrs_coord
+            return mgrs_coord
         except Exception as e:
             print(f"Failed to convert Lat/Long to MGRS: {e}")
             return f"{lat_str}, {lon_str}"
@@ -789,7 +1383,7 @@ class TAKReportGUI(ctk.CTk):
             return None, None
 
         try:
-            match = re.search(r"POINT \(([-\d.]+) ([-\d.]+)\)", location_str)
+            match = LOCATION_POINT_PATTERN.search(location_str)
             if match:
                 lon = float(match.group(1))
                 lat = float(match.group(2))
@@ -816,63 +1410,59 @@ class TAKReportGUI(ctk.CTk):
             print(f"Failed to convert Zulu time to {tz_name}: {e}")
             return zulu_time_str
 
-    def parse_reports(self, templates, reports, tz_offset, tz_name):
-        def safe_value(value):
-            if value is None or (isinstance(value, str) and value.strip() == ''):
-                return ' '
-            else:
-                return value
-
+    def parse_reports(self, templates, reports_by_type, tz_offset, tz_name, output_option):
+        """
+        Streams the reports into new write-only workbooks named after the run
+        time and returns {"Combined Workbook" or report type: workbook path}.
+
+        Sync Mode does not append to the workbooks of earlier syncs: reopening
+        one to append costs a full load of everything exported so far, so each
+        sync writes only its new reports to workbooks of their own (the export
+        is the set of a connection's workbooks, in run-time order), and the
+        sync state carries what is needed to send repeats to the duplicates
+        sheets. A sync writes no workbook for a report type with no new
+        reports, and none at all when nothing is new.
+        """
+        saved_workbooks = {}
+        run_time = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        if self.sync_state is not None:
+            templates = {report_type: fields for report_type, fields in templates.items()
+                         if reports_by_type.get(report_type)}
+            if not templates:
+                self.notify('showinfo', "No New Reports", "No new reports since the last sync; no workbook written.")
+                return saved_workbooks
         try:
-            if self.output_option.get() == "Combined Workbook":
-                workbook = Workbook()
-                workbook.remove(workbook.active)
+            if output_option == "Combined Workbook":
+                workbook = Workbook(write_only=True)
 
                 for report_type, fields in templates.items():
-                    sheet_name = ''.join([c for c in report_type if c.isalnum() or c in (' ', '_')]).strip()[:31]
-                    if not sheet_name:
-                        sheet_name = 'Report'
-                    main_sheet = workbook.create_sheet(title=sheet_name)
-                    main_sheet.append([field['csv_header'] for field in fields])
-
-                    duplicate_sheet_name = f"{sheet_name}_duplicates"
-                    duplicate_sheet = workbook.create_sheet(title=duplicate_sheet_name[:31])
-                    duplicate_sheet.append([field['csv_header'] for field in fields])
+                    self.add_report_sheets(workbook, report_type, fields, reports_by_type.get(report_type, []), tz_offset, tz_name)
 
-                    self.process_reports_for_type(reports, report_type, fields, main_sheet, duplicate_sheet, tz_offset, tz_name)
-
-                self.delete_columns(workbook)
-                output_path = os.path.join(self.output_parent_folder, f"Exported TAK Reports {datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx")
+                output_path = os.path.join(self.output_parent_folder, f"Exported TAK Reports {run_time}.xlsx")
                 workbook.save(output_path)
-                messagebox.showinfo("Success", f"Reports parsed and saved to {output_path}")
+                if self.sync_state is not None:
+                    self.notify('showinfo', "Success", f"New reports parsed and saved to {output_path}")
+                else:
+                    self.notify('showinfo', "Success", f"Reports parsed and saved to {output_path}")
+                saved_workbooks['Combined Workbook'] = output_path
 
             else:
                 for report_type, fields in templates.items():
-                    workbook = Workbook()
-                    workbook.remove(workbook.active)
-                    sheet_name = ''.join([c for c in report_type if c.isalnum() or c in (' ', '_')]).strip()[:31]
-                    if not sheet_name:
-                        sheet_name = 'Report'
-
-                    main_sheet = workbook.create_sheet(title=sheet_name)
-                    main_sheet.append([field['csv_header'] for field in fields])
-
-                    duplicate_sheet_name = f"{sheet_name}_duplicates"
-                    duplicate_sheet = workbook.create_sheet(title=duplicate_sheet_name[:31])
-                    duplicate_sheet.append([field['csv_header'] for field in fields])
-
-                    self.process_reports_for_type(reports, report_type, fields, main_sheet, duplicate_sheet, tz_offset, tz_name)
+                    workbook = Workbook(write_only=True)
+                    self.add_report_sheets(workbook, report_type, fields, reports_by_type.get(report_type, []), tz_offset, tz_name)
 
-                    self.delete_columns(workbook)
                     sanitized_report_type = ''.join([c for c in report_type if c.isalnum() or c in (' ', '_')]).strip()
-                    output_filename = f"{sanitized_report_type} {datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+                    output_filename = f"{sanitized_report_type} {run_time}.xlsx"
                     output_path = os.path.join(self.output_parent_folder, output_filename)
                     workbook.save(output_path)
+                    saved_workbooks[report_type] = output_path
 
-                messagebox.showinfo("Success", f"Reports parsed and saved to separate workbooks in {self.output_parent_folder}")
+                self.notify('showinfo', "Success", f"Reports parsed and saved to separate workbooks in {self.output_parent_folder}")
 
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while parsing reports: {e}")
+            self.notify('showerror', "Error", f"An error occurred while parsing reports: {e}")
+            return None
+        return saved_workbooks
 
     def return_to_home(self):
         self.destroy()
@@ -0,0 +1,344 @@
+import functools
+import multiprocessing
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cot_parser
+
+
+@pytest.mark.skipif(cot_parser.pq is None, reason="needs pyarrow")
+def test_parquet_dataset_keeps_columns_first_seen_in_later_files(tmp_path):
+    output_path = str(tmp_path / "dataset")
+    sink = cot_parser.CotDetailsParquetSink(output_path, row_group_size=1)
+    sink.add("ALPHA", {"uid": "a-1", "detail_x": "1"}, "2024-01-01")
+    sink.add("BRAVO", {"uid": "b-1", "detail_y": "2"}, "2024-01-01")
+    sink.add("BRAVO", {"uid": "b-2", "detail_x": "3", "detail_y": "4"}, "2024-01-02")
+    sink.add("CHARLIE", {"uid": "c-1", "detail_z": "5"}, "2024-01-01")
+    sink.close(lambda message: None)
+
+    df = pd.read_parquet(output_path)
+    assert {"uid", "detail_x", "detail_y", "detail_z", "callsign", "day"} <= set(df.columns)
+    assert len(df) == 4
+    assert df.set_index("uid").loc["c-1", "detail_z"] == "5"
+    assert df.set_index("uid").loc["b-1", "detail_y"] == "2"
+
+
+@pytest.mark.skipif(cot_parser.pq is None, reason="needs pyarrow")
+def test_parquet_dataset_appended_run_keeps_earlier_columns(tmp_path):
+    output_path = str(tmp_path / "dataset")
+    sink = cot_parser.CotDetailsParquetSink(output_path)
+    sink.add("ALPHA", {"uid": "a-1", "detail_x": "1"}, "2024-01-01")
+    sink.close(lambda message: None)
+
+    sink = cot_parser.CotDetailsParquetSink(output_path, first_part=sink.files_written)
+    sink.add("ALPHA", {"uid": "a-2", "detail_w": "2"}, "2024-01-01")
+    sink.close(lambda message: None)
+
+    df = pd.read_parquet(output_path)
+    assert {"uid", "detail_x", "detail_w"} <= set(df.columns)
+    assert sorted(df["uid"]) == ["a-1", "a-2"]
+
+
+@pytest.mark.skipif(cot_parser.pq is None, reason="needs pyarrow")
+def test_parquet_partition_is_one_file_of_row_groups(tmp_path):
+    output_path = str(tmp_path / "dataset")
+    sink = cot_parser.CotDetailsParquetSink(output_path, row_group_size=2, max_buffered_rows=3)
+    for i in range(7):
+        sink.add("ALPHA", {"uid": f"a-{i}", f"detail_{i % 3}": str(i)}, "2024-01-01")
+        sink.add("BRAVO", {"uid": f"b-{i}"}, "2024-01-01")
+    sink.close(lambda message: None)
+
+    assert sorted(os.listdir(output_path)) == ["callsign=ALPHA", "callsign=BRAVO"]
+    paths = sink.part_paths()
+    assert len(paths) == sink.files_written == 2
+    for path in paths:
+        parquet_file = cot_parser.pq.ParquetFile(path)
+        assert parquet_file.schema_arrow.names == ["uid", "detail_0", "detail_1", "detail_2"]
+        assert parquet_file.num_row_groups == 4
+    df = pd.read_parquet(output_path)
+    assert sorted(df["uid"]) == sorted([f"a-{i}" for i in range(7)] + [f"b-{i}" for i in range(7)])
+    assert df.set_index("uid").loc["a-5", "detail_2"] == "5"
+
+
+def split_events(content):
+    pieces = content.split(cot_parser.EVENT_END_TAG)[:-1]
+    return [piece + cot_parser.EVENT_END_TAG for piece in pieces]
+
+
+def test_event_spans_match_split_at_every_chunk_size(tmp_path):
+    content = b''.join(b'<event uid="u%d" time="t"><detail/></event>\n' % i for i in range(50)) + b'<event uid="partial">'
+    path = tmp_path / "log.txt"
+    path.write_bytes(content)
+    expected = split_events(content)
+    for chunk_size in (1, 3, 7, 8, 9, 64, 4096):
+        spans = list(cot_parser.iter_event_spans(str(path), chunk_size=chunk_size))
+        assert [event for _, event in spans] == expected
+        assert all(content[offset:offset + len(event)] == event for offset, event in spans)
+
+
+def test_event_views_match_spans_across_scan_windows(tmp_path, monkeypatch):
+    content = b''.join(b'<event uid="u%d" time="t"><detail/></event>\n' % i for i in range(50)) + b'<event uid="partial">'
+    path = tmp_path / "log.txt"
+    path.write_bytes(content)
+    expected = list(cot_parser.iter_event_spans(str(path)))
+    boundary = expected[10][0]
+    for window in (5, 8, 9, 64, 4096):
+        monkeypatch.setattr(cot_parser, "SCAN_WINDOW_BYTES", window)
+        with cot_parser.MappedCotLog(str(path)) as cot_log:
+            assert [(offset, bytes(event)) for offset, event in cot_log.iter_event_views()] == expected
+            assert [(offset, bytes(event)) for offset, event in cot_log.iter_event_views(boundary)] == expected[10:]
+
+
+def test_event_spans_skip_oversized_partial_event(tmp_path):
+    events = b'<event uid="a"></event><event uid="b"></event>'
+    path = tmp_path / "log.txt"
+    path.write_bytes(b'<event uid="first"></event>' + b'x' * 10000 + b'</event>' + events)
+    messages = []
+    spans = list(cot_parser.iter_event_spans(str(path), chunk_size=100, max_event_bytes=1000, log_callback=messages.append))
+    assert [event for _, event in spans] == [b'<event uid="first"></event>', b'<event uid="a"></event>', b'<event uid="b"></event>']
+    assert len(messages) == 1
+
+
+def index_rows(filePath):
+    messages = []
+    conn = cot_parser.open_event_index(filePath, messages.append)
+    try:
+        rows = conn.execute("SELECT offset, length, parsed, uid, time, callsign, lat FROM events ORDER BY offset").fetchall()
+    finally:
+        conn.close()
+    return rows, any(message.startswith("Building event index") for message in messages)
+
+
+def test_event_index_is_reused_until_the_file_changes(tmp_path):
+    event = b'<event uid="%s" type="a-f" time="%s"><point lat="1.5" lon="2"/><detail><contact callsign="%s"/></detail></event>\n'
+    path = tmp_path / "log.txt"
+    content = event % (b"a", b"2025-01-01T00:00:00Z", b"ALPHA") + b'<event uid="bad"><detail></event>\n'
+    path.write_bytes(content)
+    rows, built = index_rows(str(path))
+    assert built
+    assert rows == [(0, content.index(b'\n'), 1, "a", "2025-01-01T00:00:00Z", "ALPHA", 1.5),
+                    (content.index(b'\n'), len(content) - 1 - content.index(b'\n'), 0, None, None, None, None)]
+    assert index_rows(str(path)) == (rows, False)
+
+    # Appended events change the size
+    with open(path, 'ab') as f:
+        f.write(event % (b"b", b"2025-01-01T00:01:00Z", b"BRAVO"))
+    rows, built = index_rows(str(path))
+    assert built and [row[3] for row in rows] == ["a", None, "b"]
+
+    # Same size and mtime, different bytes: only the fingerprint tells
+    stat = os.stat(path)
+    path.write_bytes(path.read_bytes().replace(b"BRAVO", b"DELTA"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    rows, built = index_rows(str(path))
+    assert built and rows[-1][5] == "DELTA"
+
+
+def test_time_window_export_reads_indexed_spans(tmp_path, monkeypatch):
+    events = [b'<event uid="u%d" type="a-f" time="2025-01-01T00:0%d:00.5Z"><detail/></event>' % (i, i) for i in range(5)]
+    path = tmp_path / "log.txt"
+    path.write_bytes(b'\n'.join(events))
+    cot_parser.exportTimeWindow(str(path), "2025-01-01T00:01:00Z", "2025-01-01T00:03:00Z", lambda message: None)
+    expected = cot_parser.XML_DECLARATION + b'\n' + b''.join(b'\n' + event for event in events[1:4])
+    assert (tmp_path / "TimeWindow_log.txt").read_bytes() == expected
+
+    # The second export is answered from the sidecar
+    monkeypatch.setattr(cot_parser, "build_event_index", None)
+    cot_parser.exportTimeWindow(str(path), "2025-01-01T00:04:00Z", "2025-01-01T00:09:00Z", lambda message: None)
+    assert (tmp_path / "TimeWindow_log.txt").read_bytes() == cot_parser.XML_DECLARATION + b'\n' + b'\n' + events[4]
+
+
+def test_in_memory_dedupe_matches_set_dedupe_across_batches(tmp_path):
+    events = [b'<event uid="u%d" type="a-f" time="t%d"><detail/></event>' % (i % 7, i % 3) for i in range(60)]
+    path = tmp_path / "log.txt"
+    path.write_bytes(b''.join(events))
+    expected, seen = [], set()
+    for event in events:
+        key_hash = cot_parser.event_key_hash(event)
+        if key_hash not in seen:
+            seen.add(key_hash)
+            expected.append(event)
+    out_path = tmp_path / "out.txt"
+    with open(out_path, 'wb') as out_file:
+        total, kept = cot_parser.dedupe_in_memory(str(path), out_file, lambda message: None, batch_size=4)
+    assert (total, kept) == (60, len(expected))
+    assert out_path.read_bytes() == b''.join(expected)
+
+
+def test_in_memory_dedupe_gives_up_past_key_budget(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_bytes(b''.join(b'<event uid="u%d" type="a-f" time="t"></event>' % i for i in range(50)))
+    with open(tmp_path / "out.txt", 'wb') as out_file:
+        assert cot_parser.dedupe_in_memory(str(path), out_file, lambda message: None,
+                                           max_key_bytes=64, batch_size=10) is None
+
+
+def shifted_times(content):
+    events = split_events(content.split(b'\n', 1)[1])
+    times = []
+    for event in events:
+        root = cot_parser.ET.fromstring(event)
+        times.append([root.get("uid")] + [cot_parser.parseEventTime(root.get(name)) if root.get(name) else None
+                                          for name in ("time", "start", "stale")])
+    return times
+
+
+def test_byte_level_time_shift_matches_element_tree_round_trip(tmp_path):
+    declaration = cot_parser.XML_DECLARATION
+    content = declaration + b'\n' + b'\n'.join([
+        b'<event uid="a" time="2025-01-12T04:36:54Z" start="2025-01-12T04:36:54Z" stale="2025-01-12T04:41:54Z"><detail/></event>',
+        b'<event uid="b" time="2025-01-12T04:37:00.5Z" start="2025-01-12T04:37:00Z" stale=""><detail/>\n</event>',
+        b'<event uid="no-time" start="2025-01-12T04:38:00Z"></event>',
+        b'<event uid="bad-time" time="2025-13-40T00:00:00Z"></event>',
+        b'<event uid="bad-stale" time="2025-01-12T04:38:00Z" stale="soon"></event>',
+        b"<event uid='c' time='2025-01-12T04:39:00' stale='2025-01-13T04:39:00Z'><detail/></event>",
+    ]) + b'\n'
+    outputs = []
+    for preserve_format in (True, False):
+        path = tmp_path / f"log-{preserve_format}.txt"
+        path.write_bytes(content)
+        messages = []
+        cot_parser.adjustEventTimes(str(path), "2030-06-01T00:00:00Z", messages.append, preserve_format=preserve_format)
+        assert "Skipped 3 events with a missing or unparsable time." in messages
+        outputs.append((tmp_path / f"TimeAdjusted_log-{preserve_format}.txt").read_bytes())
+    byte_level, round_trip = outputs
+    assert byte_level.startswith(declaration + b'\n<event uid="a"')
+    assert b'</event><event uid="b"' in byte_level
+    assert shifted_times(byte_level) == shifted_times(round_trip)
+    assert [uid for uid, *_ in shifted_times(byte_level)] == ["a", "b", "c"]
+    assert b'time="2030-06-01T00:00:06.5Z"' in byte_level
+
+
+def test_byte_level_time_shift_drops_per_event_declarations(tmp_path):
+    event = cot_parser.XML_DECLARATION + b'\n<event uid="a" time="2025-01-01T00:00:00Z"></event>'
+    path = tmp_path / "log.txt"
+    path.write_bytes(cot_parser.XML_DECLARATION + b'\n' + b'\n'.join([event, event]))
+    cot_parser.adjustEventTimes(str(path), "2030-01-01T00:00:00Z", lambda message: None)
+    shifted = b'<event uid="a" time="2030-01-01T00:00:00Z"></event>'
+    assert (tmp_path / "TimeAdjusted_log.txt").read_bytes() == cot_parser.XML_DECLARATION + b'\n' + shifted * 2
+
+
+def test_small_export_skips_the_process_pool(tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("small inputs should not start a process pool")
+    monkeypatch.setattr(cot_parser, "ProcessPoolExecutor", no_pool)
+    paths = []
+    for name in ("a.txt", "b.txt"):
+        path = tmp_path / name
+        path.write_bytes(b'<event uid="%s-1" type="a-f" time="2024-01-01T00:00:00Z"><detail/></event>' % name.encode())
+        paths.append(str(path))
+    messages = []
+    cot_parser.export_cot_details_multiple_files(paths[:1], messages.append, output_dir=str(tmp_path), workers=4)
+    cot_parser.export_cot_details_multiple_files(paths, messages.append, output_dir=str(tmp_path), workers=4)
+    assert len(list(tmp_path.glob("Exported CoT Details - *.csv"))) >= 1
+    assert not any("worker processes" in message for message in messages)
+
+
+def test_split_ranges_pack_events_up_to_the_limit(tmp_path, monkeypatch):
+    events = [b'<event uid="a"></event>', b'<event uid="b">' + b'x' * 100 + b'</event>', b'<event uid="c"></event>',
+              b'<event uid="d"></event>', b'<event uid="e"></event>']
+    path = tmp_path / "log.txt"
+    path.write_bytes(cot_parser.XML_DECLARATION + b''.join(events))
+    content = path.read_bytes()
+    for window in (16, 50, 4096):
+        monkeypatch.setattr(cot_parser, "SCAN_WINDOW_BYTES", window)
+        ranges = list(cot_parser.plan_split_ranges(str(path), 60, 10, lambda message: None))
+        assert [content[start:end] for start, end in ranges] == [events[0], events[1], events[2] + events[3], events[4]]
+
+
+def test_incremental_export_resumes_after_the_last_complete_event(tmp_path):
+    # The unclosed <contact> sends these through the regex fallback, which reads the callsign
+    event = b'<event uid="%s" time="2024-01-01T00:00:00Z"><detail><contact callsign="%s"></detail></event>\n'
+    path = tmp_path / "log.txt"
+    path.write_bytes(event % (b"u1", b"ALPHA") + event % (b"u2", b"BRAVO") + b'<event uid="u3" time="2024')
+    resumed_at = len(event % (b"u1", b"ALPHA")) * 2 - 1  # just past the second </event>
+
+    def refresh():
+        messages = []
+        cot_parser.export_cot_details_incremental([str(path)], messages.append, output_dir=str(tmp_path))
+        [csv_path] = tmp_path.glob("Exported CoT Details - *.csv")
+        return list(pd.read_csv(csv_path)["detail_contact_callsign"]), messages
+
+    callsigns, _ = refresh()
+    assert callsigns == ["ALPHA", "BRAVO"]
+
+    # The partial event is finished and another appended
+    with open(path, 'ab') as f:
+        f.write(b'-01-01T00:00:00Z"><detail><contact callsign="CHARLIE"></detail></event>\n' + event % (b"u4", b"DELTA"))
+    callsigns, messages = refresh()
+    assert callsigns == ["ALPHA", "BRAVO", "CHARLIE", "DELTA"]
+    assert f"Parsing {path} from byte {resumed_at}" in messages
+    assert f"2 new events (4 total) from {path}" in messages
+
+    callsigns, messages = refresh()
+    assert callsigns == ["ALPHA", "BRAVO", "CHARLIE", "DELTA"]
+    assert f"0 new events (4 total) from {path}" in messages
+
+    # A replaced log starts the export over
+    path.write_bytes(event % (b"v1", b"ECHO"))
+    callsigns, messages = refresh()
+    assert callsigns == ["ECHO"]
+    assert any("truncated or replaced" in message for message in messages)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="patches the pool workers through fork")
+def test_parallel_export_logs_a_failing_part_like_the_serial_path(tmp_path, monkeypatch):
+    fork_pool = functools.partial(cot_parser.ProcessPoolExecutor, mp_context=multiprocessing.get_context("fork"))
+    monkeypatch.setattr(cot_parser, "ProcessPoolExecutor", fork_pool)
+    monkeypatch.setattr(cot_parser, "PARALLEL_MIN_BYTES", 0)
+    extract = cot_parser.extract_cot_event_details
+
+    def extract_or_fail(raw_event, fast_path=True):
+        if b'corrupt' in bytes(raw_event):
+            raise ValueError("corrupt event")
+        return extract(raw_event, fast_path)
+    monkeypatch.setattr(cot_parser, "extract_cot_event_details", extract_or_fail)
+
+    # The unclosed <contact> sends these through the regex fallback, which reads the callsign
+    event = b'<event uid="%s" time="2024-01-01T00:00:00Z"><detail><contact callsign="%s"></detail></event>\n'
+    paths = []
+    for name, body in (("a.txt", event % (b"a-1", b"ALPHA") + event % (b"corrupt", b"ALPHA") + event % (b"a-2", b"ALPHA")),
+                       ("b.txt", event % (b"b-1", b"BRAVO"))):
+        (tmp_path / name).write_bytes(body)
+        paths.append(str(tmp_path / name))
+
+    results = []
+    for workers in (1, 2):
+        output_dir = tmp_path / f"out-{workers}"
+        output_dir.mkdir()
+        messages = []
+        cot_parser.export_cot_details_multiple_files(paths, messages.append, output_dir=str(output_dir), workers=workers)
+        [csv_path] = output_dir.glob("*.csv")
+        errors = [message for message in messages if message.startswith("Error reading file")]
+        results.append((errors, list(pd.read_csv(csv_path)["detail_contact_callsign"])))
+    assert results[0] == results[1] == ([f"Error reading file {paths[0]}: corrupt event"], ["ALPHA", "BRAVO"])
+
+
+FAST_PATH_LAYOUT = ('<event version="2.0" uid="U-1" type="a-f-G" time="2025-01-12T04:36:54Z">'
+                    '<point lat="{value}" lon="2" hae="3" ce="4" le="5"/>'
+                    '<detail><contact callsign="ALPHA{value}"/><remarks source="x">{text}</remarks></detail></event>')
+
+
+@pytest.mark.parametrize("value, text", [
+    ("1", "plain"), ("1", "a > b"), ("1", "[a] ]b]"), ("1", "]]"), ("1", "x]]>y"), ("1", "]]]>"),
+    ("1", "Name: x\nStatus: y"), ("1", "tab\there"), ("1", "x\ry"), ("1", "&amp;"), ("1", "<![CDATA[z]]>"),
+    ("1", "<!-- c -->"), ("1", "\ufffe"), ("1", "\x85\u2028"), ("a]]>b", "t"), ("a>b", "t"), ("a\tb", "t"),
+    ("a'b", "t"), ("a<b", "t"), ("1", "</remarks>"), ("1", "<b/>"),
+])
+def test_fast_path_matches_element_tree(monkeypatch, value, text):
+    monkeypatch.setattr(cot_parser, "fast_path_shapes", [])
+    assert cot_parser.fast_extract_event_data(FAST_PATH_LAYOUT.format(value="1", text="plain")) is not None
+
+    event_str = FAST_PATH_LAYOUT.format(value=value, text=text)
+    fast_result = cot_parser.fast_extract_event_data(event_str)
+    if fast_result is not None:
+        assert fast_result == cot_parser.extract_event_data_full(event_str)
+    raw_event = event_str.encode()
+    assert cot_parser.extract_cot_event_details(raw_event) == cot_parser.extract_cot_event_details(raw_event, fast_path=False)
+    if "]]>" in text:
+        assert fast_result is None
@@ -0,0 +1,307 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import geochat_parser
+
+
+def create_statesaver(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Chat (id INTEGER PRIMARY KEY, conversationId TEXT, receiveTime INTEGER, sentTime INTEGER, "
+                 "message TEXT, senderCallsign TEXT, status TEXT)")
+    conn.execute("CREATE TABLE Groups (conversationId TEXT, conversationName TEXT, createdLocally INTEGER, "
+                 "destinations TEXT, parent TEXT)")
+    return conn
+
+
+def test_open_statesaver_reads_a_live_wal_database(tmp_path):
+    db_path = str(tmp_path / "statesaver.sqlite")
+    writer = sqlite3.connect(db_path)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.close()
+    # WinTAK keeps its connection open, so everything below stays in the -wal file
+    writer = create_statesaver(db_path)
+    writer.execute("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                   "VALUES ('conv-1', 1000, 1000, 'hello', 'ALPHA', 'READ')")
+    writer.commit()
+    try:
+        conn = geochat_parser.open_statesaver(db_path)
+        try:
+            assert conn.execute("SELECT message FROM Chat").fetchall() == [('hello',)]
+        finally:
+            conn.close()
+    finally:
+        writer.close()
+
+
+class FrameSink:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, chat_df):
+        self.frames.append(chat_df)
+
+
+def test_batch_dedupes_on_raw_conversation_id(tmp_path):
+    messages = [('conv-1', 1000, 1000, 'hello', 'ALPHA', 'READ'),
+                ('conv-1', 2500, 2000, 'second', 'BRAVO', 'READ'),
+                ('conv-2', 3500, 3000, 'other room', 'ALPHA', 'READ')]
+    for device, groups in (('device-1', [('conv-1', 'Ops Room', 0, '', '')]),
+                           ('device-2', [('conv-1', 'Ops Room (renamed)', 0, '', '')]),
+                           ('device-3', [])):
+        os.makedirs(tmp_path / device)
+        conn = create_statesaver(str(tmp_path / device / "statesaver.sqlite"))
+        conn.executemany("INSERT INTO Groups VALUES (?, ?, ?, ?, ?)", groups)
+        conn.executemany("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", messages)
+        conn.commit()
+        conn.close()
+
+    db_paths = geochat_parser.find_statesavers(str(tmp_path))
+    sink = FrameSink()
+    rows, duplicates, groups_df, errors = geochat_parser.export_chat_batch(db_paths, str(tmp_path), 0, sink, chunk_rows=2)
+    assert errors == []
+    assert (rows, duplicates) == (3, 6)
+    merged = pd.concat(sink.frames, ignore_index=True)
+    assert list(merged.columns) == geochat_parser.BATCH_CHAT_COLUMNS
+    assert list(merged['message']) == ['hello', 'second', 'other room']
+    assert list(merged['conversationId']) == ['Ops Room', 'Ops Room', 'conv-2']
+    assert set(merged['sourceDatabase']) == {os.path.join('device-1', 'statesaver.sqlite')}
+    assert len(groups_df) == 2
+
+
+def test_batch_dedupes_across_many_chunks_and_databases(tmp_path):
+    expected, seen = [], set()
+    for device in range(4):
+        # Each device saw an overlapping window of the same conversation
+        messages = [('conv-1', 1000 * i, 1000 * i, f'message {i}', 'ALPHA' if i % 2 else 'BRAVO', 'READ')
+                    for i in range(device * 30, device * 30 + 70)]
+        for message in messages:
+            if message not in seen:
+                seen.add(message)
+                expected.append(message[3])
+        os.makedirs(tmp_path / f"device-{device}")
+        conn = create_statesaver(str(tmp_path / f"device-{device}" / "statesaver.sqlite"))
+        conn.executemany("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", messages + messages[:5])
+        conn.commit()
+        conn.close()
+
+    db_paths = geochat_parser.find_statesavers(str(tmp_path))
+    sink = FrameSink()
+    rows, duplicates, _groups_df, errors = geochat_parser.export_chat_batch(db_paths, str(tmp_path), 0, sink,
+                                                                            chunk_rows=7)
+    assert errors == []
+    assert len(sink.frames) > 20
+    merged = pd.concat(sink.frames, ignore_index=True)
+    assert list(merged['message']) == expected
+    assert (rows, duplicates) == (len(expected), 4 * 75 - len(expected))
+
+
+def row_by_row_time(unix_timestamp, tz_offset):
+    # The per-row conversion start_parsing used before
+    if pd.isna(unix_timestamp):
+        return None
+    utc_time = datetime.fromtimestamp(unix_timestamp / 1000, tz=timezone.utc)
+    local_time = utc_time.astimezone(timezone(timedelta(hours=tz_offset)))
+    return local_time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@pytest.mark.parametrize("tz_offset", [-8, -5, 0, 3, 14])
+def test_column_timestamps_match_row_by_row_conversion(tz_offset):
+    timestamps = [1736656614000, 1736656614999, 1736656615001, 0, -1, -999, -1000, -1001, 86399999,
+                  951782399999, 4102444800000, 1709164800000, 1735689599999]
+    for column in (pd.Series(timestamps), pd.Series(timestamps + [None]), pd.Series([None, None]), pd.Series([], dtype='int64')):
+        expected = column.apply(row_by_row_time, tz_offset=tz_offset)
+        pd.testing.assert_series_equal(geochat_parser.convert_timestamps(column, tz_offset), expected,
+                                       check_dtype=False)
+
+
+def test_timestamps_keep_the_column_index():
+    column = pd.Series([1736656614000, None], index=[7, 3])
+    converted = geochat_parser.convert_timestamps(column, -5)
+    assert list(converted.index) == [7, 3]
+    assert converted[7] == '2025-01-11 23:36:54' and pd.isna(converted[3])
+
+
+def read_chat(db_path, **filters):
+    sql, params = geochat_parser.build_chat_query(**filters)
+    conn = geochat_parser.open_statesaver(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_chat_query_joins_names_and_filters_in_sqlite(tmp_path):
+    db_path = str(tmp_path / "statesaver.sqlite")
+    conn = create_statesaver(db_path)
+    conn.executemany("INSERT INTO Groups VALUES (?, ?, ?, ?, ?)",
+                     [('conv-1', 'Ops Room', 0, '', ''), ('conv-2', 'Logistics', 0, '', ''),
+                      ('conv-1', 'Ops Room (renamed)', 0, '', '')])
+    conn.executemany("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [('conv-1', 1100, 1000, 'first', 'ALPHA', 'READ'),
+                      ('conv-2', 2100, 2000, 'supplies', 'BRAVO', 'READ'),
+                      ('conv-3', 3100, 3000, 'no group', 'ALPHA', 'READ'),
+                      ('conv-1', 4100, None, 'unsent', 'ALPHA', 'READ'),
+                      ('conv-1', 5100, 5000, 'last', 'BRAVO', 'READ')])
+    # The window filter should be able to use an index on sentTime
+    conn.execute("CREATE INDEX chat_sent ON Chat (sentTime)")
+    conn.commit()
+    conn.close()
+
+    # The last Groups row names a conversation; conversations without one keep their id
+    assert [row[0] for row in read_chat(db_path)] == ['Ops Room (renamed)', 'Logistics', 'conv-3',
+                                                      'Ops Room (renamed)', 'Ops Room (renamed)']
+    assert read_chat(db_path)[0] == ('Ops Room (renamed)', 1100, 1000, 'first', 'ALPHA', 'READ')
+    # Half-open sent-time window; rows with no sentTime are outside any window
+    assert [row[3] for row in read_chat(db_path, start_ms=2000, end_ms=5000)] == ['supplies', 'no group']
+    assert [row[3] for row in read_chat(db_path, start_ms=2000)] == ['supplies', 'no group', 'last']
+    # Conversations match by id or by name
+    assert [row[3] for row in read_chat(db_path, conversations=['Logistics', 'conv-3'])] == ['supplies', 'no group']
+    assert [row[3] for row in read_chat(db_path, conversations=['conv-1'], end_ms=2000)] == ['first']
+    assert [row[3] for row in read_chat(db_path, after_rowid=2, max_rowid=4)] == ['no group', 'unsent']
+
+    sql, params = geochat_parser.build_chat_query(start_ms=2000, end_ms=5000)
+    conn = geochat_parser.open_statesaver(db_path)
+    try:
+        plan = ' '.join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        # The connection is read-only
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM Chat")
+    finally:
+        conn.close()
+    assert 'chat_sent' in plan
+
+
+def write_chat_rows(db_path, count, first=0):
+    conn = create_statesaver(db_path) if first == 0 else sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO Chat (conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                     "VALUES (?, ?, ?, ?, ?, ?)",
+                     [('conv-1', 1736656614000 + i * 1000, 1736656614000 + i * 1000, f'message {i}', 'ALPHA', 'READ')
+                      for i in range(first, first + count)])
+    conn.commit()
+    conn.close()
+
+
+def sheet_messages(workbook, name):
+    rows = list(workbook[name].iter_rows(values_only=True))
+    assert list(rows[0]) == geochat_parser.CHAT_COLUMNS
+    return [row[3] for row in rows[1:]]
+
+
+def test_excel_sink_rolls_over_to_new_sheets_at_the_row_limit(tmp_path):
+    db_path = str(tmp_path / "statesaver.sqlite")
+    write_chat_rows(db_path, 11)
+    output_path = str(tmp_path / "chat.xlsx")
+    groups_df = pd.DataFrame(columns=geochat_parser.GROUPS_COLUMNS)
+    chunks = []
+
+    class RecordingSink(geochat_parser.GeoChatExcelSink):
+        def write(self, chat_df):
+            chunks.append(len(chat_df))
+            super().write(chat_df)
+
+    conn = geochat_parser.open_statesaver(db_path)
+    try:
+        # 5 rows a sheet, header included
+        sink = RecordingSink(output_path, max_rows=5)
+        rows = geochat_parser.export_chat(conn, geochat_parser.CHAT_QUERY, [], -5, sink, chunk_rows=3)
+        written = sink.close(groups_df)
+    finally:
+        conn.close()
+    assert rows == 11 and chunks == [3, 3, 3, 2]
+    assert "3 Chat Data sheets" in written
+    workbook = load_workbook(output_path)
+    assert workbook.sheetnames == ['Chat Data', 'Chat Data 2', 'Chat Data 3', 'Groups Data']
+    assert [len(sheet_messages(workbook, name)) for name in workbook.sheetnames[:3]] == [4, 4, 3]
+    assert sum((sheet_messages(workbook, name) for name in workbook.sheetnames[:3]), []) == [f'message {i}' for i in range(11)]
+
+    # Appending continues the last sheet and rolls over again
+    write_chat_rows(db_path, 3, first=11)
+    conn = geochat_parser.open_statesaver(db_path)
+    try:
+        sink = geochat_parser.GeoChatExcelAppendSink(output_path, max_rows=5)
+        sql, params = geochat_parser.build_chat_query(after_rowid=11)
+        geochat_parser.export_chat(conn, sql, params, -5, sink, chunk_rows=2)
+        sink.close(groups_df)
+    finally:
+        conn.close()
+    workbook = load_workbook(output_path)
+    assert workbook.sheetnames == ['Chat Data', 'Chat Data 2', 'Chat Data 3', 'Chat Data 4', 'Groups Data']
+    assert sheet_messages(workbook, 'Chat Data 3') == ['message 8', 'message 9', 'message 10', 'message 11']
+    assert sheet_messages(workbook, 'Chat Data 4') == ['message 12', 'message 13']
+
+
+@pytest.mark.parametrize("export_format", ["CSV", "Parquet"])
+def test_csv_and_parquet_sinks_write_every_chunk(tmp_path, export_format):
+    db_path = str(tmp_path / "statesaver.sqlite")
+    write_chat_rows(db_path, 10)
+    extension, sink_class = geochat_parser.EXPORT_SINKS[export_format]
+    output_path = str(tmp_path / f"chat{extension}")
+    conn = geochat_parser.open_statesaver(db_path)
+    try:
+        sink = sink_class(output_path)
+        geochat_parser.export_chat(conn, geochat_parser.CHAT_QUERY, [], -5, sink, chunk_rows=3)
+        sink.close(pd.DataFrame(columns=geochat_parser.GROUPS_COLUMNS))
+    finally:
+        conn.close()
+    chat_df = pd.read_csv(output_path) if export_format == "CSV" else pd.read_parquet(output_path)
+    assert list(chat_df.columns) == geochat_parser.CHAT_COLUMNS
+    assert list(chat_df['message']) == [f'message {i}' for i in range(10)]
+    assert chat_df['sentTime'].iloc[0] == '2025-01-11 23:36:54'
+    if export_format == "Parquet":
+        assert geochat_parser.pq.ParquetFile(output_path).num_row_groups == 4
+
+
+@pytest.mark.parametrize("export_format", ["CSV", "Parquet", "Excel"])
+def test_incremental_export_resumes_from_the_rowid_watermark(tmp_path, export_format):
+    db_path = str(tmp_path / "statesaver.sqlite")
+    write_chat_rows(db_path, 5)
+    extension = geochat_parser.EXPORT_SINKS[export_format][0]
+    output_path = geochat_parser.incremental_export_path(db_path, str(tmp_path), extension)
+
+    def exported_messages():
+        if export_format == "CSV":
+            return list(pd.read_csv(output_path)['message'])
+        if export_format == "Parquet":
+            return list(pd.read_parquet(output_path).sort_values('receiveTime')['message'])
+        workbook = load_workbook(output_path)
+        return sum((sheet_messages(workbook, name) for name in workbook.sheetnames if name.startswith('Chat Data')), [])
+
+    rows, total, _written, rebuilt = geochat_parser.export_chat_incremental(db_path, output_path, export_format, -5)
+    assert (rows, total, rebuilt) == (5, 5, True)
+    write_chat_rows(db_path, 3, first=5)
+    rows, total, _written, rebuilt = geochat_parser.export_chat_incremental(db_path, output_path, export_format, -5)
+    assert (rows, total, rebuilt) == (3, 8, False)
+    assert exported_messages() == [f'message {i}' for i in range(8)]
+    # Nothing new: nothing read, nothing added
+    rows, total, _written, rebuilt = geochat_parser.export_chat_incremental(db_path, output_path, export_format, -5)
+    assert (rows, total, rebuilt) == (0, 8, False)
+    assert exported_messages() == [f'message {i}' for i in range(8)]
+    if export_format == "Parquet":
+        assert len(os.listdir(output_path)) == 2
+
+    # Changed settings start over
+    rows, total, _written, rebuilt = geochat_parser.export_chat_incremental(db_path, output_path, export_format, 0)
+    assert (rows, total, rebuilt) == (8, 8, True)
+    # So does a cleared and refilled chat history, even with more rows than before
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM Chat")
+    conn.executemany("INSERT INTO Chat (id, conversationId, receiveTime, sentTime, message, senderCallsign, status) "
+                     "VALUES (?, 'conv-2', ?, ?, ?, 'BRAVO', 'READ')",
+                     [(i, 1800000000000 + i, 1800000000000 + i, f'new {i}') for i in range(1, 11)])
+    conn.commit()
+    conn.close()
+    rows, total, _written, rebuilt = geochat_parser.export_chat_incremental(db_path, output_path, export_format, 0)
+    assert (rows, total, rebuilt) == (10, 10, True)
+    assert exported_messages() == [f'new {i}' for i in range(1, 11)]
@@ -0,0 +1,480 @@
+import hashlib
+import io
+import os
+import queue
+import sys
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import requests
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tak_report_parser
+
+
+def citrap_entry(report_hash, submitted):
+    return {'Hash': report_hash, 'Name': f'{report_hash}.zip', 'MimeType': 'application/zip',
+            'Keywords': ['citrap'], 'SubmissionTime': submitted}
+
+
+def test_failed_download_is_retried_on_next_sync():
+    entry_a = citrap_entry('a' * 64, '2024-05-01T10:00:00Z')
+    entry_b = citrap_entry('b' * 64, '2024-05-01T11:00:00Z')
+    state = {'high_water': None, 'hashes': [], 'workbooks': {}}
+
+    # A failed to download, B was fetched
+    state = tak_report_parser.advance_sync_state(state, [entry_b], [entry_a])
+
+    start_utc = datetime.fromisoformat(state['high_water']) if state['high_water'] else None
+    retry = tak_report_parser.prefilter_metadata([entry_a, entry_b], start_utc, state['hashes'])
+    assert retry == [entry_a]
+
+    # Once A is fetched too, neither is offered again
+    state = tak_report_parser.advance_sync_state(state, retry)
+    start_utc = datetime.fromisoformat(state['high_water'])
+    assert start_utc == tak_report_parser.metadata_submission_time(entry_a)
+    assert tak_report_parser.prefilter_metadata([entry_a, entry_b], start_utc, state['hashes']) == []
+
+
+def test_high_water_stays_below_earliest_failure():
+    fetched = [citrap_entry('c' * 64, '2024-05-01T09:00:00Z'), citrap_entry('d' * 64, '2024-05-01T12:00:00Z')]
+    failed = [citrap_entry('e' * 64, '2024-05-01T10:30:00Z')]
+    state = tak_report_parser.advance_sync_state({'high_water': None, 'hashes': [], 'workbooks': {}}, fetched, failed)
+    assert datetime.fromisoformat(state['high_water']) == tak_report_parser.metadata_submission_time(fetched[0])
+    assert set(state['hashes']) == {'c' * 64, 'd' * 64}
+
+
+class ListSheet:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, row):
+        self.rows.append(row)
+
+
+def test_sync_rows_already_exported_go_to_duplicates():
+    gui = tak_report_parser.TAKReportGUI.__new__(tak_report_parser.TAKReportGUI)
+    # Column F is dropped on export; column C is Date/Time
+    unique_rows = [['r1', 'SPOTREP', '2024-05-01 10:00:00', 'a', 'b', 'dropped', 'x'],
+                   ['r2', 'SPOTREP', '2024-05-01 11:00:00', 'a', 'b', 'dropped', 'y']]
+    duplicate_rows = [['r3', 'SPOTREP', '2024-05-01 11:00:00', 'a', 'b', 'dropped', 'z']]
+    gui.build_rows_for_type = lambda reports, fields, tz_offset, tz_name: (unique_rows, duplicate_rows)
+
+    main_sheet, duplicate_sheet = ListSheet(), ListSheet()
+    seen_times = {'2024-05-01 10:00:00'}
+    gui.process_reports_for_type([], 'SPOTREP', [], main_sheet, duplicate_sheet, -5, 'EST', seen_times)
+
+    assert main_sheet.rows == [['r2', 'SPOTREP', '2024-05-01 11:00:00', 'a', 'b', 'y']]
+    assert duplicate_sheet.rows == [['r1', 'SPOTREP', '2024-05-01 10:00:00', 'a', 'b', 'x'],
+                                    ['r3', 'SPOTREP', '2024-05-01 11:00:00', 'a', 'b', 'z']]
+    assert seen_times == {'2024-05-01 10:00:00', '2024-05-01 11:00:00'}
+
+
+def test_sheet_times_before_high_water_are_pruned():
+    state = {'high_water': '2024-05-01T15:00:00+00:00', 'hashes': [], 'workbooks': {},
+             'sheet_times': {'SPOTREP': ['2024-05-01 09:59:59', '2024-05-01 10:00:00', '2024-05-01 12:00:00']}}
+    state = tak_report_parser.prune_sheet_times(state, -5)
+    assert state['sheet_times'] == {'SPOTREP': ['2024-05-01 10:00:00', '2024-05-01 12:00:00']}
+
+
+def test_sync_with_no_new_reports_writes_no_workbook(tmp_path):
+    gui = tak_report_parser.TAKReportGUI.__new__(tak_report_parser.TAKReportGUI)
+    gui.output_parent_folder = str(tmp_path)
+    gui.sync_state = {'high_water': None, 'hashes': [], 'workbooks': {}, 'sheet_times': {}}
+    messages = []
+    gui.notify = lambda kind, title, message: messages.append(title)
+    templates = {'SPOTREP': [], 'SALUTE': []}
+    for output_option in ("Combined Workbook", "Separate Workbooks"):
+        assert gui.parse_reports(templates, {'SPOTREP': []}, -5, 'EST', output_option) == {}
+    assert os.listdir(tmp_path) == []
+    assert messages == ["No New Reports"] * 2
+
+
+class ListingDownloader:
+    def __init__(self, entries):
+        self.entries = entries
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        return ListingResponse({'data': self.entries})
+
+
+class ListingResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_metadata_listing_is_narrowed_locally():
+    entries = [dict(citrap_entry('a', '2025-01-02T00:00:00Z'), Keywords='CITRAP, spotrep'),
+               dict(citrap_entry('b', '2025-01-02T00:00:00Z'), Keywords=['report', 'citrap-v2']),
+               dict(citrap_entry('c', '2025-01-02T00:00:00Z'), Keywords=['mission']),
+               citrap_entry('d', '2025-01-02T00:00:00Z')]
+    downloader = ListingDownloader(entries)
+    gui = tak_report_parser.TAKReportGUI.__new__(tak_report_parser.TAKReportGUI)
+    metadata = gui.fetch_metadata(downloader, 'https://tak/Marti/api/files/metadata')
+    assert downloader.requests == [('https://tak/Marti/api/files/metadata', {})]
+    kept = tak_report_parser.prefilter_metadata(metadata['data'])
+    assert [entry['Hash'] for entry in kept] == ['a', 'b', 'd']
+
+
+def http_response(url, status_code, body=b''):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response.reason = 'test'
+    response.raw = io.BytesIO(body)
+    return response
+
+
+class ScriptedSession:
+    """Answers each URL with the next (status, body) scripted for it."""
+    def __init__(self, script):
+        self.script = {url: list(answers) for url, answers in script.items()}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.calls.append(url)
+            status_code, body = self.script[url].pop(0)
+        return http_response(url, status_code, body)
+
+    def close(self):
+        pass
+
+
+def test_downloader_retries_hash_mismatches_and_server_errors(tmp_path):
+    good = b'package contents'
+    good_hash = hashlib.sha256(good).hexdigest()
+    flaky = b'flaky package'
+    flaky_hash = hashlib.sha256(flaky).hexdigest()
+    url = 'https://tak/Marti/api/files/{hash}'
+    session = ScriptedSession({
+        url.format(hash=good_hash): [(200, b'truncated'), (200, good)],
+        url.format(hash=flaky_hash): [(503, b''), (502, b''), (200, flaky)],
+        url.format(hash='missing'): [(404, b'')],
+        url.format(hash='down'): [(503, b'')] * 3,
+    })
+    downloader = tak_report_parser.TAKFileDownloader(url, None, workers=4, retries=3, backoff_seconds=0,
+                                                     cache=tak_report_parser.PackageCache(str(tmp_path / 'cache')))
+    downloader.session = session
+    try:
+        futures = {name: downloader.submit({'Hash': name, 'Name': name})
+                   for name in (good_hash, flaky_hash, 'missing', 'down')}
+        results = {name: future.result() for name, future in futures.items()}
+    finally:
+        downloader.close()
+
+    for report_hash, content in ((good_hash, good), (flaky_hash, flaky)):
+        path, error = results[report_hash]
+        assert error is None and open(path, 'rb').read() == content
+    assert results['missing'][0] is None and results['missing'][1].startswith('Failed to fetch report')
+    assert results['down'][0] is None and 'after 3 attempts' in results['down'][1]
+    assert sorted(Counter(session.calls).values()) == [1, 2, 3, 3]
+    assert not list((tmp_path / 'cache').rglob('*.tmp'))
+
+
+def add_to_cache(cache, report_hash, size):
+    temp_path = cache.temp_path_for(report_hash)
+    with open(temp_path, 'wb') as f:
+        f.write(b'x' * size)
+    return cache.add(report_hash, temp_path)
+
+
+def test_cache_evicts_least_recently_used_files_not_in_use(tmp_path):
+    cache = tak_report_parser.PackageCache(str(tmp_path), max_bytes=300)
+    paths = {}
+    for age, report_hash in enumerate(('aa01', 'bb02', 'cc03')):
+        paths[report_hash] = add_to_cache(cache, report_hash, 100)
+        os.utime(paths[report_hash], (1000 + age, 1000 + age))
+    cache.release(paths['bb02'])
+    cache.release(paths['cc03'])
+    # aa01 is the oldest but still being handled, so bb02 goes
+    paths['dd04'] = add_to_cache(cache, 'dd04', 100)
+    assert cache.get('bb02') is None
+    assert os.path.exists(paths['aa01']) and cache.total_bytes == 300
+
+    # Once released, a read refreshes cc03 and aa01 is the one evicted
+    cache.release(paths['aa01'])
+    cache.release(paths['dd04'])
+    cache.release(cache.get('cc03'))
+    add_to_cache(cache, 'ee05', 100)
+    assert cache.get('aa01') is None and cache.get('cc03') is not None
+    assert cache.total_bytes == 300
+
+    # A new cache over the same folder picks up what is on disk
+    assert tak_report_parser.PackageCache(str(tmp_path), max_bytes=300).total_bytes == 300
+
+
+def test_cached_package_is_not_downloaded_again(tmp_path):
+    content = b'package contents'
+    report_hash = hashlib.sha256(content).hexdigest()
+    url = 'https://tak/Marti/api/files/{hash}'
+    for answers in ([(200, content)], []):
+        downloader = tak_report_parser.TAKFileDownloader(url, None, workers=1, backoff_seconds=0,
+                                                         cache=tak_report_parser.PackageCache(str(tmp_path)))
+        downloader.session = ScriptedSession({url.format(hash=report_hash): answers})
+        try:
+            path, error = downloader.fetch({'Hash': report_hash, 'Name': 'a.zip'})
+            downloader.release(path)
+        finally:
+            downloader.close()
+        assert error is None and open(path, 'rb').read() == content
+        assert downloader.session.calls == ([url.format(hash=report_hash)] if answers else [])
+
+
+class RecordingBody(io.BytesIO):
+    def __init__(self, body):
+        super().__init__(body)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+def test_zip_package_is_streamed_to_disk_and_extracted(tmp_path, monkeypatch):
+    monkeypatch.setattr(tak_report_parser, 'DOWNLOAD_CHUNK_BYTES', 4096)
+    media = os.urandom(50000)
+    package = io.BytesIO()
+    with zipfile.ZipFile(package, 'w') as z:
+        z.writestr('report.xml', '<report type="SPOTREP" title="a"/>')
+        z.writestr('attachments/clip.mp4', media)
+    content = package.getvalue()
+    report_hash = hashlib.sha256(content).hexdigest()
+    body = RecordingBody(content)
+
+    class PackageSession(ScriptedSession):
+        def get(self, url, **kwargs):
+            assert kwargs.get('stream') is True
+            response = http_response(url, 200)
+            response.raw = body
+            return response
+
+    downloader = tak_report_parser.TAKFileDownloader('https://tak/Marti/api/files/{hash}', None, workers=1)
+    downloader.session = PackageSession({})
+    gui = tak_report_parser.TAKReportGUI.__new__(tak_report_parser.TAKReportGUI)
+    gui.media_folder = str(tmp_path / 'media')
+    gui.folder_counter = 0
+    gui.combined_reports = tak_report_parser.ET.Element('reports')
+    gui.reports_by_type = {}
+    gui.notify = lambda kind, title, message: None
+    try:
+        path, error = downloader.fetch({'Hash': report_hash, 'Name': 'package.zip', 'MimeType': 'application/zip'})
+        assert error is None and open(path, 'rb').read() == content
+        gui.handle_downloaded_entry({'Hash': report_hash, 'Name': 'package.zip', 'MimeType': 'application/zip'}, path)
+        downloader.release(path)
+        assert not os.path.exists(path)
+    finally:
+        downloader.close()
+    assert len(body.read_sizes) > 10 and max(body.read_sizes) <= 4096
+    assert [report.get('title') for report in gui.reports_by_type['SPOTREP']] == ['a']
+    assert open(tmp_path / 'media' / '00' / 'attachments' / 'clip.mp4', 'rb').read() == media
+    assert gui.folder_counter == 1
+
+
+EXTRACTION_TEMPLATE = '''<templates><report type="SPOTREP">
+<section title="Main">
+  <option type="string" title="Name"/><option type="checkbox" title="Armed"/>
+  <option type="dateTime" title="Seen"/><option type="number" title="Size"/>
+  <option type="number" title="Range" unitOptions="m,km" unitValue="m"/>
+  <option type="time" title="Until"/><option type="geometry" title="Target"/>
+</section>
+<list title="Activity" multiple="false"><option title="Moving"/><option title="Halted"/></list>
+<list title="Equipment" multiple="true"><option title="Trucks"/><option title="Tanks"/></list>
+</report></templates>'''
+
+
+def make_report(date_time, body):
+    return tak_report_parser.ET.fromstring(
+        f'<report type="SPOTREP" userCallsign="CS1" title="t" dateTime="{date_time}" '
+        f'location="POINT (-77.03650 38.89770)">{body}</report>')
+
+
+def test_extraction_plan_matches_per_field_lookups(tmp_path):
+    benchmarks = pytest.importorskip('benchmarks')
+    template_path = tmp_path / 'template.xml'
+    template_path.write_text(EXTRACTION_TEMPLATE)
+    gui = tak_report_parser.TAKReportGUI.__new__(tak_report_parser.TAKReportGUI)
+    gui.start_datetime = datetime(2025, 1, 1)
+    fields = gui.parse_template(str(template_path))['SPOTREP']
+    reports = [
+        make_report('2025-01-12T04:36:54.000Z', '''
+            <section title="Main"><option type="string" title="Name" value="first"/>
+              <option type="checkbox" title="Armed" value="True"/><option type="dateTime" title="Seen" value="2025-01-12T04:00:00Z"/>
+              <option type="number" title="Range" value="5" unitValue="km"/><option type="time" title="Until" value="2025-01-12T06:00:00Z"/>
+              <section title="Nested"><option type="geometry" title="Target" value="POINT (-77.0 38.9)"/></section>
+              <option type="geometry" title="Target" value="POINT (10.0 50.0)"/></section>
+            <option title="Name" value="second"/>
+            <list title="Activity"><option title="Moving" selected="false"/><group><option title="Halted" selected="true"/></group></list>
+            <list title="Activity"><option title="Moving" selected="true"/></list>
+            <list title="Equipment"><option title="Trucks" selected="true"/><option title="Tanks" selected="true"/></list>'''),
+        # Same Date/Time: goes to the duplicates
+        make_report('2025-01-12T04:36:54.000Z', '<option title="Name" value="dup"/><option type="geometry" title="Target" value="POINT (1 2)"/>'),
+        # Blank and missing values, a geometry outside any section and an unparsable location
+        make_report('2025-01-12T05:00:00.000Z', '''
+            <option title="Name" value="  "/><option title="Armed" value="False"/><option title="Range" value="5"/>
+            <option type="geometry" title="Target" value="POINT (1 2)"/>
+            <section title="Other"><option type="geometry" title="Target" value="not a point"/></section>'''),
+        make_report('2024-12-31T23:59:59.000Z', '<option title="Name" value="before the start"/>'),
+    ]
+    outputs = []
+    for process in (lambda *args: benchmarks.legacy_process_reports_for_type(gui, *args), gui.process_reports_for_type):
+        main_rows, duplicate_rows = [], []
+        process(reports, 'SPOTREP', fields, main_rows, duplicate_rows, -5, 'EST')
+        outputs.append((main_rows, duplicate_rows))
+    legacy, plan = outputs
+    # The old exports deleted column F from the finished sheets
+    legacy = tuple([tak_report_parser.export_row(row) for row in rows] for rows in legacy)
+    assert plan == legacy
+    main_rows, duplicate_rows = plan
+    assert len(main_rows) == 2 and len(duplicate_rows) == 1
+
+    # The old path raised on a Date/Time it couldn't read; the plan leaves the report
+    # undated, and undated reports are not exported
+    main_rows, duplicate_rows = [], []
+    gui.process_reports_for_type(reports + [make_report('not a time', '')], 'SPOTREP', fields, main_rows,
+                                 duplicate_rows, -5, 'EST')
+    assert (main_rows, duplicate_rows) == plan
+
+
+def pygeodesy_mgrs(lat, lon):
+    try:
+        return str(tak_report_parser.ev.LatLon(lat, lon).toMgrs())
+    except Exception:
+        return None
+
+
+def test_batch_mgrs_matches_pygeodesy_at_zone_and_band_edges():
+    edge = 1e-9
+    points = [(lat + dlat, lon + dlon)
+              for lat in (-80, -72, -8, 0, 8, 56, 64, 72, 84)
+              for lon in (-180, -6, 0, 3, 6, 9, 12, 21, 33, 42, 174, 180)
+              for dlat in (-edge, 0, edge) for dlon in (-edge, 0, edge)]
+    # Outside the UTM bands, on the poles and not a number
+    points += [(-80.5, 10), (84.5, 10), (90, 0), (-90, 0), (float('nan'), 0), (0, float('nan'))]
+    # Points on and next to whole-meter eastings and northings
+    points += [(38.8977, -77.0365), (0.0, 0.0), (0.00000899, 2.99999101), (-33.8688, 151.2093)]
+    lats, lons = zip(*points)
+    assert tak_report_parser.latlon_to_mgrs_batch(lats, lons) == [pygeodesy_mgrs(lat, lon) for lat, lon in points]
+
+
+def test_mgrs_cache_reuses_conversions(monkeypatch):
+    monkeypatch.setattr(tak_report_parser, 'mgrs_cache', {})
+    converted = []
+    batch = tak_report_parser.latlon_to_mgrs_batch
+
+    def counting_batch(lats, lons):
+        converted.extend(zip(lats, lons))
+        return batch(lats, lons)
+    monkeypatch.setattr(tak_report_parser, 'latlon_to_mgrs_batch', counting_batch)
+    tak_report_parser.cache_mgrs([(38.8977, -77.0365), (38.8977, -77.0365), (51.5, -0.12)])
+    tak_report_parser.cache_mgrs([(51.5, -0.12), (48.85, 2.35)])
+    assert sorted(converted) == [(38.8977, -77.0365), (48.85, 2.35), (51.5, -0.12)]
+    assert tak_report_parser.mgrs_cache[(51.5, -0.12)] == pygeodesy_mgrs(51.5, -0.12)
+
+
+class PipelineDownloader:
+    """Stands in for TAKFileDownloader: serves a listing and finishes later downloads first."""
+    listing = []
+    files = {}
+
+    def __init__(self, file_url_template, ssl_cert, workers, cache):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=len(self.listing))
+        self.released = []
+
+    def get(self, url, **kwargs):
+        return ListingResponse({'data': self.listing})
+
+    def submit(self, file_info):
+        delay = 0.05 * (len(self.listing) - self.listing.index(file_info))
+        return self.executor.submit(self.fetch, file_info, delay)
+
+    def fetch(self, file_info, delay):
+        time.sleep(delay)
+        path = self.files.get(file_info['Hash'])
+        return (path, None) if path else (None, f"Giving up on {file_info['Name']}")
+
+    def release(self, path):
+        self.released.append(path)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def test_pipeline_runs_off_the_tk_thread_and_reports_through_the_queue(tmp_path, monkeypatch):
+    listing, files = [], {}
+    for i, report_hash in enumerate(('h1', 'h2', 'h3')):
+        listing.append(dict(citrap_entry(report_hash, '2025-01-02T00:00:00Z'), MimeType='application/xml',
+                            Name=f'{report_hash}.xml'))
+        if report_hash != 'h2':
+            files[report_hash] = str(tmp_path / f'{report_hash}.xml')
+            (tmp_path / f'{report_hash}.xml').write_text(
+                f'<report type="SPOTREP" userCallsign="CS{i}" title="{report_hash}" '
+                f'dateTime="2025-01-12T0{i}:00:00.000Z" location="POINT (-77.0 38.9)"/>')
+    monkeypatch.setattr(PipelineDownloader, 'listing', listing)
+    monkeypatch.setattr(PipelineDownloader, 'files', files)
+    monkeypatch.setattr(tak_report_parser, 'TAKFileDownloader', PipelineDownloader)
+    monkeypatch.setattr(tak_report_parser, 'PackageCache', lambda folder: None)
+
+    template_path = tmp_path / 'template.xml'
+    template_path.write_text(EXTRACTION_TEMPLATE)
+    gui = tak_report_parser.TAKReportGUI.__new__(tak_report_parser.TAKReportGUI)
+    gui.start_datetime = datetime(2025, 1, 1)
+    gui.templates = gui.parse_template(str(template_path))
+    gui.output_parent_folder = str(tmp_path)
+    gui.media_folder = str(tmp_path / 'media')
+    gui.combined_reports_path = str(tmp_path / 'combined_reports.xml')
+    gui.package_cache_folder = str(tmp_path / 'cache')
+    gui.reports_by_type = {}
+    gui.combined_reports = tak_report_parser.ET.Element('CombinedReports')
+    gui.processed_hashes = set()
+    gui.folder_counter = 1
+    gui.fetched_entries = []
+    gui.failed_entries = []
+    gui.pipeline_events = queue.Queue()
+    handled_on = []
+    handle = gui.handle_downloaded_entry
+    gui.handle_downloaded_entry = lambda file_info, path: (handled_on.append((file_info['Hash'], threading.get_ident())),
+                                                           handle(file_info, path))
+    settings = {'workers': 2, 'tz_offset': -5, 'tz_name': 'EST', 'output_option': 'Combined Workbook', 'sync': False}
+    worker = threading.Thread(target=gui.run_pipeline, args=('https://tak/metadata', '{hash}', None, settings))
+    worker.start()
+    worker.join(10)
+    assert not worker.is_alive()
+
+    # Entries are handled on the worker thread, in metadata order, whatever order they finish in
+    assert [report_hash for report_hash, _ in handled_on] == ['h1', 'h3']
+    assert {thread_id for _, thread_id in handled_on} == {worker.ident}
+    assert [entry['Hash'] for entry in gui.failed_entries] == ['h2']
+
+    # The Tk thread applies the queued events: progress, messageboxes and finally 'done'
+    shown = []
+    monkeypatch.setattr(tak_report_parser, 'messagebox', SimpleNamespace(
+        showinfo=lambda title, message: shown.append(title), showerror=lambda title, message: shown.append(title)))
+    progress = []
+    gui.progress_bar = SimpleNamespace(set=progress.append)
+    gui.progress_label = SimpleNamespace(configure=lambda text: None)
+    gui.progress_window = SimpleNamespace(destroy=lambda: progress.append('closed'))
+    gui.after = lambda delay, callback: pytest.fail("polling continues after 'done'")
+    gui.poll_pipeline()
+    assert progress == [pytest.approx(1 / 3), pytest.approx(2 / 3), 1, 1, 'closed']
+    assert shown == ["Metadata Received", "Retry Failed", "Reports Saved", "Success"]
+    [workbook_path] = tmp_path.glob('Exported TAK Reports *.xlsx')
+    assert load_workbook(workbook_path)['SPOTREP'].max_row == 3